@@ -1,23 +1,153 @@
 import streamlit as st
 import numpy as np
 import pandas as pd
-import json
 import os
+import math
+import time
+import functools
+import datetime
+import io
+from planner import metrics
+from planner.calculators import savings_progress, task_progress
+from planner.goals import goal_heatmap, goal_stats, rollover_ops
+from planner.ledger import LEDGER_COLUMNS
+from planner.projections import sip_growth
+from planner.scheduler import DEFAULT_EFFORT, new_task_id, task_key
+from planner.schema import PLAN_DESCRIPTIONS, PLAN_FIELDS, TASK_STATUSES
+from planner.simulation import PERCENTILES, probability_at_least, simulate_lump_sum, simulate_sip
+from planner.sqlite_store import SQLiteStore
+from planner.storage import ConflictError, JournalStore, add, convert, delete, move, namespaced_path, update
+from planner.timeline import compare
+from planner.transfer import KINDS, export_rows, import_file, write_csv, write_jsonl
+
+page_started = time.perf_counter()
 
 # --- Helper Functions ---
+@st.cache_resource
+def get_store(user=""):
+    # One store per data file, shared by every session in this process
+    json_path = namespaced_path("planner_data.json", user)
+    backend = os.environ.get("PLANNER_BACKEND")
+    # PLANNER_DURABILITY=debounced|interval writes commits behind the UI, a
+    # burst of them in one append, for single-process deployments
+    durability = os.environ.get("PLANNER_DURABILITY", "immediate")
+    if backend == "sqlite":
+        return SQLiteStore(namespaced_path("planner_data.db", user), import_from=json_path)
+    if backend == "binary":
+        # Columnar, memory-mapped snapshot for large histories
+        path = namespaced_path("planner_data.plnb", user)
+        if not os.path.exists(path) and os.path.exists(json_path):
+            convert(json_path, path)
+        return JournalStore(path, durability=durability)
+    return JournalStore(json_path, durability=durability)
+
 def load_data():
-    if os.path.exists("planner_data.json"):
-        with open("planner_data.json", "r") as f:
-            return json.load(f)
-    return {"finance": [], "learning": {}}
+    st.session_state.store_session = get_store(st.query_params.get("user", "")).open()
+    return st.session_state.store_session.data
+
+@st.cache_data
+@metrics.timed("chart.sip_frame")
+def sip_frame(amount, rate, years):
+    growth = sip_growth(amount, rate, years)
+    return pd.DataFrame({'Value': growth}, index=pd.RangeIndex(1, len(growth)+1, name='Month'))
+
+PAGE_SIZES = [10, 25, 50, 100]
+PREREQ_MATCHES = 20
+
+def visible_tasks(tasks, status, query):
+    # Indices of the tasks matching the status filter and search text
+    query = query.strip().lower()
+    return [i for i, t in enumerate(tasks)
+            if (status == "All" or t["status"] == status) and (not query or query in t["task"].lower())]
+
+def render_simulation(idx, plan):
+    cols = st.columns(3)
+    volatility = cols[0].slider("Volatility (% per year)", 0.0, 60.0, 15.0, 1.0, key=f"simvol{idx}")
+    model = cols[1].selectbox("Return Model", ["lognormal", "normal"], key=f"simmodel{idx}")
+    paths = cols[2].select_slider("Paths", [1000, 5000, 20000, 50000, 100000], value=20000, key=f"simpaths{idx}")
+    # Spread the big runs over a few cores. The worker pool is started once and
+    # kept, but small runs still aren't worth sending their paths between processes
+    workers = min(4, os.cpu_count() or 1) if paths >= 50000 else 1
+    if plan['type'] == "SIP":
+        result = simulate_sip(plan['amount'], plan['rate'], plan['years'], volatility,
+                              paths=paths, model=model, workers=workers)
+    else:
+        rate = st.number_input("Expected Annual Return (%)", min_value=-50.0, max_value=50.0, value=10.0, step=0.5, key=f"simrate{idx}")
+        years = st.number_input("Years to Hold", min_value=1, max_value=50, value=5, step=1, key=f"simyears{idx}")
+        result = simulate_lump_sum(plan['result'], rate, years, volatility,
+                                   paths=paths, model=model, workers=workers)
+    if not len(result.final):
+        return
+    with metrics.timer("chart.simulation_bands"):
+        bands = pd.DataFrame(result.bands.T, columns=[f"P{p}" for p in PERCENTILES],
+                             index=pd.Index(result.months / 12, name='Year'))
+        st.line_chart(bands)
+    low, mid, high = result.bands[:, -1]
+    st.caption(f"After {result.months[-1] / 12:g} years: ₹{low:,.0f} (P5) · ₹{mid:,.0f} (P50) · ₹{high:,.0f} (P95)")
+    if plan['type'] == "Stock Experiment":
+        st.write(f"**Chance of ending above the amount invested:** {probability_at_least(result, plan['invested']) * 100:.1f}%")
+    goals = st.session_state.store_session.plans("Savings Goal")
+    if goals:
+        goal = st.selectbox("Savings Goal", goals, format_func=lambda g: g['name'], key=f"simgoal{idx}")
+        remaining = max(goal.get('target', 0) - goal.get('saved', 0), 0)
+        st.write(f"**Chance of covering the ₹{remaining:,.0f} still needed for {goal['name']}:** "
+                 f"{probability_at_least(result, remaining) * 100:.1f}%")
+
+def study_plan():
+    # Cached by the session's scheduler until a task or the hours change
+    hours = float(st.session_state.data.get("study_hours", 2.0))
+    return st.session_state.store_session.study_plan(hours, datetime.date.today())
+
+def study_label(key):
+    node = st.session_state.store_session.schedule.task(key)
+    return f"{node.subject}: {node.task}"
 
-def save_data(data):
-    with open("planner_data.json", "w") as f:
-        json.dump(data, f)
+def record(*ops):
+    # Apply the ops to the session data and append them to the journal
+    session = st.session_state.store_session
+    version = session.version
+    try:
+        session.commit(*ops)
+    except ConflictError:
+        # Positions may have shifted under this session, so redraw everything
+        st.session_state.conflict = True
+        st.rerun()
+    # The commit caught up with other sessions first; a fragment's arguments
+    # (a plan's index, a subject) may no longer match, so redraw everything
+    if session.version != version + len(ops):
+        st.rerun()
+
+def rerun_fragment():
+    # Fragment-scoped reruns are only allowed during the fragment's own rerun
+    try:
+        st.rerun(scope="fragment")
+    except st.errors.StreamlitAPIException:
+        st.rerun()
+
+def log_timing(section, started):
+    ms = (time.perf_counter() - started) * 1000
+    metrics.observe(f"rerun.{section}", ms)
+    if st.session_state.get("show_timings"):
+        st.caption(f"⏱️ {section}: {ms:.1f} ms")
+
+def timed_fragment(func):
+    # An st.fragment whose run time goes to the rerun histograms when profiling
+    @st.fragment
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        if not metrics.enabled():
+            return func(*args, **kwargs)
+        started = time.perf_counter()
+        func(*args, **kwargs)
+        log_timing(func.__name__, started)
+    return wrapper
 
 # --- Initialize session state ---
 if "data" not in st.session_state:
     st.session_state.data = load_data()
+else:
+    # Pick up edits made by other sessions since the last rerun
+    st.session_state.store_session.sync()
 
 def reset_forms():
     st.session_state.pop("finance_type", None)
@@ -37,15 +167,13 @@ if "started" not in st.session_state:
         st.session_state.started = True
     st.stop()
 
+if st.session_state.pop("conflict", False):
+    st.warning("This planner was changed in another session, so your last edit was not applied. The latest data is shown below.")
+
 # --- SECTION 2: Finance Planner ---
 # st.header("💰 Finance Planner")  # Remove this line
 
-finance_types = {
-    "SIP": "Systematic Investment Plan (SIP): Invest a fixed amount regularly to grow your savings.",
-    "Monthly Budget": "Plan your monthly expenses and income.",
-    "Savings Goal": "Set a target amount and track your progress.",
-    "Stock Experiment": "Simulate stock investments and track results."
-}
+finance_types = PLAN_DESCRIPTIONS
 
 # --- Combined Dashboard ---
 st.markdown("""
@@ -213,14 +341,12 @@ for ftype in selected_types:
                 st.session_state.get("finance_type") == ftype and
                 st.session_state.get("edit_finance_idx") == len(st.session_state.data["finance"]) - 1
             ):
-                st.session_state.data["finance"][st.session_state.edit_finance_idx] = entry
-                save_data(st.session_state.data)
+                record(update(["finance", st.session_state.edit_finance_idx], entry))
                 st.success("Plan updated!")
                 reset_forms()
                 st.rerun()
             else:
-                st.session_state.data["finance"].append(entry)
-                save_data(st.session_state.data)
+                record(add(["finance"], entry))
                 reset_forms()
                 st.success("Plan saved!")
                 st.rerun()
@@ -228,95 +354,209 @@ for ftype in selected_types:
             reset_forms()
             st.rerun()
 
+# Each plan card is its own fragment: its widgets rerun only the card, while
+# edits that change the list itself (delete, reorder) still rerun the page.
+@timed_fragment
+def plan_card(idx, plan_count):
+    plan = st.session_state.data["finance"][idx]
+    with st.expander(f"{plan['type']}: {plan['name']}"), metrics.timer(f"render.{plan['type']}"):
+        # The ledger can hold years of transactions; only its size goes in the
+        # summary, the transactions have their own views below
+        details = {k: v for k, v in plan.items() if k != 'ledger'}
+        if 'ledger' in plan:
+            details['ledger'] = f"{len(plan['ledger'].get('date', [])):,} transactions"
+        st.write(details)
+        # Progress bar for Savings Goal
+        if plan['type'] == "Savings Goal":
+            goal = savings_progress(plan)
+            st.write(f"**Progress:** {goal['pct']:.1f}% (₹{goal['saved']:,.0f} / ₹{goal['target']:,.0f})")
+            st.progress(min(goal['pct'] / 100, 1.0))
+        # SIP line chart
+        if plan['type'] == "SIP":
+            df = sip_frame(plan['amount'], plan['rate'], plan['years'])
+            st.line_chart(df)
+            st.caption(f"Projected SIP Value after {plan['years']} years: ₹{df['Value'].iloc[-1]:,.2f}")
+        # Monthly Budget pie chart for categories
+        if plan['type'] == "Monthly Budget":
+            budget_categories(idx)
+        # Stock Experiment bar chart
+        if plan['type'] == "Stock Experiment":
+            with metrics.timer("chart.stock_frame"):
+                stock_df = pd.DataFrame({
+                    "Amount": [plan['invested'], plan['result']]
+                }, index=["Invested", "Current Value"])
+            st.bar_chart(stock_df)
+        # Monte Carlo scenarios
+        if plan['type'] in ("SIP", "Stock Experiment") and st.toggle("🎲 Simulate Scenarios", key=f"sim{idx}"):
+            render_simulation(idx, plan)
+        btn_cols = st.columns([1,1,1,1,8])
+        with btn_cols[0]:
+            if st.button("✏️", key=f"editf{idx}", help="Edit", use_container_width=True):
+                st.session_state.finance_type = plan["type"]
+                st.session_state.edit_finance_idx = idx
+                st.rerun()
+        with btn_cols[1]:
+            if st.button("🗑️", key=f"delf{idx}", help="Delete", use_container_width=True):
+                record(delete(["finance", idx]))
+                st.success("Deleted!")
+                st.rerun()
+        with btn_cols[2]:
+            if st.button("⬆️", key=f"upf{idx}", help="Move Up", use_container_width=True) and idx > 0:
+                record(move(["finance", idx], idx-1))
+                st.rerun()
+        with btn_cols[3]:
+            if st.button("⬇️", key=f"downf{idx}", help="Move Down", use_container_width=True) and idx < plan_count-1:
+                record(move(["finance", idx], idx+1))
+                st.rerun()
+
+@timed_fragment
+def budget_categories(idx):
+    plan = st.session_state.data["finance"][idx]
+    categories = plan.get('categories', {})
+    # Spending rollups are cached per budget until its ledger changes
+    with metrics.timer("chart.ledger_rollups"):
+        rollup = st.session_state.store_session.rollups(idx)
+    if categories:
+        allocated = st.session_state.store_session.aggregates.budget_total(idx)
+        st.write(f"**Allocated:** ₹{allocated:,.0f} of ₹{plan.get('income', 0):,.0f} income")
+    if not categories and rollup.frame.empty:
+        st.info("Add budget categories or transactions below to see allocation chart.")
+    else:
+        with metrics.timer("chart.budget_pie"):
+            if rollup.frame.empty:
+                st.write("**Budget Allocation:**")
+                cat_df = pd.DataFrame({'Category': list(categories.keys()), 'Amount': list(categories.values())})
+            else:
+                st.write("**Spending by Category:**")
+                cat_df = pd.DataFrame({'Category': rollup.by_category.index.astype(str), 'Amount': rollup.by_category.values})
+            st.plotly_chart({
+                "data": [{
+                    "labels": cat_df['Category'],
+                    "values": cat_df['Amount'],
+                    "type": "pie",
+                    "hole": 0.3,
+                }],
+                "layout": {"showlegend": True}
+            }, use_container_width=True)
+    # Add/Edit categories
+    with st.form(f"cat_form_{idx}", clear_on_submit=True):
+        new_cat = st.text_input("Category Name", key=f"catname_{idx}")
+        new_amt = st.number_input("Amount (₹)", min_value=0.0, step=100.0, key=f"catamt_{idx}")
+        add_cat = st.form_submit_button("Add/Update Category")
+        if add_cat and new_cat:
+            if 'categories' in plan:
+                record(update(["finance", idx, "categories", new_cat], new_amt))
+            else:
+                record(update(["finance", idx, "categories"], {new_cat: new_amt}))
+            st.success(f"Category '{new_cat}' updated!")
+            rerun_fragment()
+        # Delete category
+        if categories:
+            del_cat = st.selectbox("Delete Category", options=["-"]+list(categories.keys()), key=f"delcat_{idx}")
+            if del_cat != "-" and st.form_submit_button("Delete Selected Category"):
+                record(delete(["finance", idx, "categories", del_cat]))
+                st.success(f"Category '{del_cat}' deleted!")
+                rerun_fragment()
+    budget_ledger(idx, plan, rollup)
+
+def budget_ledger(idx, plan, rollup):
+    # Runs inside the budget_categories fragment so the pie chart refreshes with it
+    if not rollup.frame.empty:
+        this_month = rollup.monthly.iloc[-1]
+        st.write(f"**Spent in {rollup.monthly.index[-1]:%b %Y}:** ₹{this_month:,.0f} "
+                 f"(3-month average ₹{rollup.rolling.iloc[-1]:,.0f})")
+        st.bar_chart(rollup.by_month_category)
+    with st.form(f"txn_form_{idx}", clear_on_submit=True):
+        cols = st.columns(3)
+        txn_date = cols[0].date_input("Date", key=f"txndate_{idx}")
+        txn_cat = cols[1].text_input("Category", key=f"txncat_{idx}")
+        txn_amt = cols[2].number_input("Amount (₹)", min_value=0.0, step=100.0, key=f"txnamt_{idx}")
+        if st.form_submit_button("Add Transaction") and txn_cat:
+            txn = {"date": txn_date.isoformat(), "category": txn_cat, "amount": txn_amt}
+            if 'ledger' in plan:
+                record(*[add(["finance", idx, "ledger", c], txn[c]) for c in LEDGER_COLUMNS])
+            else:
+                record(update(["finance", idx, "ledger"], {c: [txn[c]] for c in LEDGER_COLUMNS}))
+            rerun_fragment()
+    if not rollup.frame.empty:
+        recent = rollup.frame.iloc[::-1].head(10)
+        st.write("**Recent Transactions:**")
+        st.dataframe(recent, hide_index=True, use_container_width=True)
+        del_txn = st.selectbox("Delete Transaction", options=[None] + list(recent.index), key=f"deltxn_{idx}",
+                               format_func=lambda i: "-" if i is None else
+                               f"{recent.at[i, 'date']:%d %b %Y} · {recent.at[i, 'category']} · ₹{recent.at[i, 'amount']:,.0f}")
+        if del_txn is not None and st.button("Delete Selected Transaction", key=f"deltxnbtn_{idx}"):
+            record(*[delete(["finance", idx, "ledger", c, int(del_txn)]) for c in LEDGER_COLUMNS])
+            rerun_fragment()
+
+def what_if_fields(plan):
+    # Numeric fields a what-if can change; stocks also get an assumed growth rate
+    fields = [f for f, spec in PLAN_FIELDS.get(plan["type"], {}).items() if spec[0] is not str]
+    return fields + ["growth"] if plan["type"] == "Stock Experiment" else fields
+
+@timed_fragment
+def finance_timeline():
+    plans = st.session_state.data["finance"]
+    with st.expander("📈 Combined Timeline", key="open_timeline", on_change="rerun") as timeline_box:
+        if not timeline_box.open:
+            return
+        years = st.slider("Years Ahead", 1, 40, 10, key="timeline_years")
+        # What-ifs live in the session: {name: {id(plan): (plan, {field: value})}}.
+        # Holding the plan dict itself keeps them on that plan however plans are
+        # deleted or moved; ones whose plan was deleted, replaced or changed type
+        # are dropped.
+        what_ifs = st.session_state.setdefault("what_ifs", {})
+        position = {id(p): i for i, p in enumerate(plans)}
+        variants = {name: {position[key]: o for key, (plan, o) in overrides.items()
+                           if key in position and set(o) <= set(what_if_fields(plan))}
+                    for name, overrides in what_ifs.items()}
+        with metrics.timer("chart.timeline"):
+            timelines = compare(plans, variants, years * 12)
+            current = timelines["Current"]
+            months = pd.DatetimeIndex(current.months.astype("datetime64[s]"), name="Month")
+            holdings = pd.DataFrame(current.values.T, index=months,
+                                    columns=[f"{p['type']}: {p['name']}" for p in plans])
+            holdings["Cash"] = current.cash
+        st.area_chart(holdings)
+        st.caption(f"Net worth in {years} years: ₹{current.net_worth[-1]:,.0f} · "
+                   f"monthly surplus after SIPs: ₹{current.cash_flow[0]:,.0f}")
+        for i, month in enumerate(current.goal_months):
+            if plans[i]["type"] == "Savings Goal":
+                reached = f"reached {month.astype(datetime.date):%b %Y}" if month is not None else f"not reached within {years} years"
+                st.write(f"🎯 **{plans[i]['name']}:** {reached}")
+        # --- What-ifs ---
+        plan_idx = st.selectbox("What-if Plan", range(len(plans)), key="whatif_plan",
+                                format_func=lambda i: f"{plans[i]['type']}: {plans[i]['name']}")
+        with st.form("what_if", clear_on_submit=True):
+            cols = st.columns(3)
+            field = cols[0].selectbox("Field", what_if_fields(plans[plan_idx]), key="whatif_field")
+            value = cols[1].number_input("New Value", value=0.0, step=1.0, key="whatif_value")
+            name = cols[2].text_input("Variant Name", help="Reuse a name to change several plans in one variant", key="whatif_name")
+            if st.form_submit_button("Add What-If"):
+                name = name.strip() or f"{plans[plan_idx]['name']} {field} {value:g}"
+                plan = plans[plan_idx]
+                what_ifs.setdefault(name, {}).setdefault(id(plan), (plan, {}))[1][field] = value
+                rerun_fragment()
+        if variants:
+            with metrics.timer("chart.timeline_compare"):
+                net_worth = pd.DataFrame({name: t.net_worth for name, t in timelines.items()}, index=months)
+            st.line_chart(net_worth)
+            st.dataframe(pd.DataFrame([{
+                "Variant": name,
+                "Net Worth": t.net_worth[-1],
+                "vs Current": t.net_worth[-1] - current.net_worth[-1],
+                **{f"🎯 {plans[i]['name']}": None if m is None else m.astype(datetime.date) for i, m in enumerate(t.goal_months)
+                   if plans[i]["type"] == "Savings Goal"},
+            } for name, t in timelines.items()]), hide_index=True, use_container_width=True)
+            if st.button("Clear What-Ifs", key="whatif_clear"):
+                what_ifs.clear()
+                rerun_fragment()
+
 finance_list = st.session_state.data["finance"]
 if finance_list:
-    for idx, plan in enumerate(finance_list):
-        with st.expander(f"{plan['type']}: {plan['name']}"):
-            st.write(plan)
-            # Progress bar for Savings Goal
-            if plan['type'] == "Savings Goal":
-                target = plan.get('target', 0)
-                saved = plan.get('saved', 0)
-                pct = (saved / target * 100) if target else 0
-                st.write(f"**Progress:** {pct:.1f}% (₹{saved:,.0f} / ₹{target:,.0f})")
-                st.progress(pct / 100 if target else 0)
-            # SIP line chart
-            if plan['type'] == "SIP":
-                def sip_growth(amount, rate, years):
-                    months = int(years * 12)
-                    monthly_rate = rate / 12 / 100
-                    values = []
-                    total = 0
-                    for m in range(1, months+1):
-                        total = total * (1 + monthly_rate) + amount
-                        values.append(total)
-                    return values
-                growth = sip_growth(plan['amount'], plan['rate'], plan['years'])
-                df = pd.DataFrame({'Month': list(range(1, len(growth)+1)), 'Value': growth})
-                st.line_chart(df.set_index('Month'))
-                st.caption(f"Projected SIP Value after {plan['years']} years: ₹{growth[-1]:,.2f}")
-            # Monthly Budget pie chart for categories
-            if plan['type'] == "Monthly Budget":
-                categories = plan.get('categories', {})
-                if not categories:
-                    st.info("Add budget categories below to see allocation chart.")
-                else:
-                    cat_df = pd.DataFrame({'Category': list(categories.keys()), 'Amount': list(categories.values())})
-                    st.write("**Budget Allocation:**")
-                    st.plotly_chart({
-                        "data": [{
-                            "labels": cat_df['Category'],
-                            "values": cat_df['Amount'],
-                            "type": "pie",
-                            "hole": 0.3,
-                        }],
-                        "layout": {"showlegend": True}
-                    }, use_container_width=True)
-                # Add/Edit categories
-                with st.form(f"cat_form_{idx}", clear_on_submit=True):
-                    new_cat = st.text_input("Category Name", key=f"catname_{idx}")
-                    new_amt = st.number_input("Amount (₹)", min_value=0.0, step=100.0, key=f"catamt_{idx}")
-                    add_cat = st.form_submit_button("Add/Update Category")
-                    if add_cat and new_cat:
-                        plan.setdefault('categories', {})[new_cat] = new_amt
-                        save_data(st.session_state.data)
-                        st.success(f"Category '{new_cat}' updated!")
-                        st.rerun()
-                    # Delete category
-                    if categories:
-                        del_cat = st.selectbox("Delete Category", options=["-"]+list(categories.keys()), key=f"delcat_{idx}")
-                        if del_cat != "-" and st.form_submit_button("Delete Selected Category"):
-                            del plan['categories'][del_cat]
-                            save_data(st.session_state.data)
-                            st.success(f"Category '{del_cat}' deleted!")
-                            st.rerun()
-            # Stock Experiment bar chart
-            if plan['type'] == "Stock Experiment":
-                st.bar_chart(pd.DataFrame({
-                    "Amount": [plan['invested'], plan['result']]
-                }, index=["Invested", "Current Value"]))
-            btn_cols = st.columns([1,1,1,1,8])
-            with btn_cols[0]:
-                if st.button("✏️", key=f"editf{idx}", help="Edit", use_container_width=True):
-                    st.session_state.finance_type = plan["type"]
-                    st.session_state.edit_finance_idx = idx
-                    st.rerun()
-            with btn_cols[1]:
-                if st.button("🗑️", key=f"delf{idx}", help="Delete", use_container_width=True):
-                    finance_list.pop(idx)
-                    save_data(st.session_state.data)
-                    st.success("Deleted!")
-                    st.rerun()
-            with btn_cols[2]:
-                if st.button("⬆️", key=f"upf{idx}", help="Move Up", use_container_width=True) and idx > 0:
-                    finance_list[idx-1], finance_list[idx] = finance_list[idx], finance_list[idx-1]
-                    save_data(st.session_state.data)
-                    st.rerun()
-            with btn_cols[3]:
-                if st.button("⬇️", key=f"downf{idx}", help="Move Down", use_container_width=True) and idx < len(finance_list)-1:
-                    finance_list[idx+1], finance_list[idx] = finance_list[idx], finance_list[idx+1]
-                    save_data(st.session_state.data)
-                    st.rerun()
+    for idx in range(len(finance_list)):
+        plan_card(idx, len(finance_list))
+    finance_timeline()
 else:
     st.markdown("""
     <div style='text-align:center; margin-top:2em; margin-bottom:2em;'>
@@ -327,37 +567,89 @@ else:
 st.markdown('<hr style="border:1px solid #fff; margin:2em 0;">', unsafe_allow_html=True)
 # --- Learning Section ---
 st.markdown('<div class="section-header" style="color:#fff;text-align:center;">📚 Learning</div>', unsafe_allow_html=True)
+# Overall progress comes straight from the aggregate index. Subject fragments
+# don't rerun this line, so it catches up on the next full-page run.
+overall = task_progress(st.session_state.store_session.aggregates.learning_summary())
+if overall["total"]:
+    st.progress(overall["pct"] / 100)
+    st.markdown(f'<span style="color:#fff;font-size:1.05em;">{overall["done"]} of {overall["total"]} tasks done across all subjects</span>', unsafe_allow_html=True)
 # --- Daily Goals ---
 st.markdown('<div style="margin-bottom:1em;"><b style="color:#fff;">🌞 Daily Goals</b></div>', unsafe_allow_html=True)
-if "daily_goals" not in st.session_state:
-    st.session_state["daily_goals"] = []
-with st.form("add_daily_goal", clear_on_submit=True):
-    new_goal = st.text_input("Add Daily Goal")
-    add_goal = st.form_submit_button("Add Goal")
-    if add_goal and new_goal:
-        st.session_state["daily_goals"].append({"goal": new_goal, "done": False})
-        save_data(st.session_state.data)
-        st.success("Goal added!")
-        st.rerun()
-# Checklist for daily goals
-done_count = 0
-for idx, g in enumerate(st.session_state["daily_goals"]):
-    cols = st.columns([8,1])
-    checked = g["done"]
-    new_checked = cols[0].checkbox(g["goal"], value=checked, key=f"chk_daily_{idx}")
-    if new_checked != checked:
-        st.session_state["daily_goals"][idx]["done"] = new_checked
-        save_data(st.session_state.data)
-        st.rerun()
-    if cols[1].button("🗑️", key=f"del_daily_{idx}"):
-        st.session_state["daily_goals"].pop(idx)
-        save_data(st.session_state.data)
-        st.rerun()
-    if new_checked:
-        done_count += 1
-total_goals = len(st.session_state["daily_goals"])
-st.progress(done_count / total_goals if total_goals > 0 else 0)
-st.markdown(f'<span style="color:#fff;font-size:1.05em;">{done_count} of {total_goals} daily goals completed</span>', unsafe_allow_html=True)
+
+def roll_over_goals():
+    # Close out the checklist's day once the date changes. Runs with every
+    # fragment run, so an open tab rolls over on its first rerun after midnight.
+    for _ in range(2):
+        ops = rollover_ops(st.session_state.data, datetime.date.today())
+        if not ops:
+            return
+        try:
+            st.session_state.store_session.commit(*ops)
+            return
+        except ConflictError:
+            # Another session rolled over first; the commit caught us up
+            continue
+
+@timed_fragment
+def daily_goals():
+    roll_over_goals()
+    data = st.session_state.data
+    with st.form("add_daily_goal", clear_on_submit=True):
+        new_goal = st.text_input("Add Daily Goal")
+        add_goal = st.form_submit_button("Add Goal")
+        if add_goal and new_goal:
+            goal = {"goal": new_goal, "done": False}
+            record(add(["daily_goals"], goal) if "daily_goals" in data else update(["daily_goals"], [goal]))
+            st.success("Goal added!")
+            rerun_fragment()
+    # Checklist for daily goals; keys carry the day so a new day starts unchecked
+    day = data.get("daily_goals_day")
+    for idx, g in enumerate(data.get("daily_goals", [])):
+        cols = st.columns([8,1])
+        checked = g["done"]
+        new_checked = cols[0].checkbox(g["goal"], value=checked, key=f"chk_daily_{day}_{idx}")
+        if new_checked != checked:
+            record(update(["daily_goals", idx, "done"], new_checked))
+            rerun_fragment()
+        if cols[1].button("🗑️", key=f"del_daily_{idx}"):
+            record(delete(["daily_goals", idx]))
+            rerun_fragment()
+    summary = st.session_state.store_session.aggregates.goal_summary()
+    done_count, total_goals = summary["done"], summary["total"]
+    st.progress(done_count / total_goals if total_goals > 0 else 0)
+    st.markdown(f'<span style="color:#fff;font-size:1.05em;">{done_count} of {total_goals} daily goals completed</span>', unsafe_allow_html=True)
+    # Today's share of the study plan can be added to the checklist
+    plan = study_plan()
+    if plan.days and plan.days[0][0] == datetime.date.today():
+        planned = [f"{study_label(key)} ({hours:g}h)" for key, hours in plan.days[0][1]]
+        st.caption("📅 Today's study plan: " + " · ".join(planned))
+        existing = {g["goal"] for g in data.get("daily_goals", [])}
+        new_goals = [{"goal": text, "done": False} for text in planned if text not in existing]
+        if new_goals and st.button("Add Study Plan to Goals", key="plan_to_goals"):
+            if "daily_goals" in data:
+                record(*(add(["daily_goals"], goal) for goal in new_goals))
+            else:
+                record(update(["daily_goals"], new_goals))
+            rerun_fragment()
+    history = data.get("goal_history")
+    if history:
+        stats = goal_stats(history, done_count, total_goals)
+        cols = st.columns(3)
+        cols[0].metric("Streak", f"{stats['current']} days")
+        cols[1].metric("Best Streak", f"{stats['best']} days")
+        cols[2].metric("Last 30 Days", f"{stats['rate'] * 100:.0f}%")
+        if st.toggle("Show goal heatmap", key="goal_heatmap"):
+            with metrics.timer("chart.goal_heatmap"):
+                import altair as alt  # only needed for this chart
+                grid = goal_heatmap(history, done_count, total_goals)
+                cells = grid.rename_axis("Day").reset_index().melt("Day", var_name="Week", value_name="Done")
+                st.altair_chart(alt.Chart(cells).mark_rect().encode(
+                    x=alt.X("Week:T", title=None), y=alt.Y("Day:N", sort=list(grid.index), title=None),
+                    color=alt.Color("Done:Q", scale=alt.Scale(domain=[0, 1], scheme="greens"), legend=None),
+                    tooltip=[alt.Tooltip("Week:T"), "Day:N", alt.Tooltip("Done:Q", format=".0%")]),
+                    use_container_width=True)
+
+daily_goals()
 st.markdown('<hr style="border:1px solid #e65100; margin:1.5em 0;">', unsafe_allow_html=True)
 # Add Subject
 with st.form("add_subject", clear_on_submit=True):
@@ -365,89 +657,208 @@ with st.form("add_subject", clear_on_submit=True):
     add_sub = st.form_submit_button("Add Subject")
     if add_sub and subject:
         if subject not in st.session_state.data["learning"]:
-            st.session_state.data["learning"][subject] = []
-            save_data(st.session_state.data)
+            record(update(["learning", subject], []))
             st.success(f"Added subject: {subject}")
             st.rerun()
         else:
             st.warning("Subject already exists.")
-# List Subjects and Tasks
-subjects = list(st.session_state.data["learning"].keys())
-for idx, subject in enumerate(subjects):
+
+# Each subject is its own fragment, so ticking a task reruns only that subject
+@timed_fragment
+def subject_card(idx, subject, subject_count):
     tasks = st.session_state.data["learning"][subject]
-    with st.expander(f"Subject: {subject}"):
+    with st.expander(f"Subject: {subject}", key=f"open_{subject}", on_change="rerun") as subject_box:
+        # Collapsed subjects build no widgets or charts
+        if not subject_box.open:
+            return
+        counts = st.session_state.store_session.status_counts(subject)
         # --- Progress Calculation ---
-        total_tasks = len(tasks)
-        done_tasks = sum(1 for t in tasks if t["status"] == "Done")
-        progress_pct = (done_tasks / total_tasks * 100) if total_tasks > 0 else 0
-        st.write(f"**Progress:** {progress_pct:.1f}% ({done_tasks}/{total_tasks} tasks done)")
-        st.progress(progress_pct / 100 if total_tasks > 0 else 0)
+        progress = task_progress(counts)
+        total_tasks = progress["total"]
+        st.write(f"**Progress:** {progress['pct']:.1f}% ({progress['done']}/{total_tasks} tasks done)")
+        st.progress(progress['pct'] / 100)
         # --- Status Distribution Chart ---
         if total_tasks > 0:
-            status_counts = {s: 0 for s in ["ToDo", "In Progress", "Done"]}
-            for t in tasks:
-                status_counts[t["status"]] += 1
-            status_df = pd.DataFrame({"Status": list(status_counts.keys()), "Count": list(status_counts.values())})
-            st.write("**Task Status Distribution:**")
-            st.plotly_chart(
-                {
-                    "data": [
-                        {
-                            "labels": status_df["Status"],
-                            "values": status_df["Count"],
-                            "type": "pie",
-                            "hole": 0.3,
-                        }
-                    ],
-                    "layout": {"showlegend": True}
-                },
-                use_container_width=True
-            )
+            with metrics.timer("chart.subject_pie"):
+                status_counts = {s: counts.get(s, 0) for s in TASK_STATUSES}
+                status_df = pd.DataFrame({"Status": list(status_counts.keys()), "Count": list(status_counts.values())})
+                st.write("**Task Status Distribution:**")
+                st.plotly_chart(
+                    {
+                        "data": [
+                            {
+                                "labels": status_df["Status"],
+                                "values": status_df["Count"],
+                                "type": "pie",
+                                "hole": 0.3,
+                            }
+                        ],
+                        "layout": {"showlegend": True}
+                    },
+                    use_container_width=True
+                )
         # --- Bulk Add Tasks ---
         with st.form(f"bulk_add_{subject}", clear_on_submit=True):
             bulk_tasks = st.text_area("Add multiple tasks (one per line)")
             add_bulk = st.form_submit_button("Add Tasks")
             if add_bulk and bulk_tasks.strip():
                 new_tasks = [line.strip() for line in bulk_tasks.splitlines() if line.strip()]
-                st.session_state.data["learning"][subject].extend({"task": t, "status": "ToDo"} for t in new_tasks)
-                save_data(st.session_state.data)
+                record(*(add(["learning", subject], {"task": t, "status": "ToDo"}) for t in new_tasks))
                 st.success(f"Added {len(new_tasks)} tasks!")
-                st.rerun()
+                rerun_fragment()
         # --- Checklist for Tasks ---
-        for tidx, t in enumerate(tasks):
+        filter_cols = st.columns([2,3,1])
+        status_filter = filter_cols[0].selectbox("Show", ["All"] + TASK_STATUSES, key=f"filter_{subject}")
+        query = filter_cols[1].text_input("Search Tasks", key=f"search_{subject}")
+        page_size = filter_cols[2].selectbox("Per Page", PAGE_SIZES, index=1, key=f"pagesize_{subject}")
+        matches = visible_tasks(tasks, status_filter, query)
+        pages = max(1, math.ceil(len(matches) / page_size))
+        page = 1
+        if pages > 1:
+            # Clamp before the widget is built, the list may have shrunk since the last rerun
+            st.session_state[f"page_{subject}"] = min(st.session_state.get(f"page_{subject}", 1), pages)
+            page = st.number_input(f"Page (of {pages})", min_value=1, max_value=pages, step=1, key=f"page_{subject}")
+        window = matches[(page-1)*page_size:page*page_size]
+        if window:
+            st.caption(f"Showing {(page-1)*page_size + 1}–{(page-1)*page_size + len(window)} of {len(matches)} tasks")
+        elif tasks:
+            st.caption("No tasks match this filter.")
+        for tidx in window:
+            t = tasks[tidx]
             checked = t["status"] == "Done"
+            label = t["task"]
+            if "effort" in t:
+                label += f" · {t['effort']:g}h"
+            if t.get("due"):
+                label += f" · due {t['due']}"
             cols = st.columns([10,1])
             with cols[0]:
-                new_checked = st.checkbox(t["task"], value=checked, key=f"chk_{subject}_{tidx}")
+                new_checked = st.checkbox(label, value=checked, key=f"chk_{subject}_{tidx}")
                 if new_checked != checked:
-                    st.session_state.data["learning"][subject][tidx]["status"] = "Done" if new_checked else "ToDo"
-                    save_data(st.session_state.data)
-                    st.rerun()
+                    record(update(["learning", subject, tidx, "status"], "Done" if new_checked else "ToDo"))
+                    rerun_fragment()
             with cols[1]:
                 if st.button("🗑️", key=f"deltask{subject}{tidx}"):
-                    st.session_state.data["learning"][subject].pop(tidx)
-                    save_data(st.session_state.data)
-                    st.rerun()
+                    record(delete(["learning", subject, tidx]))
+                    rerun_fragment()
+        if window:
+            schedule_task(subject, tasks, window)
         # Reorder subjects
         btn_cols = st.columns([1,1,1,1,8])
         with btn_cols[0]:
             if st.button("🗑️", key=f"delsub{subject}", help="Delete Subject", use_container_width=True):
-                st.session_state.data["learning"].pop(subject)
-                save_data(st.session_state.data)
+                record(delete(["learning", subject]))
                 st.success("Subject deleted!")
                 st.rerun()
         with btn_cols[1]:
             if st.button("⬆️", key=f"upsub{idx}", help="Move Up", use_container_width=True) and idx > 0:
-                subjects[idx-1], subjects[idx] = subjects[idx], subjects[idx-1]
-                st.session_state.data["learning"] = {k: st.session_state.data["learning"][k] for k in subjects}
-                save_data(st.session_state.data)
+                record(move(["learning", subject], idx-1))
                 st.rerun()
         with btn_cols[2]:
-            if st.button("⬇️", key=f"downsub{idx}", help="Move Down", use_container_width=True) and idx < len(subjects)-1:
-                subjects[idx+1], subjects[idx] = subjects[idx], subjects[idx+1]
-                st.session_state.data["learning"] = {k: st.session_state.data["learning"][k] for k in subjects}
-                save_data(st.session_state.data)
+            if st.button("⬇️", key=f"downsub{idx}", help="Move Down", use_container_width=True) and idx < subject_count-1:
+                record(move(["learning", subject], idx+1))
                 st.rerun()
+
+def find_prerequisites(query, exclude):
+    # Open tasks in any subject whose text contains the query, a page of them at most
+    query = query.strip().lower()
+    if not query:
+        return []
+    found = []
+    for s, s_tasks in st.session_state.data["learning"].items():
+        for i, other in enumerate(s_tasks):
+            if other["status"] != "Done" and query in other["task"].lower() and (s, i) != exclude:
+                found.append((s, i))
+                if len(found) == PREREQ_MATCHES:
+                    return found
+    return found
+
+def schedule_task(subject, tasks, window):
+    # Effort, due date and prerequisites for one task on the current page
+    learning = st.session_state.data["learning"]
+    if st.session_state.get(f"plantask_{subject}") not in window:
+        st.session_state[f"plantask_{subject}"] = window[0]
+    tidx = st.selectbox("Plan Task", window, format_func=lambda i: tasks[i]["task"], key=f"plantask_{subject}")
+    t = tasks[tidx]
+    # Prerequisites are picked from a search rather than a list of every open task
+    if t.get("after"):
+        study_plan()
+    schedule = st.session_state.store_session.schedule
+    current = [(node.subject, node.index) for node in map(schedule.task, t.get("after", [])) if node is not None]
+    query = st.text_input("Find Prerequisite", key=f"findafter_{subject}_{tidx}",
+                          placeholder="Search open tasks in any subject")
+    picked = st.session_state.get(f"after_{subject}_{tidx}", current)
+    options = list(dict.fromkeys(current + picked + find_prerequisites(query, (subject, tidx))))
+    options = [o for o in options if o[0] in learning and o[1] < len(learning[o[0]])]
+    chosen = st.multiselect("After", options, default=[o for o in current if o in options],
+                            format_func=lambda o: f"{o[0]}: {learning[o[0]][o[1]]['task']}", key=f"after_{subject}_{tidx}")
+    with st.form(f"schedule_{subject}"):
+        cols = st.columns(2)
+        effort = cols[0].number_input("Effort (hours)", min_value=0.0, value=float(t.get("effort", DEFAULT_EFFORT)),
+                                      step=0.5, key=f"effort_{subject}_{tidx}")
+        due = cols[1].date_input("Due", value=datetime.date.fromisoformat(t["due"]) if t.get("due") else None,
+                                 key=f"due_{subject}_{tidx}")
+        if st.form_submit_button("Save Schedule"):
+            ops, ids = [], []
+            for s, i in chosen:
+                other_id = learning[s][i].get("id")
+                if not other_id:
+                    other_id = new_task_id()
+                    ops.append(update(["learning", s, i, "id"], other_id))
+                ids.append(other_id)
+            study_plan()
+            key = task_key(subject, tidx, t)
+            if any(st.session_state.store_session.schedule.depends_on(task_key(s, i, learning[s][i]), key) for s, i in chosen):
+                st.error("Those tasks already wait on this one.")
+                return
+            path = ["learning", subject, tidx]
+            ops.append(update(path + ["effort"], effort))
+            if due:
+                ops.append(update(path + ["due"], due.isoformat()))
+            elif "due" in t:
+                ops.append(delete(path + ["due"]))
+            if ids:
+                ops.append(update(path + ["after"], ids))
+            elif "after" in t:
+                ops.append(delete(path + ["after"]))
+            record(*ops)
+            rerun_fragment()
+
+# List Subjects and Tasks
+subjects = list(st.session_state.data["learning"].keys())
+for idx, subject in enumerate(subjects):
+    subject_card(idx, subject, len(subjects))
+
+# --- Study Plan ---
+@timed_fragment
+def study_schedule():
+    with st.expander("📅 Study Plan", key="open_study_plan", on_change="rerun") as plan_box:
+        if not plan_box.open:
+            return
+        hours = float(st.session_state.data.get("study_hours", 2.0))
+        new_hours = st.number_input("Study Hours per Day", min_value=0.5, max_value=16.0, value=hours, step=0.5, key="study_hours")
+        if new_hours != hours:
+            record(update(["study_hours"], new_hours))
+            rerun_fragment()
+        plan = study_plan()
+        if not plan.days:
+            st.caption("No open tasks to plan. Give tasks an effort and due date under each subject.")
+            return
+        st.caption(f"{len(plan.finish)} tasks planned over {len(plan.days)} study days, "
+                   f"the last finishing {plan.days[-1][0]:%d %b %Y}")
+        if plan.late:
+            st.warning(f"{len(plan.late)} tasks finish after their due date: "
+                       + ", ".join(study_label(key) for key in plan.late[:5]) + ("…" if len(plan.late) > 5 else ""))
+        if plan.blocked:
+            st.error(f"{len(plan.blocked)} tasks wait on each other and can't be planned: "
+                     + ", ".join(study_label(key) for key in plan.blocked[:5]))
+        schedule = st.session_state.store_session.schedule
+        rows = [{"Day": day, "Task": study_label(key), "Hours": hours,
+                 "Due": datetime.date.fromordinal(schedule.task(key).due) if schedule.task(key).due != math.inf else None}
+                for day, items in plan.days[:14] for key, hours in items]
+        st.dataframe(pd.DataFrame(rows), hide_index=True, use_container_width=True)
+
+study_schedule()
 st.markdown('</div>', unsafe_allow_html=True)
 
 # --- Footer ---
@@ -467,4 +878,51 @@ st.markdown("""
 <div class="custom-footer">
     Made with ❤️ using Streamlit. Your data is saved locally in this folder.
 </div>
-""", unsafe_allow_html=True) 
\ No newline at end of file
+""", unsafe_allow_html=True)
+
+# --- Import / Export ---
+def export_text(data, fmt):
+    out = io.StringIO(newline="")
+    (write_csv if fmt == "csv" else write_jsonl)(export_rows(data), out)
+    return out.getvalue()
+
+with st.sidebar.expander("📦 Import / Export"):
+    export_fmt = st.radio("Format", ["csv", "jsonl"], horizontal=True, key="transfer_fmt")
+    data = st.session_state.data
+    st.download_button("⬇️ Export", data=lambda: export_text(data, export_fmt),
+                       file_name=f"planner_export.{export_fmt}", use_container_width=True)
+    st.caption("The download is built in memory; for very large data run "
+               f"`python -m planner --export planner_export.{export_fmt}`, which streams to the file.")
+    upload = st.file_uploader("Import file", type=["csv", "jsonl"], key="import_file")
+    default_kind = st.selectbox("Rows without a kind are", ["(skip)"] + list(KINDS), key="import_kind")
+    if upload is not None and st.button("⬆️ Import", use_container_width=True):
+        fmt = "csv" if upload.name.lower().endswith(".csv") else "jsonl"
+        text = io.TextIOWrapper(upload, encoding="utf-8-sig", newline="")
+        report = import_file(st.session_state.store_session, text, fmt,
+                             None if default_kind == "(skip)" else default_kind)
+        st.session_state["import_report"] = report
+        st.rerun()
+    report = st.session_state.get("import_report")
+    if report:
+        st.success(f"Imported {report.imported} of {report.rows} rows")
+        for line_no, error in report.errors:
+            st.caption(f"Line {line_no}: {error}")
+
+# --- Performance Panel ---
+# Only shown while profiling. Fragment reruns skip everything outside the
+# fragment, including this panel, so it reflects the last full-page run.
+# Profiling is process-wide, so only the deployment turns it on (PLANNER_PROFILE=1).
+if metrics.enabled():
+    log_timing("page", page_started)
+    with st.sidebar.expander("⏱️ Performance"):
+        st.toggle("Show timings inline", key="show_timings")
+        stats = metrics.snapshot()
+        if stats:
+            st.dataframe(pd.DataFrame.from_dict(stats, orient="index"))
+        cols = st.columns(2)
+        if cols[0].button("Write JSON", use_container_width=True):
+            st.caption(f"Wrote {metrics.dump('planner_metrics.json')}")
+        if cols[1].button("Write Prometheus", use_container_width=True):
+            st.caption(f"Wrote {metrics.dump('planner_metrics.prom')}")
+        if st.button("Reset Metrics", use_container_width=True):
+            metrics.reset()
@@ -0,0 +1,280 @@
+"""Planner benchmarks on synthetic datasets.
+
+    python benchmarks/bench.py                      # default scenarios, JSON to stdout
+    python benchmarks/bench.py --out bench.json --repeat 5 --sizes 10 1000 100000
+
+Each scenario generates a dataset (tasks spread over subjects, plans of every
+type), then times storage load/save, SIP projections, plan calculators,
+the cross-plan timeline, Monte Carlo scenarios (serially and on four worker
+processes), progress and status aggregation, and a full app.py run through Streamlit's
+AppTest. Every step is run once more under tracemalloc for its memory peak
+(a separate run, since tracing slows everything it watches).
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from planner import (AggregateIndex, JournalStore, PLAN_FIELDS, TASK_STATUSES, build_timeline, rollups,
+                     sip_growth, sip_growth_batch, summarize, task_progress, update)
+from planner.projections import _sip_growth
+from planner.simulation import _simulate, simulate_sip
+from planner.timeline import _plan_series
+
+# --- Datasets ---
+def make_dataset(tasks, plans, subjects=None, seed=0):
+    """``tasks`` tasks over ``subjects`` subjects and ``plans`` plans cycling through every plan type."""
+    rng = random.Random(seed)
+    subjects = subjects or max(1, tasks // 100)
+    learning = {f"Subject {i}": [] for i in range(subjects)}
+    names = list(learning)
+    for i in range(tasks):
+        learning[names[i % subjects]].append({"task": f"Task {i}", "status": rng.choice(TASK_STATUSES)})
+    types = list(PLAN_FIELDS)
+    finance = []
+    for i in range(plans):
+        plan_type = types[i % len(types)]
+        plan = {"type": plan_type, "name": f"{plan_type} {i}"}
+        for field, (kind, minimum, maximum, _) in PLAN_FIELDS[plan_type].items():
+            if kind is str:
+                plan[field] = f"STOCK{i}"
+            elif kind is int:
+                plan[field] = rng.randint(minimum, maximum or 10000)
+            else:
+                plan[field] = round(rng.uniform(minimum, maximum or 100000.0), 2)
+        if plan_type == "Monthly Budget":
+            plan["categories"] = {c: round(rng.uniform(0, 5000), 2) for c in ("Food", "Rent", "Travel", "Fun")}
+            start = datetime.date(2024, 1, 1)
+            dates = sorted(start + datetime.timedelta(days=rng.randrange(730)) for _ in range(60))
+            plan["ledger"] = {"date": [d.isoformat() for d in dates],
+                              "category": [rng.choice(list(plan["categories"])) for _ in dates],
+                              "amount": [round(rng.uniform(1, 500), 2) for _ in dates]}
+        finance.append(plan)
+    goals = [{"goal": f"Goal {i}", "done": rng.random() < 0.5} for i in range(10)]
+    return {"finance": finance, "learning": learning, "daily_goals": goals}
+
+# --- Steps ---
+# Each step is a function of the scenario workdir and dataset; setup that
+# should not be timed happens outside it.
+def step_save(work, data):
+    store = JournalStore(os.path.join(work, "planner_data.json"))
+    session = store.open()
+    session.reset(data)
+    return lambda: store.save(session)
+
+def step_load(work, data):
+    return lambda: JournalStore(os.path.join(work, "planner_data.json")).open()
+
+def step_save_binary(work, data):
+    store = JournalStore(os.path.join(work, "planner_data.plnb"))
+    session = store.open()
+    session.reset(data)
+    return lambda: store.save(session)
+
+def step_load_binary(work, data):
+    return lambda: JournalStore(os.path.join(work, "planner_data.plnb")).open()
+
+def step_commit(work, data):
+    session = JournalStore(os.path.join(work, "planner_data.json")).open()
+    subject = next(iter(data["learning"]), None)
+    if subject is None or not data["learning"][subject]:
+        return None
+    def run():
+        for i in range(100):
+            session.commit(update(["learning", subject, 0, "status"], TASK_STATUSES[i % len(TASK_STATUSES)]))
+    return run
+
+def step_sip(work, data):
+    sips = [p for p in data["finance"] if p["type"] == "SIP"]
+    def run():
+        _sip_growth.cache_clear()
+        for p in sips:
+            sip_growth(p["amount"], p["rate"], p["years"])
+    return run
+
+def step_sip_batch(work, data):
+    sips = [p for p in data["finance"] if p["type"] == "SIP"]
+    return lambda: sip_growth_batch([p["amount"] for p in sips], [p["rate"] for p in sips], [p["years"] for p in sips])
+
+def step_summaries(work, data):
+    return lambda: [summarize(p) for p in data["finance"]]
+
+def step_ledger_rollups(work, data):
+    budgets = [p for p in data["finance"] if "ledger" in p]
+    return lambda: [rollups(p["ledger"]) for p in budgets]
+
+def step_timeline(work, data):
+    def run():
+        _sip_growth.cache_clear()
+        _plan_series.cache_clear()
+        build_timeline(data["finance"])
+    return run
+
+def step_timeline_what_if(work, data):
+    # One plan changed, every other plan's series comes from the cache
+    if not data["finance"]:
+        return None
+    build_timeline(data["finance"])
+    return lambda: build_timeline(data["finance"], overrides={0: {"growth": random.random()}})
+
+def step_simulation(workers):
+    # 50,000 paths, where the app starts using worker processes. measure()'s
+    # warm-up run starts the pool, so these are warm-pool timings.
+    def make(work, data):
+        sips = [p for p in data["finance"] if p["type"] == "SIP"]
+        if not sips:
+            return None
+        plan = sips[0]
+        def run():
+            _simulate.cache_clear()
+            simulate_sip(plan["amount"], plan["rate"], plan["years"], 15.0, paths=50000, workers=workers)
+        return run
+    return make
+
+def step_aggregate_build(work, data):
+    return lambda: AggregateIndex.build(data)
+
+def step_progress(work, data):
+    # Per-subject progress and status counts straight from the task lists
+    def run():
+        for tasks in data["learning"].values():
+            counts = {}
+            for t in tasks:
+                counts[t["status"]] = counts.get(t["status"], 0) + 1
+            task_progress(counts)
+    return run
+
+STEPS = {
+    "save": step_save,
+    "load": step_load,
+    "save_binary": step_save_binary,
+    "load_binary": step_load_binary,
+    "commit_100": step_commit,
+    "sip_projection": step_sip,
+    "sip_projection_batch": step_sip_batch,
+    "plan_summaries": step_summaries,
+    "ledger_rollups": step_ledger_rollups,
+    "timeline": step_timeline,
+    "timeline_what_if": step_timeline_what_if,
+    "simulation_serial": step_simulation(1),
+    "simulation_4_workers": step_simulation(4),
+    "aggregate_build": step_aggregate_build,
+    "subject_progress": step_progress,
+}
+
+# --- AppTest ---
+def apptest_runs(work, data, timeout):
+    """First-run and rerun timings of app.py against ``data`` in ``work``, plus a rerun's memory peak."""
+    import streamlit as st
+    from streamlit.testing.v1 import AppTest
+    app_dir = os.path.join(work, "app")
+    shutil.copytree(ROOT, app_dir, ignore=shutil.ignore_patterns(".git", "benchmarks", "*.json", "*.journal",
+                                                                 "*.lock", "*.db", "__pycache__"))
+    with open(os.path.join(app_dir, "planner_data.json"), "w") as f:
+        json.dump(data, f)
+    cwd = os.getcwd()
+    os.chdir(app_dir)
+    try:
+        st.cache_resource.clear()
+        st.cache_data.clear()
+        at = AppTest.from_file(os.path.join(app_dir, "app.py"), default_timeout=timeout)
+        at.session_state.started = True
+        started = time.perf_counter()
+        at.run()
+        first = time.perf_counter() - started
+        started = time.perf_counter()
+        at.run()
+        rerun = time.perf_counter() - started
+        tracemalloc.start()
+        at.run()
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        if at.exception:
+            raise RuntimeError(at.exception[0].value)
+    finally:
+        os.chdir(cwd)
+    return {"apptest_first_run": {"ms": round(first * 1000, 3)},
+            "apptest_rerun": {"ms": round(rerun * 1000, 3), "peak_kb": round(peak / 1024, 1)}}
+
+# --- Runner ---
+def measure(func, repeat):
+    # One untimed warm-up run keeps first-use imports out of the numbers
+    func()
+    times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        times.append((time.perf_counter() - started) * 1000)
+    tracemalloc.start()
+    func()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return {"median_ms": round(statistics.median(times), 3), "min_ms": round(min(times), 3),
+            "peak_kb": round(peak / 1024, 1)}
+
+def run_scenario(tasks, plans, repeat, apptest, timeout):
+    data = make_dataset(tasks, plans)
+    result = {"name": f"tasks={tasks},plans={plans}", "tasks": tasks, "subjects": len(data["learning"]),
+              "plans": plans, "steps": {}}
+    work = tempfile.mkdtemp(prefix="planner-bench-")
+    try:
+        for name, make in STEPS.items():
+            func = make(work, data)
+            if func is not None:
+                result["steps"][name] = measure(func, repeat)
+        if apptest:
+            try:
+                result["steps"].update(apptest_runs(work, data, timeout))
+            except RuntimeError as e:
+                # A timeout is itself a result worth tracking
+                result["steps"]["apptest_first_run"] = {"error": str(e)}
+    finally:
+        shutil.rmtree(work, ignore_errors=True)
+    return result
+
+def environment():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                                text=True).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {"timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+            "commit": commit, "python": platform.python_version(), "platform": platform.platform(),
+            "cpus": os.cpu_count()}
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 1000, 10000, 100000],
+                        help="task counts; plans scale from 10 to 1000 alongside")
+    parser.add_argument("--repeat", type=int, default=3, help="timed runs per step (median and min reported)")
+    parser.add_argument("--no-apptest", dest="apptest", action="store_false", help="skip the AppTest script runs")
+    parser.add_argument("--timeout", type=float, default=120, help="AppTest run timeout in seconds")
+    parser.add_argument("--out", help="write JSON here instead of stdout")
+    args = parser.parse_args(argv)
+    scenarios = []
+    for tasks in args.sizes:
+        plans = min(1000, max(10, tasks // 100))
+        print(f"tasks={tasks} plans={plans}", file=sys.stderr)
+        scenarios.append(run_scenario(tasks, plans, args.repeat, args.apptest, args.timeout))
+    report = {"environment": environment(), "repeat": args.repeat, "scenarios": scenarios}
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        sys.stdout.write("\n")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,40 @@
+# The planner core: data model, calculators and storage, with no UI code.
+# Names are re-exported lazily so that ``import planner`` (and the CLI) does
+# not load NumPy or pandas until something that needs them is used.
+import importlib
+
+_EXPORTS = {
+    "planner.aggregates": ["AggregateIndex"],
+    "planner.binary": ["LazyRecords"],
+    "planner.calculators": ["SUMMARIES", "budget_summary", "savings_progress", "sip_summary", "sip_value",
+                            "stock_pnl", "summarize", "task_progress"],
+    "planner.goals": ["goal_heatmap", "goal_stats", "history_arrays", "rollover_ops"],
+    "planner.ledger": ["LEDGER_COLUMNS", "LedgerCache", "Rollups", "ledger_frame", "rollups"],
+    "planner.projections": ["sip_final_value", "sip_growth", "sip_growth_batch"],
+    "planner.scheduler": ["DEFAULT_EFFORT", "SCHEDULE_FIELDS", "StudyPlan", "StudyScheduler", "StudyTask",
+                          "new_task_id", "task_key"],
+    "planner.simulation": ["PERCENTILES", "SimulationResult", "probability_at_least", "simulate_lump_sum",
+                           "simulate_sip"],
+    "planner.schema": ["PLAN_DESCRIPTIONS", "PLAN_FIELDS", "TASK_STATUSES", "coerce", "validate_goal",
+                       "validate_plan", "validate_task", "validate_transaction"],
+    "planner.sqlite_store": ["SQLiteStore"],
+    "planner.storage": ["ConflictError", "JournalStore", "Session", "add", "apply_op", "delete", "convert",
+                        "move", "namespaced_path", "update"],
+    "planner.timeline": ["HORIZON_MONTHS", "Timeline", "apply_what_if", "build_timeline", "compare",
+                         "plan_series"],
+    "planner.transfer": ["KINDS", "ImportReport", "export_rows", "import_file", "read_rows", "write_csv",
+                         "write_jsonl"],
+}
+_MODULES = {name: module for module, names in _EXPORTS.items() for name in names}
+
+__all__ = list(_MODULES)
+
+def __getattr__(name):
+    if name not in _MODULES:
+        raise AttributeError(f"module 'planner' has no attribute {name!r}")
+    value = getattr(importlib.import_module(_MODULES[name]), name)
+    globals()[name] = value
+    return value
+
+def __dir__():
+    return sorted(list(globals()) + __all__)
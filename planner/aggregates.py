@@ -0,0 +1,199 @@
+from planner.scheduler import SCHEDULE_FIELDS
+
+# --- Aggregate index ---
+# Counts the dashboard draws (per-subject task statuses, daily-goal completion,
+# budget category totals, tasks the study plan covers), kept up to date from
+# the same journal ops that mutate the data. observe() must see each op
+# *before* it is applied, since updates and deletes need the value they replace.
+
+class AggregateIndex:
+    def __init__(self, subjects=None, goals=None, budgets=None, scheduled=None):
+        self.subjects = subjects or {}
+        self.goals = goals or {"total": 0, "done": 0}
+        self.budgets = budgets or []
+        # subject -> tasks with scheduling fields; None until counted (indexes
+        # persisted before it was tracked)
+        self.scheduled = scheduled
+        self.totals = {}
+        for counts in self.subjects.values():
+            self._add_counts(self.totals, counts, 1)
+
+    @classmethod
+    def build(cls, data):
+        index = cls(scheduled={})
+        for subject, tasks in data.get("learning", {}).items():
+            index._set_subject(subject, tasks)
+        for goal in data.get("daily_goals", []):
+            index._count_goal(goal, 1)
+        index.budgets = [_budget_total(plan) for plan in data.get("finance", [])]
+        return index
+
+    @classmethod
+    def from_dict(cls, values):
+        return cls(values["subjects"], values["goals"], values["budgets"], values.get("scheduled"))
+
+    def to_dict(self):
+        values = {"subjects": self.subjects, "goals": self.goals, "budgets": self.budgets}
+        if self.scheduled is not None:
+            values["scheduled"] = self.scheduled
+        return values
+
+    # --- Reads ---
+    def status_counts(self, subject=None):
+        if subject is not None:
+            return dict(self.subjects.get(subject, {}))
+        return {name: dict(counts) for name, counts in self.subjects.items()}
+
+    def learning_summary(self):
+        """Task counts by status across every subject."""
+        return dict(self.totals)
+
+    def scheduled_tasks(self, learning):
+        """How many tasks carry scheduling fields (counted from ``learning`` the first time)."""
+        if self.scheduled is None:
+            self.scheduled = {}
+            for subject, tasks in learning.items():
+                self._count_scheduled(subject, sum(map(_scheduled, tasks)))
+        return sum(self.scheduled.values())
+
+    def goal_summary(self):
+        return dict(self.goals)
+
+    def budget_total(self, idx):
+        return self.budgets[idx]
+
+    # --- Updates ---
+    def observe(self, data, op):
+        """Account for ``op`` before it is applied to ``data``.
+
+        Returns False when the op is not one the index understands, in which
+        case the caller should rebuild it after applying the op.
+        """
+        path, kind = op["path"], op["op"]
+        root, rest = path[0], path[1:]
+        if root == "learning" and rest:
+            return self._observe_learning(data["learning"], kind, rest, op)
+        if root == "daily_goals":
+            return self._observe_goals(data.get("daily_goals", []), kind, rest, op)
+        if root == "finance":
+            return self._observe_finance(data["finance"], kind, rest, op)
+        # Other top-level keys (the goal history) don't feed any count
+        return root not in ("learning", "daily_goals", "finance")
+
+    def _observe_learning(self, learning, kind, rest, op):
+        subject = rest[0]
+        if len(rest) == 1:
+            if kind == "update":
+                self._drop_subject(subject)
+                self._set_subject(subject, op["value"])
+            elif kind == "delete":
+                self._drop_subject(subject)
+            elif kind == "add":
+                self._count_task(subject, op["value"].get("status"), 1)
+                self._count_scheduled(subject, _scheduled(op["value"]))
+            return True
+        old = learning[subject][rest[1]]
+        if len(rest) == 2:
+            if kind in ("update", "delete"):
+                self._count_task(subject, old.get("status"), -1)
+                self._count_scheduled(subject, -_scheduled(old))
+            if kind == "update":
+                self._count_task(subject, op["value"].get("status"), 1)
+                self._count_scheduled(subject, _scheduled(op["value"]))
+            return True
+        field = rest[2]
+        if field == "status":
+            self._count_task(subject, old.get("status"), -1)
+            if kind == "update":
+                self._count_task(subject, op["value"], 1)
+        elif field in SCHEDULE_FIELDS and len(rest) == 3:
+            # Still scheduled while any scheduling field is left
+            now = kind == "update" or any(f in old for f in SCHEDULE_FIELDS if f != field)
+            self._count_scheduled(subject, now - _scheduled(old))
+        return True
+
+    def _observe_goals(self, goals, kind, rest, op):
+        if not rest:
+            if kind == "add":
+                self._count_goal(op["value"], 1)
+                return True
+            return False
+        old = goals[rest[0]]
+        if len(rest) == 1:
+            if kind in ("update", "delete"):
+                self._count_goal(old, -1)
+            if kind == "update":
+                self._count_goal(op["value"], 1)
+        elif rest[1] == "done":
+            self.goals["done"] += bool(op.get("value")) - bool(old.get("done"))
+        return True
+
+    def _observe_finance(self, plans, kind, rest, op):
+        if not rest:
+            if kind == "add":
+                self.budgets.append(_budget_total(op["value"]))
+                return True
+            return False
+        idx = rest[0]
+        if len(rest) == 1:
+            if kind == "update":
+                self.budgets[idx] = _budget_total(op["value"])
+            elif kind == "delete":
+                self.budgets.pop(idx)
+            elif kind == "move":
+                self.budgets.insert(op["to"], self.budgets.pop(idx))
+        elif rest[1] == "categories":
+            categories = plans[idx].get("categories", {})
+            if len(rest) == 2:
+                self.budgets[idx] = sum(op["value"].values()) if kind == "update" else 0
+            else:
+                old = categories.get(rest[2], 0)
+                self.budgets[idx] += (op["value"] if kind == "update" else 0) - old
+        return True
+
+    def set_subject(self, subject, counts, scheduled):
+        """Replace a subject's counts with ones counted elsewhere (a database query)."""
+        self._drop_subject(subject)
+        self.subjects[subject] = dict(counts)
+        self._add_counts(self.totals, counts, 1)
+        self._count_scheduled(subject, scheduled)
+
+    # --- Counters ---
+    def _set_subject(self, subject, tasks):
+        self.subjects[subject] = {}
+        scheduled = 0
+        for t in tasks:
+            self._count_task(subject, t.get("status"), 1)
+            scheduled += _scheduled(t)
+        self._count_scheduled(subject, scheduled)
+
+    def _drop_subject(self, subject):
+        self._add_counts(self.totals, self.subjects.pop(subject, {}), -1)
+        if self.scheduled is not None:
+            self.scheduled.pop(subject, None)
+
+    def _count_task(self, subject, status, delta):
+        counts = self.subjects.setdefault(subject, {})
+        self._add_counts(counts, {status: 1}, delta)
+        self._add_counts(self.totals, {status: 1}, delta)
+
+    def _count_scheduled(self, subject, delta):
+        if self.scheduled is not None and delta:
+            self._add_counts(self.scheduled, {subject: 1}, delta)
+
+    def _count_goal(self, goal, delta):
+        self.goals["total"] += delta
+        self.goals["done"] += delta * bool(goal.get("done"))
+
+    @staticmethod
+    def _add_counts(target, counts, sign):
+        for status, n in counts.items():
+            target[status] = target.get(status, 0) + sign * n
+            if not target[status]:
+                del target[status]
+
+def _scheduled(task):
+    return any(field in task for field in SCHEDULE_FIELDS)
+
+def _budget_total(plan):
+    return sum(plan.get("categories", {}).values())
@@ -0,0 +1,239 @@
+import json
+import mmap
+import os
+import struct
+from collections.abc import MutableSequence, Sequence
+
+from planner.schema import PLAN_FIELDS, TASK_STATUSES
+
+# --- Columnar snapshot format (.plnb) ---
+# For large task histories: instead of one JSON dict per task, tasks and plans
+# are stored as columns and memory-mapped on load.
+#
+#   "PLANNER\x01" | u64 meta offset | u64 meta length | arrays ... | meta JSON
+#
+# Arrays (8-byte aligned, little-endian) are located through meta["arrays"]:
+#   strings_data/strings_offsets  UTF-8 string table, string i is data[off[i]:off[i+1]]
+#   task_offsets                  subject s owns tasks task_offsets[s]:task_offsets[s+1]
+#   task_text, task_status        string id and interned status code per task
+#   plan_type, plan_name          interned type code and name string id per plan
+#   plan_numbers, plan_strings    one row per plan, NaN / -1 where a field is absent
+# Anything that doesn't fit a column (extra task fields, budget categories and
+# ledgers, daily goals) rides along in the meta JSON.
+MAGIC = b"PLANNER\x01"
+_HEADER = struct.Struct("<8sQQ")
+
+NUMBER_FIELDS = list(dict.fromkeys(f for fields in PLAN_FIELDS.values() for f, spec in fields.items() if spec[0] is not str))
+STRING_FIELDS = list(dict.fromkeys(f for fields in PLAN_FIELDS.values() for f, spec in fields.items() if spec[0] is str))
+# Windows can't replace a file while it is mapped, and compaction replaces
+# the snapshot under live sessions, so there the file is read into memory
+MAP_FILES = os.name != "nt"
+
+
+class LazyRecords(MutableSequence):
+    """A list of records built from the columns on first access.
+
+    Built records are kept, so edits made through them stick. The first
+    insert or delete turns the whole list into a plain list.
+    """
+
+    def __init__(self, count, build):
+        self._count = count
+        self._build = build
+        self._built = {}
+        self._items = None
+
+    def _materialize(self):
+        if self._items is None:
+            self._items = [self[i] for i in range(self._count)]
+            self._built = self._build = None
+        return self._items
+
+    def __len__(self):
+        return self._count if self._items is None else len(self._items)
+
+    def __getitem__(self, i):
+        if self._items is not None:
+            return self._items[i]
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(self._count))]
+        if i < 0:
+            i += self._count
+        if not 0 <= i < self._count:
+            raise IndexError("record index out of range")
+        record = self._built.get(i)
+        if record is None:
+            record = self._built[i] = self._build(i)
+        return record
+
+    def __setitem__(self, i, value):
+        if self._items is None and isinstance(i, int) and -self._count <= i < self._count:
+            self._built[i % self._count] = value
+        else:
+            self._materialize()[i] = value
+
+    def __delitem__(self, i):
+        del self._materialize()[i]
+
+    def insert(self, i, value):
+        self._materialize().insert(i, value)
+
+    def __eq__(self, other):
+        if not isinstance(other, Sequence) or isinstance(other, (str, bytes)):
+            return NotImplemented
+        return len(self) == len(other) and list(self) == list(other)
+
+    def __repr__(self):
+        return repr(list(self))
+
+
+def to_plain(value):
+    """json.dumps ``default`` hook: lazy record lists serialize as lists."""
+    if isinstance(value, MutableSequence):
+        return list(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+# --- Writing ---
+def dumps(data, seq=0, aggregates=None):
+    """Encode planner data as a .plnb snapshot."""
+    import numpy as np
+
+    strings, string_ids = [], {}
+    def intern(value):
+        if value is None:
+            return -1
+        if value not in string_ids:
+            string_ids[value] = len(strings)
+            strings.append(value)
+        return string_ids[value]
+
+    statuses = list(TASK_STATUSES)
+    subjects = list(data.get("learning", {}))
+    task_offsets = [0]
+    task_text, task_status, task_extras = [], [], {}
+    for subject in subjects:
+        for t in data["learning"][subject]:
+            text, status = t.get("task"), t.get("status")
+            extra = {k: v for k, v in t.items() if k not in ("task", "status")}
+            if not isinstance(text, str) or not isinstance(status, str):
+                extra.update({k: t[k] for k in ("task", "status") if k in t})
+                text, status = None, None
+            elif status not in statuses:
+                statuses.append(status)
+            if extra:
+                task_extras[str(len(task_text))] = extra
+            task_text.append(intern(text))
+            task_status.append(statuses.index(status) if status is not None else 255)
+        task_offsets.append(len(task_text))
+
+    plan_types = list(PLAN_FIELDS)
+    plans = data.get("finance", [])
+    plan_type, plan_name, plan_extras = [], [], {}
+    numbers = np.full((len(plans), len(NUMBER_FIELDS)), np.nan)
+    texts = np.full((len(plans), len(STRING_FIELDS)), -1, dtype=np.int32)
+    int_fields = set(NUMBER_FIELDS)
+    for i, plan in enumerate(plans):
+        kind, name = plan.get("type"), plan.get("name")
+        if kind not in plan_types:
+            plan_types.append(kind)
+        plan_type.append(plan_types.index(kind))
+        plan_name.append(intern(name) if isinstance(name, str) or name is None else -1)
+        fields = PLAN_FIELDS.get(kind, {})
+        extra = {} if isinstance(name, str) or name is None else {"name": name}
+        for key, value in plan.items():
+            if key in ("type", "name"):
+                continue
+            spec = fields.get(key)
+            if spec and spec[0] is str and isinstance(value, str):
+                texts[i, STRING_FIELDS.index(key)] = intern(value)
+            elif spec and spec[0] is not str and isinstance(value, (int, float)) and not isinstance(value, bool):
+                numbers[i, NUMBER_FIELDS.index(key)] = value
+                if not isinstance(value, int):
+                    int_fields.discard(key)
+            else:
+                extra[key] = value
+        if extra:
+            plan_extras[str(i)] = extra
+
+    encoded = [s.encode() for s in strings]
+    arrays = {
+        "strings_data": np.frombuffer(b"".join(encoded), dtype=np.uint8),
+        "strings_offsets": np.cumsum([0] + [len(b) for b in encoded], dtype=np.int64),
+        "task_offsets": np.asarray(task_offsets, dtype=np.int64),
+        "task_text": np.asarray(task_text, dtype=np.int32),
+        "task_status": np.asarray(task_status, dtype=np.uint8),
+        "plan_type": np.asarray(plan_type, dtype=np.uint8),
+        "plan_name": np.asarray(plan_name, dtype=np.int32),
+        "plan_numbers": numbers.ravel(),
+        "plan_strings": texts.ravel(),
+    }
+    body, layout = bytearray(), {}
+    for name, array in arrays.items():
+        array = array.astype(array.dtype.newbyteorder("<"), copy=False)
+        body.extend(b"\0" * (-(len(body) + _HEADER.size) % 8))
+        layout[name] = [len(body) + _HEADER.size, array.dtype.str, len(array)]
+        body.extend(array.tobytes())
+    rest = {k: v for k, v in data.items() if k not in ("finance", "learning")}
+    meta = json.dumps({
+        "seq": seq, "aggregates": aggregates, "arrays": layout, "subjects": subjects, "statuses": statuses,
+        "plan_types": plan_types, "number_fields": NUMBER_FIELDS, "string_fields": STRING_FIELDS,
+        "int_fields": sorted(int_fields), "task_extras": task_extras, "plan_extras": plan_extras, "rest": rest,
+    }, default=to_plain).encode()
+    return _HEADER.pack(MAGIC, _HEADER.size + len(body), len(meta)) + bytes(body) + meta
+
+# --- Reading ---
+def load(path):
+    """(data, seq, aggregates) from a .plnb file, with tasks and plans as lazy views over an mmap."""
+    import numpy as np
+
+    with open(path, "rb") as f:
+        buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if MAP_FILES else f.read()
+    magic, meta_offset, meta_len = _HEADER.unpack_from(buf)
+    if magic != MAGIC:
+        raise ValueError(f"{path} is not a planner snapshot")
+    meta = json.loads(buf[meta_offset:meta_offset + meta_len])
+    cols = {name: np.frombuffer(buf, dtype=dtype, count=count, offset=offset)
+            for name, (offset, dtype, count) in meta["arrays"].items()}
+    strings, offsets = cols["strings_data"], cols["strings_offsets"]
+    def string(i):
+        return None if i < 0 else bytes(strings[offsets[i]:offsets[i + 1]]).decode()
+
+    statuses, task_extras = meta["statuses"], meta["task_extras"]
+    task_text, task_status = cols["task_text"], cols["task_status"]
+    def task_builder(start):
+        def build(i):
+            j = start + i
+            record = {}
+            if task_status[j] != 255:
+                record = {"task": string(int(task_text[j])), "status": statuses[task_status[j]]}
+            record.update(task_extras.get(str(j), {}))
+            return record
+        return build
+    bounds = cols["task_offsets"]
+    learning = {subject: LazyRecords(int(bounds[s + 1] - bounds[s]), task_builder(int(bounds[s])))
+                for s, subject in enumerate(meta["subjects"])}
+
+    plan_types, plan_extras = meta["plan_types"], meta["plan_extras"]
+    number_fields, string_fields = meta["number_fields"], meta["string_fields"]
+    int_fields = set(meta["int_fields"])
+    numbers = cols["plan_numbers"].reshape(-1, len(number_fields) or 1)
+    texts = cols["plan_strings"].reshape(-1, len(string_fields) or 1)
+    plan_type, plan_name = cols["plan_type"], cols["plan_name"]
+    def build_plan(i):
+        kind = plan_types[plan_type[i]]
+        plan = {"type": kind, "name": string(int(plan_name[i]))}
+        for field, spec in PLAN_FIELDS.get(kind, {}).items():
+            if spec[0] is str:
+                value = int(texts[i, string_fields.index(field)])
+                if value >= 0:
+                    plan[field] = string(value)
+            else:
+                value = numbers[i, number_fields.index(field)]
+                if value == value:
+                    plan[field] = int(value) if field in int_fields else float(value)
+        plan.update(plan_extras.get(str(i), {}))
+        return plan
+
+    data = {"finance": LazyRecords(len(plan_type), build_plan), "learning": learning}
+    data.update(meta["rest"])
+    return data, meta["seq"], meta["aggregates"]
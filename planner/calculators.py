@@ -0,0 +1,56 @@
+import math
+
+# --- Plan calculators ---
+# Plain-Python numbers for each plan type, shared by the app and the CLI.
+# Nothing here needs NumPy or pandas, so batch jobs start fast; the monthly
+# series and simulations live in planner.projections / planner.simulation.
+
+def sip_value(amount, rate, years):
+    """Value of a constant-rate SIP after ``years``, contributing at each month end."""
+    months = int(years * 12)
+    monthly_rate = rate / 12 / 100
+    if monthly_rate == 0:
+        return amount * months
+    return amount * math.expm1(months * math.log1p(monthly_rate)) / monthly_rate
+
+def sip_summary(plan):
+    invested = plan.get("amount", 0) * int(plan.get("years", 0) * 12)
+    value = sip_value(plan.get("amount", 0), plan.get("rate", 0), plan.get("years", 0))
+    return {"invested": invested, "value": value, "gain": value - invested}
+
+def savings_progress(plan):
+    target, saved = plan.get("target", 0), plan.get("saved", 0)
+    return {"target": target, "saved": saved, "remaining": max(target - saved, 0),
+            "pct": saved / target * 100 if target else 0}
+
+def stock_pnl(plan):
+    invested, result = plan.get("invested", 0), plan.get("result", 0)
+    return {"invested": invested, "value": result, "gain": result - invested,
+            "pct": (result - invested) / invested * 100 if invested else 0}
+
+def budget_summary(plan):
+    income, expenses = plan.get("income", 0), plan.get("expenses", 0)
+    return {"income": income, "expenses": expenses, "left": income - expenses,
+            "allocated": sum(plan.get("categories", {}).values()),
+            "spent": math.fsum(plan.get("ledger", {}).get("amount", []))}
+
+SUMMARIES = {
+    "SIP": sip_summary,
+    "Monthly Budget": budget_summary,
+    "Savings Goal": savings_progress,
+    "Stock Experiment": stock_pnl,
+}
+
+def summarize(plan):
+    """The plan's type and name plus the numbers its calculator derives."""
+    summary = {"type": plan.get("type"), "name": plan.get("name")}
+    calculator = SUMMARIES.get(plan.get("type"))
+    if calculator is not None:
+        summary.update(calculator(plan))
+    return summary
+
+def task_progress(counts):
+    """Done/total/% from a {status: count} mapping."""
+    total = sum(counts.values())
+    done = counts.get("Done", 0)
+    return {"done": done, "total": total, "pct": done / total * 100 if total else 0}
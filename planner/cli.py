@@ -0,0 +1,100 @@
+import argparse
+import json
+import os
+import sys
+
+from planner import metrics
+from planner.calculators import summarize, task_progress
+from planner.storage import JournalStore, namespaced_path
+from planner.transfer import export_rows, write_csv, write_jsonl
+
+# --- Batch report ---
+# python -m planner [planner_data.json] [--user NAME] [--json] [--metrics FILE]
+# python -m planner planner_data.json --convert planner_data.plnb
+# python -m planner planner_data.json --export planner_export.csv
+# Loads a data file, recomputes every plan's numbers and the learning
+# progress, and prints them without starting Streamlit.
+
+def report(data, aggregates):
+    """Plan summaries, per-subject task progress and daily-goal completion."""
+    return {
+        "plans": [summarize(plan) for plan in data["finance"]],
+        "learning": {subject: task_progress(counts) for subject, counts in aggregates.status_counts().items()},
+        "overall": task_progress(aggregates.learning_summary()),
+        "daily_goals": aggregates.goal_summary(),
+    }
+
+def _plan_line(s):
+    if s["type"] == "SIP":
+        detail = f"value ₹{s['value']:,.0f} on ₹{s['invested']:,.0f} invested (gain ₹{s['gain']:,.0f})"
+    elif s["type"] == "Monthly Budget":
+        detail = (f"income ₹{s['income']:,.0f}, expenses ₹{s['expenses']:,.0f}, "
+                  f"allocated ₹{s['allocated']:,.0f}, spent ₹{s['spent']:,.0f}")
+    elif s["type"] == "Savings Goal":
+        detail = f"{s['pct']:.1f}% of ₹{s['target']:,.0f} (₹{s['remaining']:,.0f} to go)"
+    elif s["type"] == "Stock Experiment":
+        detail = f"₹{s['invested']:,.0f} -> ₹{s['value']:,.0f} ({s['pct']:+.1f}%)"
+    else:
+        detail = ""
+    return f"{s['type']}: {s['name']}  {detail}".rstrip()
+
+def format_report(result):
+    lines = ["Finance"]
+    lines.extend("  " + _plan_line(s) for s in result["plans"])
+    lines.append("Learning")
+    for subject, p in result["learning"].items():
+        lines.append(f"  {subject}: {p['pct']:.1f}% ({p['done']}/{p['total']} tasks done)")
+    overall, goals = result["overall"], result["daily_goals"]
+    lines.append(f"  Overall: {overall['done']} of {overall['total']} tasks done")
+    lines.append(f"Daily goals: {goals['done']} of {goals['total']} completed")
+    return "\n".join(lines)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m planner", description="Print plan projections and progress.")
+    parser.add_argument("path", nargs="?", default="planner_data.json",
+                        help="planner data file (.json, .plnb, or .db for the SQLite backend)")
+    parser.add_argument("--user", default="", help="read this user's data file, as with ?user= in the app")
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    parser.add_argument("--convert", metavar="DST",
+                        help="copy the data (.json, .plnb or .db) to a new .json or .plnb snapshot instead of reporting")
+    parser.add_argument("--export", metavar="FILE",
+                        help="write every record to FILE instead of reporting (.csv for CSV, else JSON Lines)")
+    parser.add_argument("--metrics", metavar="FILE",
+                        help="profile the run and write the timings here (.prom for Prometheus text, else JSON)")
+    args = parser.parse_args(argv)
+    if args.metrics:
+        metrics.enable()
+    path = namespaced_path(args.path, args.user)
+    if args.convert:
+        if not path.endswith((".json", ".plnb", ".db")):
+            parser.error(f"can't convert {path}: expected a .json, .plnb or .db file")
+        if not args.convert.endswith((".json", ".plnb")):
+            parser.error(f"can't convert to {args.convert}: expected a .json or .plnb file")
+    if path.endswith(".db"):
+        from planner.sqlite_store import SQLiteStore
+        if not os.path.exists(path):
+            parser.exit(1, f"{parser.prog}: no planner data at {path}\n")
+        store = SQLiteStore(path)
+    else:
+        store = JournalStore(path)
+        # A journal store may not have written its snapshot yet
+        if not any(os.path.exists(p) for p in (store.path, store.journal_path)):
+            parser.exit(1, f"{parser.prog}: no planner data at {path}\n")
+    if args.convert:
+        JournalStore(args.convert).save(store.open())
+        return
+    session = store.open()
+    if args.export:
+        # Rows go straight to the file, so memory stays flat however much there is
+        with open(args.export, "w", newline="", encoding="utf-8") as f:
+            (write_csv if args.export.endswith(".csv") else write_jsonl)(export_rows(session.data), f)
+        return
+    with metrics.timer("cli.report"):
+        result = report(session.data, session.aggregates)
+    if args.json:
+        json.dump(result, sys.stdout, indent=2)
+        sys.stdout.write("\n")
+    else:
+        print(format_report(result))
+    if args.metrics:
+        metrics.dump(args.metrics)
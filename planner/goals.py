@@ -0,0 +1,92 @@
+import datetime
+
+from planner.storage import add, delete, update
+
+# --- Daily goal history ---
+# data["daily_goals"] is today's checklist and data["daily_goals_day"] the
+# day it belongs to. When the day changes, the finished day's result is
+# appended to data["goal_history"], which is array-backed, one slot per
+# calendar day from "start":
+#   {"start": "2026-10-01", "done": [2, 3, 0, ...], "total": [3, 3, 3, ...]}
+# Days the app wasn't opened count as nothing done. Streaks, completion
+# rates and the heatmap are vectorized over these arrays.
+
+def rollover_ops(data, today):
+    """Journal ops that close out the checklist's day(s) if ``today`` has moved past it."""
+    today_s = today.isoformat()
+    day = data.get("daily_goals_day")
+    if day is None:
+        return [update(["daily_goals_day"], today_s)]
+    if day >= today_s:
+        return []
+    goals = data.get("daily_goals", [])
+    history = data.get("goal_history")
+    last = datetime.date.fromisoformat(day)
+    start = datetime.date.fromisoformat(history["start"]) if history else last
+    end = start + datetime.timedelta(days=len(history["done"]) if history else 0)
+    done, total = [], []
+    # Pad a gap before the checklist's day, then record it and every skipped day
+    # since; days already recorded (say, after the clock went back) are kept.
+    for offset in range((end - last).days, (today - last).days):
+        if offset < 0:
+            done.append(0)
+            total.append(0)
+        else:
+            done.append(sum(bool(g.get("done")) for g in goals) if offset == 0 else 0)
+            total.append(len(goals))
+    # Deleting the day first makes a rollover committed concurrently by another
+    # session conflict with this one instead of recording the day twice
+    ops = [delete(["daily_goals_day"]), update(["daily_goals_day"], today_s)]
+    if history is None:
+        ops.append(update(["goal_history"], {"start": day, "done": done, "total": total}))
+    else:
+        ops.extend(add(["goal_history", "done"], n) for n in done)
+        ops.extend(add(["goal_history", "total"], n) for n in total)
+    ops.extend(update(["daily_goals", i, "done"], False) for i, g in enumerate(goals) if g.get("done"))
+    return ops
+
+def history_arrays(history, today_done=0, today_total=0):
+    """(dates, done, total) arrays for the history plus today's checklist."""
+    import numpy as np
+    done = np.asarray(history.get("done", []) + [today_done], dtype=np.int64) if history else np.asarray([today_done])
+    total = np.asarray(history.get("total", []) + [today_total], dtype=np.int64) if history else np.asarray([today_total])
+    start = np.datetime64(history["start"], "D") if history else np.datetime64(datetime.date.today(), "D")
+    return start + np.arange(len(done)), done, total
+
+def goal_stats(history, today_done=0, today_total=0, window=30):
+    """Current and best streak of fully completed days, and completion rates.
+
+    Today extends the current streak once all its goals are done, but an
+    unfinished today doesn't break it yet.
+    """
+    import numpy as np
+    _, done, total = history_arrays(history, today_done, today_total)
+    complete = (total > 0) & (done >= total)
+    if not complete[-1]:
+        complete = complete[:-1]
+    misses = np.flatnonzero(~complete)
+    current = len(complete) - (misses[-1] + 1 if len(misses) else 0)
+    edges = np.diff(np.concatenate(([0], complete.astype(np.int8), [0])))
+    runs = np.flatnonzero(edges == -1) - np.flatnonzero(edges == 1)
+    recent_total = total[-window:].sum()
+    return {
+        "current": int(current),
+        "best": int(runs.max(initial=0)),
+        "rate": float(done[-window:].sum() / recent_total) if recent_total else 0.0,
+        "rate_all": float(done.sum() / total.sum()) if total.sum() else 0.0,
+        "days": int((total > 0).sum()),
+    }
+
+def goal_heatmap(history, today_done=0, today_total=0, weeks=26):
+    """Completion ratio per day as a weekday x week DataFrame (NaN where there were no goals)."""
+    import numpy as np
+    import pandas as pd
+    dates, done, total = history_arrays(history, today_done, today_total)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ratio = np.where(total > 0, done / total, np.nan)
+    frame = pd.DataFrame({"date": dates.astype("datetime64[s]"), "ratio": ratio})
+    frame = frame[frame["date"] > frame["date"].iloc[-1] - pd.Timedelta(weeks=weeks)]
+    frame["week"] = frame["date"] - pd.to_timedelta(frame["date"].dt.weekday, unit="D")
+    frame["weekday"] = frame["date"].dt.weekday
+    grid = frame.pivot(index="weekday", columns="week", values="ratio")
+    return grid.reindex(range(7)).rename(index=dict(enumerate(["Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"])))
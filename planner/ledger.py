@@ -0,0 +1,82 @@
+from collections import namedtuple
+
+# --- Budget transaction ledger ---
+# A Monthly Budget's transactions live column-wise under plan["ledger"]:
+#   {"date": ["2026-10-01", ...], "category": ["Food", ...], "amount": [120.0, ...]}
+# so adding one is an ``add`` op per column and every rollup is a vectorized
+# group-by over the columns, not a loop over transactions.
+LEDGER_COLUMNS = ("date", "category", "amount")
+# NumPy and pandas are imported on first use, so sessions and the CLI only pay
+# for them when a ledger is actually rolled up.
+
+Rollups = namedtuple("Rollups", "frame monthly rolling by_category by_month_category")
+
+def ledger_frame(ledger):
+    """The ledger as a DataFrame with datetime, categorical and float columns."""
+    import numpy as np
+    import pandas as pd
+    return pd.DataFrame({
+        "date": np.asarray(ledger.get("date", []), dtype="datetime64[D]").astype("datetime64[s]"),
+        "category": pd.Categorical(ledger.get("category", [])),
+        "amount": np.asarray(ledger.get("amount", []), dtype=float),
+    })
+
+def rollups(ledger, window=3):
+    """Monthly totals (with a ``window``-month rolling mean) and category totals.
+
+    Months without transactions count as zero spending, so the rolling mean
+    is over calendar months.
+    """
+    import numpy as np
+    import pandas as pd
+    frame = ledger_frame(ledger)
+    if frame.empty:
+        empty = pd.Series(dtype=float)
+        return Rollups(frame, empty, empty, empty, pd.DataFrame())
+    month = frame["date"].values.astype("datetime64[M]")
+    months = pd.DatetimeIndex(np.arange(month.min(), month.max() + 1).astype("datetime64[s]"), name="Month")
+    monthly = frame.groupby(month)["amount"].sum().reindex(months, fill_value=0.0)
+    by_category = frame.groupby("category", observed=True)["amount"].sum().sort_values(ascending=False)
+    by_month_category = (frame.pivot_table(index=month, columns="category", values="amount",
+                                           aggfunc="sum", fill_value=0.0, observed=True)
+                         .reindex(months, fill_value=0.0))
+    return Rollups(frame, monthly, monthly.rolling(window, min_periods=1).mean(), by_category, by_month_category)
+
+
+class LedgerCache:
+    """Rollups per budget, dropped only when that budget's ledger changes.
+
+    Like the aggregate index, it watches every journal op a session applies,
+    so edits from other sessions invalidate it too.
+    """
+
+    def __init__(self):
+        self._rollups = {}
+
+    def get(self, idx, plan):
+        if idx not in self._rollups:
+            self._rollups[idx] = rollups(plan.get("ledger", {}))
+        return self._rollups[idx]
+
+    def clear(self):
+        self._rollups.clear()
+
+    def observe(self, op):
+        path, kind = op["path"], op["op"]
+        if path[0] != "finance" or not self._rollups:
+            return
+        if len(path) == 1:
+            if kind != "add":
+                self._rollups.clear()
+            return
+        idx = path[1]
+        if len(path) == 2 and kind in ("delete", "move"):
+            # Plans shifted position; carry the cached rollups along
+            positions = list(range(max(max(self._rollups), idx, op.get("to", 0)) + 1))
+            if kind == "delete":
+                positions.pop(idx)
+            else:
+                positions.insert(op["to"], positions.pop(idx))
+            self._rollups = {new: self._rollups[old] for new, old in enumerate(positions) if old in self._rollups}
+        elif len(path) == 2 or path[2] == "ledger":
+            self._rollups.pop(idx, None)
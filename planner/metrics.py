@@ -0,0 +1,143 @@
+import bisect
+import functools
+import json
+import os
+import threading
+import time
+from collections import deque
+
+# --- Hot-path instrumentation ---
+# Opt-in, process-wide timers and byte counters. With profiling off (the
+# default; set PLANNER_PROFILE=1 or call enable()) timer() hands back one
+# shared no-op context and observe() returns straight away, so instrumented
+# code pays a flag check per call.
+#
+# Each metric is a histogram: monotonic count/sum/bucket counters, which is
+# what Prometheus expects, plus a rolling window of recent samples for the
+# percentiles shown in the app.
+MS_BUCKETS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+BYTE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+WINDOW = 500
+
+_enabled = os.environ.get("PLANNER_PROFILE", "") not in ("", "0")
+_lock = threading.Lock()
+_histograms = {}
+
+
+class Histogram:
+    def __init__(self, name, unit, buckets):
+        self.name = name
+        self.unit = unit
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.recent = deque(maxlen=WINDOW)
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.recent.append(value)
+
+    def summary(self):
+        recent = sorted(self.recent)
+        def pct(p):
+            return recent[min(len(recent) - 1, int(p / 100 * len(recent)))] if recent else 0.0
+        return {"unit": self.unit, "count": self.count, "sum": round(self.sum, 3),
+                "p50": round(pct(50), 3), "p95": round(pct(95), 3), "max": round(recent[-1], 3) if recent else 0.0}
+
+
+def enabled():
+    return _enabled
+
+def enable(on=True):
+    global _enabled
+    _enabled = on
+
+def reset():
+    with _lock:
+        _histograms.clear()
+
+def observe(name, value, unit="ms"):
+    if not _enabled:
+        return
+    with _lock:
+        histogram = _histograms.get(name)
+        if histogram is None:
+            histogram = _histograms[name] = Histogram(name, unit, BYTE_BUCKETS if unit == "bytes" else MS_BUCKETS)
+        histogram.observe(value)
+
+def add_bytes(name, n):
+    observe(name, n, "bytes")
+
+class _Timer:
+    __slots__ = ("name", "started")
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        observe(self.name, (time.perf_counter() - self.started) * 1000)
+
+class _NoopTimer:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+_NOOP_TIMER = _NoopTimer()
+
+def timer(name):
+    """Context manager recording the block's wall time under ``name`` (ms)."""
+    return _Timer(name) if _enabled else _NOOP_TIMER
+
+def timed(name):
+    """Decorator form of timer()."""
+    def decorate(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return func(*args, **kwargs)
+            with _Timer(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorate
+
+# --- Reports ---
+def snapshot():
+    """{metric name: count, sum, p50, p95, max and unit} for every metric seen."""
+    with _lock:
+        return {name: h.summary() for name, h in sorted(_histograms.items())}
+
+def to_prometheus():
+    """All metrics in the Prometheus text exposition format."""
+    lines = []
+    with _lock:
+        histograms = sorted(_histograms.items())
+        for name, h in histograms:
+            metric = "planner_" + "".join(c if c.isalnum() else "_" for c in name) + (
+                "_bytes" if h.unit == "bytes" else "_milliseconds")
+            lines.append(f"# TYPE {metric} histogram")
+            cumulative = 0
+            for bound, n in zip(h.buckets, h.counts):
+                cumulative += n
+                lines.append(f'{metric}_bucket{{le="{bound}"}} {cumulative}')
+            lines.append(f'{metric}_bucket{{le="+Inf"}} {h.count}')
+            lines.append(f"{metric}_sum {h.sum}")
+            lines.append(f"{metric}_count {h.count}")
+    return "\n".join(lines) + "\n"
+
+def dump(path):
+    """Write the metrics to ``path``: Prometheus text for .prom files, JSON otherwise."""
+    text = to_prometheus() if path.endswith(".prom") else json.dumps(snapshot(), indent=2)
+    with open(path, "w") as f:
+        f.write(text)
+    return path
@@ -0,0 +1,57 @@
+from functools import lru_cache
+
+import numpy as np
+
+# --- SIP projections ---
+# A SIP grows as V[m] = V[m-1] * (1 + r[m]) + c[m] with the contribution made
+# at the end of each month. With a constant rate and contribution that is the
+# annuity closed form; otherwise, with G = cumprod(1 + r), V = G * cumsum(c / G).
+
+def sip_growth(amount, rate, years, step_up=0.0):
+    """Month-end values of a SIP, memoized on its parameters.
+
+    ``rate`` is an annual % or a sequence of annual %, one per year (the last
+    one carries on if the plan runs longer). ``step_up`` raises the monthly
+    amount by that % every year. The returned array is read-only because it is
+    shared between callers.
+    """
+    rate = tuple(float(r) for r in rate) if np.ndim(rate) else float(rate)
+    return _sip_growth(float(amount), rate, int(years * 12), float(step_up))
+
+@lru_cache(maxsize=1024)
+def _sip_growth(amount, rate, months, step_up):
+    if isinstance(rate, float) and not step_up:
+        values = amount * _annuity_factor(rate / 12 / 100, np.arange(1, months + 1))
+    else:
+        annual = np.atleast_1d(np.asarray(rate, dtype=float))
+        year = np.arange(months) // 12
+        monthly = annual[np.minimum(year, len(annual) - 1)] / 12 / 100
+        contributions = amount * (1 + step_up / 100) ** year
+        growth = np.cumprod(1 + monthly)
+        values = growth * np.cumsum(contributions / growth)
+    values.flags.writeable = False
+    return values
+
+def _annuity_factor(monthly_rate, months):
+    # ((1 + r)^m - 1) / r, using expm1/log1p so tiny rates stay accurate
+    monthly_rate = np.asarray(monthly_rate, dtype=float)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        factor = np.expm1(months * np.log1p(monthly_rate)) / monthly_rate
+    return np.where(monthly_rate == 0, months, factor)
+
+def sip_growth_batch(amounts, rates, years):
+    """Month-end values for many constant-rate SIPs at once.
+
+    Returns one row per plan, padded with NaN past each plan's own term.
+    """
+    amounts = np.asarray(amounts, dtype=float)[:, None]
+    monthly = np.asarray(rates, dtype=float)[:, None] / 12 / 100
+    months = (np.asarray(years, dtype=float) * 12).astype(int)
+    m = np.arange(1, months.max(initial=0) + 1)
+    values = amounts * _annuity_factor(monthly, m)
+    values[m > months[:, None]] = np.nan
+    return values
+
+def sip_final_value(amount, rate, years, step_up=0.0):
+    values = sip_growth(amount, rate, years, step_up)
+    return float(values[-1]) if len(values) else 0.0
@@ -0,0 +1,219 @@
+import datetime
+import heapq
+import math
+import uuid
+from collections import namedtuple
+
+# --- Study scheduler ---
+# Learning tasks may carry an effort estimate, a due date and prerequisites:
+#   {"task": "Ch. 3", "status": "ToDo", "effort": 2.0, "due": "2026-11-01",
+#    "after": ["3f9a1c2e"], "id": "7b0e44d1"}
+# "after" lists the ids of tasks that must be finished first; a task only gets
+# an id once something depends on it. Open tasks are laid out over the coming
+# days, ``capacity`` hours a day, always working on the available task with
+# the earliest latest-finish day (its own due date, or earlier if a dependent
+# needs it sooner). A task may run over several days. Tasks with none of these
+# fields stay a plain checklist and aren't planned.
+DEFAULT_EFFORT = 1.0
+
+StudyTask = namedtuple("StudyTask", "key subject index task effort due after done")
+SCHEDULE_FIELDS = ("effort", "due", "after", "id")
+StudyPlan = namedtuple("StudyPlan", "days finish late blocked")
+
+def new_task_id():
+    return uuid.uuid4().hex[:8]
+
+def task_key(subject, index, task):
+    """Tasks are addressed by id where they have one, by position otherwise."""
+    return task.get("id") or (subject, index)
+
+def _study_task(subject, index, task):
+    # None for a plain checklist task
+    if not any(field in task for field in SCHEDULE_FIELDS):
+        return None
+    due = task.get("due")
+    return StudyTask(task_key(subject, index, task), subject, index, task.get("task"),
+                     float(task.get("effort", DEFAULT_EFFORT)),
+                     datetime.date.fromisoformat(due).toordinal() if due else math.inf,
+                     tuple(dict.fromkeys(task.get("after", ()))), task.get("status") == "Done")
+
+
+class StudyScheduler:
+    """Day-by-day study plan over every subject, updated incrementally.
+
+    Like the ledger cache, it watches the journal ops a session applies and
+    only re-reads the tasks they touch. Latest-finish days are then
+    recomputed for those tasks and their prerequisites alone; the day-by-day
+    fill is one heap pass over the open tasks.
+    """
+
+    def __init__(self):
+        self._nodes = {}
+        self._keys = {}            # subject -> node keys by position (None if unplanned)
+        self._dependents = {}      # key -> keys of tasks listing it in "after"
+        self._latest = {}          # key -> latest finish day (ordinal)
+        self._dirty_subjects = None  # None: everything
+        self._dirty_tasks = set()
+        self._capacity = None
+        self._plan = None
+
+    def observe(self, op):
+        path, kind = op["path"], op["op"]
+        if path[0] != "learning" or self._dirty_subjects is None:
+            return
+        if len(path) == 1:
+            self._dirty_subjects = None
+        elif len(path) == 2 or kind in ("add", "move") or (len(path) == 3 and kind == "delete"):
+            # The subject was replaced, or its tasks shifted position
+            self._dirty_subjects.add(path[1])
+        else:
+            self._dirty_tasks.add((path[1], path[2]))
+        self._plan = None
+
+    # --- Reads ---
+    def plan(self, learning, capacity, start):
+        """StudyPlan for ``learning`` from ``start`` (a date) at ``capacity`` hours a day.
+
+        days is [(date, [(key, hours), ...])], finish maps keys to the day
+        they are done, late lists tasks finishing after their due date and
+        blocked those waiting on a dependency cycle.
+        """
+        if capacity <= 0:
+            raise ValueError("capacity must be positive")
+        self._refresh(learning, capacity)
+        if self._plan is None or self._plan[0] != (capacity, start):
+            self._plan = ((capacity, start), self._fill(learning, capacity, start))
+        return self._plan[1]
+
+    def task(self, key):
+        return self._nodes.get(key)
+
+    def depends_on(self, key, other):
+        """Whether the task ``key`` already has ``other`` among its (transitive) prerequisites."""
+        seen, stack = set(), [key]
+        while stack:
+            k = stack.pop()
+            if k == other:
+                return True
+            if k not in seen and k in self._nodes:
+                seen.add(k)
+                stack.extend(self._nodes[k].after)
+        return False
+
+    # --- Incremental updates ---
+    def _refresh(self, learning, capacity):
+        changed = set()
+        if self._dirty_subjects is None:
+            self._nodes, self._keys, self._dependents, self._latest = {}, {}, {}, {}
+            subjects = set(learning)
+        else:
+            subjects = self._dirty_subjects
+        for subject in subjects:
+            for key in self._keys.pop(subject, []):
+                changed.update(self._remove(key))
+            keys = self._keys[subject] = []
+            for index, task in enumerate(learning.get(subject, [])):
+                keys.append(self._add(_study_task(subject, index, task)))
+            changed.update(key for key in keys if key is not None)
+        for subject, index in self._dirty_tasks:
+            if subject in subjects or subject not in learning or index >= len(learning[subject]):
+                continue
+            changed.update(self._remove(self._keys[subject][index]))
+            key = self._keys[subject][index] = self._add(_study_task(subject, index, learning[subject][index]))
+            if key is not None:
+                changed.add(key)
+        self._dirty_subjects, self._dirty_tasks = set(), set()
+        if capacity != self._capacity:
+            self._capacity = capacity
+            changed = set(self._nodes)
+        if changed:
+            self._update_latest(changed)
+
+    def _add(self, node):
+        if node is None:
+            return None
+        self._nodes[node.key] = node
+        for before in node.after:
+            self._dependents.setdefault(before, set()).add(node.key)
+        return node.key
+
+    def _remove(self, key):
+        # Returns the prerequisites, whose latest finish may now relax
+        node = self._nodes.pop(key, None)
+        if node is None:  # unplanned, or a duplicate id already removed
+            return ()
+        self._latest.pop(key, None)
+        for before in node.after:
+            self._dependents.get(before, set()).discard(key)
+        return node.after
+
+    def _days(self, node):
+        return math.ceil(node.effort / self._capacity) if node.effort > 0 else 0
+
+    def _update_latest(self, changed):
+        # Only the changed tasks and their prerequisites can move. Settle them
+        # dependents first (Kahn's algorithm over that subgraph); tasks on a
+        # cycle never settle and keep their own due date.
+        affected, stack = set(), list(changed)
+        while stack:
+            key = stack.pop()
+            if key in self._nodes and key not in affected:
+                affected.add(key)
+                stack.extend(self._nodes[key].after)
+        waiting = {key: sum(d in affected for d in self._dependents.get(key, ())) for key in affected}
+        ready = [key for key, n in waiting.items() if not n]
+        while ready:
+            key = ready.pop()
+            latest = self._nodes[key].due
+            for d in self._dependents.get(key, ()):
+                dependent = self._nodes.get(d)
+                if dependent is not None and not dependent.done:
+                    latest = min(latest, self._latest.get(d, dependent.due) - self._days(dependent))
+            self._latest[key] = latest
+            waiting.pop(key)
+            for before in self._nodes[key].after:
+                if before in waiting:
+                    waiting[before] -= 1
+                    if not waiting[before]:
+                        ready.append(before)
+        for key in waiting:
+            self._latest[key] = self._nodes[key].due
+
+    # --- Scheduling ---
+    def _fill(self, learning, capacity, start):
+        order = {subject: i for i, subject in enumerate(learning)}
+        nodes = self._nodes
+        def entry(key):
+            node = nodes[key]
+            return (self._latest[key], node.due, order.get(node.subject, 0), node.index, str(key))
+        open_keys = [key for key, node in nodes.items() if not node.done]
+        blockers = {key: sum(b in nodes and not nodes[b].done for b in nodes[key].after) for key in open_keys}
+        heap = [entry(key) for key, n in blockers.items() if not n]
+        heapq.heapify(heap)
+        keys = {str(key): key for key in open_keys}
+        remaining = {key: nodes[key].effort for key in open_keys}
+        day, left, today, days, finish = start.toordinal(), capacity, [], [], {}
+        while heap:
+            key = keys[heap[0][-1]]
+            hours = min(remaining[key], left)
+            if hours > 0:
+                today.append((key, hours))
+            remaining[key] -= hours
+            left -= hours
+            if remaining[key] <= 1e-9:
+                heapq.heappop(heap)
+                finish[key] = datetime.date.fromordinal(day)
+                for d in self._dependents.get(key, ()):
+                    if d in blockers:
+                        blockers[d] -= 1
+                        if not blockers[d]:
+                            heapq.heappush(heap, entry(d))
+            if left <= 1e-9:
+                if today:
+                    days.append((datetime.date.fromordinal(day), today))
+                day, left, today = day + 1, capacity, []
+        if today:
+            days.append((datetime.date.fromordinal(day), today))
+        late = [key for key, done in finish.items() if done.toordinal() > nodes[key].due]
+        blocked = [key for key in open_keys if key not in finish]
+        return StudyPlan(days, finish, late, blocked)
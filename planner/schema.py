@@ -0,0 +1,115 @@
+import datetime
+import math
+
+# --- Plan and task schemas ---
+# Mirrors the fields and bounds of the "Add ... Plan" forms in app.py:
+# field -> (type, minimum, maximum, default)
+PLAN_FIELDS = {
+    "SIP": {
+        "amount": (float, 0.0, None, 0.0),
+        "rate": (float, 0.0, 20.0, 0.0),
+        "years": (int, 1, 50, 1),
+    },
+    "Monthly Budget": {
+        "income": (float, 0.0, None, 0.0),
+        "expenses": (float, 0.0, None, 0.0),
+    },
+    "Savings Goal": {
+        "target": (float, 0.0, None, 0.0),
+        "saved": (float, 0.0, None, 0.0),
+    },
+    "Stock Experiment": {
+        "stock": (str, None, None, ""),
+        "invested": (float, 0.0, None, 0.0),
+        "result": (float, 0.0, None, 0.0),
+    },
+}
+
+PLAN_DESCRIPTIONS = {
+    "SIP": "Systematic Investment Plan (SIP): Invest a fixed amount regularly to grow your savings.",
+    "Monthly Budget": "Plan your monthly expenses and income.",
+    "Savings Goal": "Set a target amount and track your progress.",
+    "Stock Experiment": "Simulate stock investments and track results."
+}
+
+TASK_STATUSES = ["ToDo", "In Progress", "Done"]
+
+def coerce(value, kind, minimum=None, maximum=None, field="value"):
+    """Convert ``value`` (possibly a CSV string) to ``kind`` and check its bounds."""
+    if kind is str:
+        return str(value)
+    try:
+        number = kind(float(value)) if kind is int else kind(value)
+    except (TypeError, ValueError, OverflowError):
+        raise ValueError(f"{field} must be a number, got {value!r}")
+    if not math.isfinite(number):
+        raise ValueError(f"{field} must be a finite number, got {value!r}")
+    if kind is int and float(value) != number:
+        raise ValueError(f"{field} must be a whole number, got {value!r}")
+    if minimum is not None and number < minimum:
+        raise ValueError(f"{field} must be at least {minimum}, got {number}")
+    if maximum is not None and number > maximum:
+        raise ValueError(f"{field} must be at most {maximum}, got {number}")
+    return number
+
+def validate_plan(record):
+    """A plan entry shaped like the ones the finance forms save, or ValueError."""
+    plan_type = record.get("type")
+    if plan_type not in PLAN_FIELDS:
+        raise ValueError(f"unknown plan type {plan_type!r}")
+    plan = {"type": plan_type, "name": str(record.get("name", ""))}
+    for field, (kind, minimum, maximum, default) in PLAN_FIELDS[plan_type].items():
+        value = record.get(field, default)
+        plan[field] = coerce(value, kind, minimum, maximum, field)
+    if "categories" in record:
+        if plan_type != "Monthly Budget":
+            raise ValueError("only Monthly Budget plans have categories")
+        plan["categories"] = {str(name): coerce(amount, float, 0.0, None, f"category {name!r}")
+                              for name, amount in record["categories"].items()}
+    return plan
+
+def validate_task(record):
+    task = record.get("task")
+    if not task:
+        raise ValueError("task text is missing")
+    status = record.get("status", "ToDo")
+    if status not in TASK_STATUSES:
+        raise ValueError(f"status must be one of {', '.join(TASK_STATUSES)}, got {status!r}")
+    task = {"task": str(task), "status": status}
+    # Optional scheduling fields, see planner.scheduler
+    if record.get("effort") is not None:
+        task["effort"] = coerce(record["effort"], float, 0.0, None, "effort")
+    if record.get("due"):
+        try:
+            task["due"] = datetime.date.fromisoformat(str(record["due"])[:10]).isoformat()
+        except ValueError:
+            raise ValueError(f"due must be YYYY-MM-DD, got {record['due']!r}")
+    after = record.get("after")
+    if isinstance(after, str):
+        after = after.split(";")
+    if after:
+        task["after"] = [str(a).strip() for a in after if str(a).strip()]
+    if record.get("id"):
+        task["id"] = str(record["id"])
+    return task
+
+def validate_goal(record):
+    goal = record.get("goal")
+    if not goal:
+        raise ValueError("goal text is missing")
+    done = record.get("done", False)
+    if isinstance(done, str):
+        done = done.strip().lower() in ("1", "true", "yes", "y", "done")
+    return {"goal": str(goal), "done": bool(done)}
+
+def validate_transaction(record):
+    """A ledger entry: an ISO date, a category and an amount spent."""
+    try:
+        date = datetime.date.fromisoformat(str(record.get("date", ""))[:10])
+    except ValueError:
+        raise ValueError(f"date must be YYYY-MM-DD, got {record.get('date')!r}")
+    category = record.get("category")
+    if not category:
+        raise ValueError("category is missing")
+    return {"date": date.isoformat(), "category": str(category),
+            "amount": coerce(record.get("amount"), float, None, None, "amount")}
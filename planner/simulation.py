@@ -0,0 +1,117 @@
+import atexit
+import multiprocessing
+import threading
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import lru_cache
+
+import numpy as np
+
+PERCENTILES = (5, 50, 95)
+
+# months: checkpoint months (year ends and the final month)
+# bands: one row per entry in PERCENTILES, one column per checkpoint
+# final: sorted simulated values at the last month
+SimulationResult = namedtuple("SimulationResult", "months bands mean final")
+
+# --- Monte Carlo scenarios ---
+# Paths are stepped month by month as vectors over a chunk of paths, so the
+# working set while stepping is chunk_size paths. Exact percentiles need every
+# path's value at every checkpoint, so those are kept: paths x checkpoints
+# floats in all (20,000 paths over 30 years is about 5 MB).
+
+def simulate_sip(amount, rate, years, volatility, paths=20000, model="lognormal",
+                 step_up=0.0, seed=0, chunk_size=4096, workers=1):
+    """Simulated month-end values of a SIP with random monthly returns.
+
+    ``rate`` and ``volatility`` are annual %; ``model`` is "lognormal" or
+    "normal". Results are memoized on the arguments, which is why the seed is
+    fixed by default.
+    """
+    return _simulate(0.0, float(amount), float(rate), int(years * 12), float(volatility), int(paths),
+                     model, float(step_up), seed, int(chunk_size), int(workers))
+
+def simulate_lump_sum(value, rate, years, volatility, paths=20000, model="lognormal",
+                      seed=0, chunk_size=4096, workers=1):
+    """Simulated value of a single holding (e.g. a Stock Experiment) over time."""
+    return _simulate(float(value), 0.0, float(rate), int(years * 12), float(volatility), int(paths),
+                     model, 0.0, seed, int(chunk_size), int(workers))
+
+def probability_at_least(result, target):
+    """Share of simulated paths that end at or above ``target``."""
+    if not len(result.final):
+        return 0.0
+    return 1 - np.searchsorted(result.final, target, side="left") / len(result.final)
+
+@lru_cache(maxsize=64)
+def _simulate(initial, amount, rate, months, volatility, paths, model, step_up, seed, chunk_size, workers):
+    if model not in ("lognormal", "normal"):
+        raise ValueError(f"Unknown return model: {model}")
+    checkpoints = np.unique(np.append(np.arange(12, months + 1, 12), months)) if months else np.array([], int)
+    sizes = [min(chunk_size, paths - start) for start in range(0, paths, chunk_size)]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    args = [(s, n, initial, amount, rate, months, volatility, model, step_up, checkpoints)
+            for s, n in zip(seeds, sizes)]
+    if workers > 1 and len(args) > 1:
+        pool = _pool(workers)
+        try:
+            chunks = list(pool.map(_simulate_chunk, *zip(*args)))
+        except BrokenProcessPool:
+            # A worker died; the next run starts a fresh pool
+            with _pools_lock:
+                _pools.pop(workers, None)
+            raise
+    else:
+        chunks = [_simulate_chunk(*a) for a in args]
+    values = np.concatenate(chunks) if chunks else np.empty((0, len(checkpoints)))
+    if values.shape[0] and values.shape[1]:
+        bands = np.percentile(values, PERCENTILES, axis=0)
+        mean = values.mean(axis=0)
+        final = np.sort(values[:, -1])
+    else:
+        bands = np.empty((len(PERCENTILES), len(checkpoints)))
+        mean = np.empty(len(checkpoints))
+        final = np.empty(0)
+    for arr in (checkpoints, bands, mean, final):
+        arr.flags.writeable = False
+    return SimulationResult(checkpoints, bands, mean, final)
+
+# Starting worker processes takes about a second, so pools are kept for the
+# life of the process, one per worker count
+_pools = {}
+_pools_lock = threading.Lock()
+
+def _pool(workers):
+    with _pools_lock:
+        pool = _pools.get(workers)
+        if pool is None:
+            # Spawned, not forked: the app's process has threads (Streamlit's, the
+            # journal writer's) whose locks a forked child could inherit held
+            pool = _pools[workers] = ProcessPoolExecutor(
+                max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+            atexit.register(pool.shutdown)
+        return pool
+
+def _simulate_chunk(seed, n, initial, amount, rate, months, volatility, model, step_up, checkpoints):
+    rng = np.random.default_rng(seed)
+    monthly_mean = rate / 12 / 100
+    monthly_sd = volatility / 100 / np.sqrt(12)
+    if model == "lognormal":
+        # Log returns chosen so the expected monthly growth is still 1 + mean
+        mu = np.log1p(monthly_mean) - monthly_sd ** 2 / 2
+    out = np.empty((n, len(checkpoints)))
+    values = np.full(n, initial)
+    col = 0
+    for m in range(months):
+        shock = rng.standard_normal(n)
+        if model == "lognormal":
+            factor = np.exp(mu + monthly_sd * shock)
+        else:
+            factor = np.maximum(1 + monthly_mean + monthly_sd * shock, 0.0)
+        values *= factor
+        values += amount * (1 + step_up / 100) ** (m // 12)
+        if col < len(checkpoints) and checkpoints[col] == m + 1:
+            out[:, col] = values
+            col += 1
+    return out
@@ -0,0 +1,556 @@
+import json
+import os
+import sqlite3
+import threading
+from collections.abc import MutableSequence, Sequence
+from contextlib import contextmanager
+
+from planner import metrics
+from planner.aggregates import AggregateIndex
+from planner.binary import to_plain
+from planner.scheduler import SCHEDULE_FIELDS
+from planner.storage import ConflictError, JournalStore, Session, _clone, _conflicts, apply_op
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value INTEGER NOT NULL);
+INSERT OR IGNORE INTO meta VALUES ('version', 0), ('base', 0);
+CREATE TABLE IF NOT EXISTS ops (seq INTEGER PRIMARY KEY, op TEXT NOT NULL);
+
+CREATE TABLE IF NOT EXISTS plans (
+    id INTEGER PRIMARY KEY,
+    position INTEGER NOT NULL,
+    type TEXT,
+    name TEXT,
+    fields TEXT NOT NULL DEFAULT '{}'
+);
+CREATE INDEX IF NOT EXISTS plans_position ON plans (position);
+CREATE INDEX IF NOT EXISTS plans_type ON plans (type, position);
+
+CREATE TABLE IF NOT EXISTS budget_categories (
+    plan_id INTEGER NOT NULL REFERENCES plans (id) ON DELETE CASCADE,
+    name TEXT NOT NULL,
+    amount REAL,
+    position INTEGER NOT NULL,
+    PRIMARY KEY (plan_id, name)
+);
+
+CREATE TABLE IF NOT EXISTS subjects (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE,
+    position INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS subjects_position ON subjects (position);
+
+CREATE TABLE IF NOT EXISTS tasks (
+    id INTEGER PRIMARY KEY,
+    subject_id INTEGER NOT NULL REFERENCES subjects (id) ON DELETE CASCADE,
+    position INTEGER NOT NULL,
+    task TEXT,
+    status TEXT,
+    fields TEXT NOT NULL DEFAULT '{}'
+);
+CREATE INDEX IF NOT EXISTS tasks_subject_position ON tasks (subject_id, position);
+CREATE INDEX IF NOT EXISTS tasks_subject_status ON tasks (subject_id, status);
+
+CREATE TABLE IF NOT EXISTS daily_goals (
+    id INTEGER PRIMARY KEY,
+    position INTEGER NOT NULL,
+    goal TEXT,
+    done INTEGER,
+    fields TEXT NOT NULL DEFAULT '{}'
+);
+CREATE INDEX IF NOT EXISTS daily_goals_position ON daily_goals (position);
+
+CREATE TABLE IF NOT EXISTS extras (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+"""
+
+PLAN_COLUMNS = ("type", "name")
+TASK_COLUMNS = ("task", "status")
+GOAL_COLUMNS = ("goal", "done")
+
+# Tasks carrying any scheduling field, counted in SQL like the aggregate index does
+SCHEDULED = " OR ".join(f"json_type(t.fields, '$.{field}') IS NOT NULL" for field in SCHEDULE_FIELDS)
+
+def _split(record, columns, skip=()):
+    extra = {k: v for k, v in record.items() if k not in columns and k not in skip}
+    return [record.get(c) for c in columns], json.dumps(extra)
+
+
+class SubjectTasks(MutableSequence):
+    """A subject's task list, read from the database the first time it is used.
+
+    Until then only its length is known, which is all a collapsed subject
+    card needs.
+    """
+
+    def __init__(self, count, load):
+        self.count = count
+        self._load = load
+        self._items = None
+
+    @property
+    def loaded(self):
+        return self._items is not None
+
+    def _tasks(self):
+        if self._items is None:
+            self._items = self._load()
+            self._load = None
+        return self._items
+
+    def __len__(self):
+        return self.count if self._items is None else len(self._items)
+
+    def __getitem__(self, i):
+        return self._tasks()[i]
+
+    def __setitem__(self, i, value):
+        self._tasks()[i] = value
+
+    def __delitem__(self, i):
+        del self._tasks()[i]
+
+    def insert(self, i, value):
+        self._tasks().insert(i, value)
+
+    def __eq__(self, other):
+        if not isinstance(other, Sequence) or isinstance(other, (str, bytes)):
+            return NotImplemented
+        return len(self) == len(other) and list(self) == list(other)
+
+    def __repr__(self):
+        return repr(list(self))
+
+
+class SQLiteSession(Session):
+    """A Session whose subjects' tasks stay in the database until read."""
+
+    def __init__(self, store):
+        super().__init__(store)
+        # subject -> version its tasks were read at, when ahead of self.version
+        self.loaded_at = {}
+
+    def reset(self, data, aggregates=None):
+        super().reset(data, aggregates)
+        self.loaded_at = {}
+
+
+class SQLiteStore:
+    """Same Session interface as JournalStore, backed by an indexed SQLite file.
+
+    Journal ops are translated into row-level statements (a reorder is a
+    couple of position updates), and the ops table doubles as the change log
+    other sessions replay to catch up.
+    """
+
+    def __init__(self, path="planner_data.db", import_from=None, keep_ops=1000):
+        self.path = path
+        self.keep_ops = keep_ops
+        self._lock = threading.RLock()
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute("PRAGMA foreign_keys=ON")
+        self._db.execute("PRAGMA busy_timeout=5000")
+        self._db.executescript(SCHEMA)
+        if import_from and os.path.exists(import_from):
+            with self._transaction() as db:
+                empty = not db.execute("SELECT 1 FROM plans UNION ALL SELECT 1 FROM subjects LIMIT 1").fetchone()
+                if empty and self._versions(db)[0] == 0:
+                    self._replace(db, JournalStore(import_from).load(), 0)
+
+    @contextmanager
+    def _transaction(self, mode="IMMEDIATE"):
+        with self._lock:
+            # Reading a subject's tasks during a commit joins its transaction
+            if self._db.in_transaction:
+                yield self._db
+                return
+            self._db.execute(f"BEGIN {mode}")
+            try:
+                yield self._db
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+            self._db.execute("COMMIT")
+
+    # --- Session interface ---
+    @metrics.timed("storage.open")
+    def open(self):
+        session = SQLiteSession(self)
+        with self._transaction("DEFERRED") as db:
+            self._reload(db, session)
+        return session
+
+    def load(self):
+        return self.open().data
+
+    @metrics.timed("storage.sync")
+    def sync(self, session):
+        with self._lock:
+            if self._versions(self._db)[0] == session.version:
+                return
+            with self._transaction("DEFERRED") as db:
+                self._catch_up(db, session)
+
+    @metrics.timed("storage.commit")
+    def commit(self, session, ops):
+        if not ops:
+            return
+        with self._transaction() as db:
+            foreign = self._catch_up(db, session)
+            if foreign is None:
+                raise ConflictError("planner data was replaced by another session")
+            if any(_conflicts(op, other) for op in ops for other in foreign):
+                raise ConflictError("planner data was changed by another session")
+            try:
+                for op in ops:
+                    session.apply(op)
+            except (KeyError, IndexError):
+                self._reload(db, session)
+                raise ConflictError("planner data was changed by another session")
+            version = session.version
+            for op in ops:
+                self._execute(db, op)
+                version += 1
+                text = json.dumps(op, default=to_plain)
+                db.execute("INSERT INTO ops VALUES (?, ?)", (version, text))
+                metrics.add_bytes("storage.bytes_written", len(text))
+            base = self._versions(db)[1]
+            if version - base > 2 * self.keep_ops:
+                base = version - self.keep_ops
+                db.execute("DELETE FROM ops WHERE seq <= ?", (base,))
+            self._set_versions(db, version, base)
+            session.version = version
+
+    @metrics.timed("storage.save")
+    def save(self, session):
+        with self._transaction() as db:
+            version = self._versions(db)[0] + 1
+            # Read every subject still in the database before the tables are cleared
+            self._replace(db, _clone(session.data), version)
+            session.version = version
+
+    # --- Indexed queries ---
+    def status_counts(self, session=None, subject=None):
+        """{subject: {status: count}} from a GROUP BY over the status index.
+
+        With ``subject``, just that subject's {status: count}.
+        """
+        counts = {}
+        with self._lock:
+            if subject is not None:
+                return dict(self._db.execute(
+                    "SELECT t.status, COUNT(*) FROM tasks t JOIN subjects s ON s.id = t.subject_id "
+                    "WHERE s.name = ? GROUP BY t.status", (subject,)))
+            rows = self._db.execute(
+                "SELECT s.name, t.status, COUNT(*) FROM tasks t JOIN subjects s ON s.id = t.subject_id "
+                "GROUP BY t.subject_id, t.status"
+            ).fetchall()
+        for subject, status, count in rows:
+            counts.setdefault(subject, {})[status] = count
+        return counts
+
+    def plans(self, session=None, plan_type=None):
+        with self._lock:
+            if plan_type is None:
+                return self._read_plans(self._db, "1", ())
+            return self._read_plans(self._db, "type = ?", (plan_type,))
+
+    # --- Versions and reload ---
+    def _versions(self, db):
+        values = dict(db.execute("SELECT key, value FROM meta"))
+        return values["version"], values["base"]
+
+    def _set_versions(self, db, version, base):
+        db.executemany("UPDATE meta SET value = ? WHERE key = ?", [(version, "version"), (base, "base")])
+
+    def _catch_up(self, db, session):
+        # Returns the ops the session hadn't seen, or None if it had to be reloaded
+        version, base = self._versions(db)
+        if session.version < base:
+            self._reload(db, session)
+            return None
+        foreign, recount = [], set()
+        for seq, text in db.execute("SELECT seq, op FROM ops WHERE seq > ? ORDER BY seq", (session.version,)).fetchall():
+            op = json.loads(text)
+            if self._replay(session, seq, op, recount):
+                foreign.append(op)
+        learning = session.data["learning"]
+        for subject in recount & learning.keys():
+            counts, scheduled = self._subject_counts(db, "s.name = ?", (subject,))
+            session.aggregates.set_subject(subject, counts.get(subject, {}), scheduled.get(subject, 0))
+        session.version = version
+        return foreign
+
+    def _replay(self, session, seq, op, recount):
+        # Task ops on a subject whose tasks haven't been read, or were read
+        # after the op, are already in what the database returns; those only
+        # get the subject's counts re-read. Returns False for ops the session's
+        # tasks already showed.
+        path, kind = op["path"], op["op"]
+        if path[0] == "learning" and len(path) > 1:
+            subject = path[1]
+            tasks = session.data["learning"].get(subject)
+            if len(path) > 2 or kind == "add":
+                if isinstance(tasks, SubjectTasks) and not tasks.loaded:
+                    tasks.count += (kind == "add" and len(path) == 2) - (kind == "delete" and len(path) == 3)
+                    session.schedule.observe(op)
+                    recount.add(subject)
+                    return True
+                if seq <= session.loaded_at.get(subject, 0):
+                    session.schedule.observe(op)
+                    recount.add(subject)
+                    return False
+            elif kind in ("update", "delete"):
+                session.loaded_at.pop(subject, None)
+        elif path == ["learning"]:
+            session.loaded_at.clear()
+        session.apply(op)
+        return True
+
+    def _reload(self, db, session):
+        # Plans, goals and the rest are read in full; each subject's tasks wait
+        # in the database until something reads them, and its counts come from SQL
+        data = {"finance": self._read_plans(db, "1", ()), "learning": {}}
+        for name, count in db.execute(
+                "SELECT s.name, COUNT(t.id) FROM subjects s LEFT JOIN tasks t ON t.subject_id = s.id "
+                "GROUP BY s.id ORDER BY s.position"):
+            data["learning"][name] = SubjectTasks(count, self._task_loader(session, name))
+        goals = [{"goal": goal, "done": bool(done), **json.loads(fields)} for goal, done, fields in db.execute(
+            "SELECT goal, done, fields FROM daily_goals ORDER BY position")]
+        if goals:
+            data["daily_goals"] = goals
+        for key, value in db.execute("SELECT key, value FROM extras"):
+            data[key] = json.loads(value)
+        aggregates = AggregateIndex.build({k: v for k, v in data.items() if k != "learning"}).to_dict()
+        aggregates["subjects"], aggregates["scheduled"] = self._subject_counts(db, "1", ())
+        session.reset(data, aggregates)
+        session.version = self._versions(db)[0]
+
+    def _task_loader(self, session, subject):
+        def load():
+            with self._transaction("DEFERRED") as db:
+                version = self._versions(db)[0]
+                tasks = [{"task": task, "status": status, **json.loads(fields)} for task, status, fields in db.execute(
+                    "SELECT t.task, t.status, t.fields FROM tasks t JOIN subjects s ON s.id = t.subject_id "
+                    "WHERE s.name = ? ORDER BY t.position", (subject,))]
+            # Read ahead of the session: catching up must skip the ops these include
+            if version > session.version:
+                session.loaded_at[subject] = version
+            return tasks
+        return load
+
+    def _subject_counts(self, db, where, params):
+        # ({subject: {status: count}}, {subject: scheduled tasks}) for the matching subjects
+        counts, scheduled = {}, {}
+        for subject, status, count, planned in db.execute(
+                f"SELECT s.name, t.status, COUNT(t.id), SUM({SCHEDULED}) FROM subjects s "
+                f"LEFT JOIN tasks t ON t.subject_id = s.id WHERE {where} GROUP BY s.id, t.status", params):
+            counts.setdefault(subject, {})
+            if count:
+                counts[subject][status] = count
+            if planned:
+                scheduled[subject] = scheduled.get(subject, 0) + planned
+        return counts, scheduled
+
+    def _read_plans(self, db, where, params):
+        rows = db.execute(f"SELECT id, type, name, fields FROM plans WHERE {where} ORDER BY position", params).fetchall()
+        categories = {}
+        for pid, name, amount in db.execute(
+                "SELECT plan_id, name, amount FROM budget_categories "
+                f"WHERE plan_id IN (SELECT id FROM plans WHERE {where}) ORDER BY plan_id, position", params):
+            categories.setdefault(pid, {})[name] = amount
+        plans = []
+        for pid, plan_type, name, fields in rows:
+            plan = {"type": plan_type, "name": name, **json.loads(fields)}
+            if pid in categories:
+                plan["categories"] = categories[pid]
+            plans.append(plan)
+        return plans
+
+    def _replace(self, db, data, version):
+        for table in ("plans", "budget_categories", "subjects", "tasks", "daily_goals", "extras", "ops"):
+            db.execute(f"DELETE FROM {table}")
+        for pos, plan in enumerate(data.get("finance", [])):
+            self._insert_plan(db, pos, plan)
+        for pos, (name, tasks) in enumerate(data.get("learning", {}).items()):
+            self._insert_subject(db, pos, name, tasks)
+        for pos, goal in enumerate(data.get("daily_goals", [])):
+            self._insert_row(db, "daily_goals", GOAL_COLUMNS, {}, pos, goal)
+        db.executemany("INSERT INTO extras VALUES (?, ?)",
+                       [(key, json.dumps(value, default=to_plain)) for key, value in data.items()
+                        if key not in ("finance", "learning", "daily_goals")])
+        self._set_versions(db, version, version)
+
+    # --- Inserts ---
+    def _insert_row(self, db, table, columns, scope, pos, record, skip=()):
+        values, fields = _split(record, columns, skip)
+        names = list(scope) + ["position", *columns, "fields"]
+        marks = ", ".join("?" * len(names))
+        cur = db.execute(f"INSERT INTO {table} ({', '.join(names)}) VALUES ({marks})",
+                         [*scope.values(), pos, *values, fields])
+        return cur.lastrowid
+
+    def _insert_plan(self, db, pos, plan):
+        pid = self._insert_row(db, "plans", PLAN_COLUMNS, {}, pos, plan, skip=("categories",))
+        if "categories" in plan:
+            self._replace_categories(db, pid, plan["categories"])
+
+    def _replace_categories(self, db, pid, categories):
+        db.execute("DELETE FROM budget_categories WHERE plan_id = ?", (pid,))
+        db.executemany("INSERT INTO budget_categories VALUES (?, ?, ?, ?)",
+                       [(pid, name, amount, pos) for pos, (name, amount) in enumerate(categories.items())])
+
+    def _insert_subject(self, db, pos, name, tasks):
+        sid = db.execute("INSERT INTO subjects (name, position) VALUES (?, ?)", (name, pos)).lastrowid
+        for tpos, task in enumerate(tasks):
+            self._insert_row(db, "tasks", TASK_COLUMNS, {"subject_id": sid}, tpos, task)
+
+    # --- Positional lists ---
+    def _count(self, db, table, scope):
+        where, params = self._where(scope)
+        return db.execute(f"SELECT COUNT(*) FROM {table} WHERE {where}", params).fetchone()[0]
+
+    def _row_id(self, db, table, scope, pos):
+        where, params = self._where(scope)
+        row = db.execute(f"SELECT id FROM {table} WHERE {where} AND position = ?", [*params, pos]).fetchone()
+        if row is None:
+            raise IndexError(pos)
+        return row[0]
+
+    def _delete_at(self, db, table, scope, pos):
+        where, params = self._where(scope)
+        db.execute(f"DELETE FROM {table} WHERE {where} AND position = ?", [*params, pos])
+        db.execute(f"UPDATE {table} SET position = position - 1 WHERE {where} AND position > ?", [*params, pos])
+
+    def _move(self, db, table, scope, src, dst):
+        where, params = self._where(scope)
+        row_id = self._row_id(db, table, scope, src)
+        if dst < src:
+            db.execute(f"UPDATE {table} SET position = position + 1 WHERE {where} AND position >= ? AND position < ?",
+                       [*params, dst, src])
+        elif dst > src:
+            db.execute(f"UPDATE {table} SET position = position - 1 WHERE {where} AND position > ? AND position <= ?",
+                       [*params, src, dst])
+        db.execute(f"UPDATE {table} SET position = ? WHERE id = ?", (dst, row_id))
+
+    def _where(self, scope):
+        if not scope:
+            return "1", []
+        return " AND ".join(f"{k} = ?" for k in scope), list(scope.values())
+
+    def _update_row(self, db, table, columns, row_id, record, skip=()):
+        values, fields = _split(record, columns, skip)
+        assignments = ", ".join(f"{c} = ?" for c in columns)
+        db.execute(f"UPDATE {table} SET {assignments}, fields = ? WHERE id = ?", [*values, fields, row_id])
+
+    def _set_field(self, db, table, columns, row_id, key, value, remove=False):
+        if key in columns:
+            db.execute(f"UPDATE {table} SET {key} = ? WHERE id = ?", (None if remove else value, row_id))
+            return
+        fields = json.loads(db.execute(f"SELECT fields FROM {table} WHERE id = ?", (row_id,)).fetchone()[0])
+        if remove:
+            fields.pop(key, None)
+        else:
+            fields[key] = value
+        db.execute(f"UPDATE {table} SET fields = ? WHERE id = ?", (json.dumps(fields), row_id))
+
+    # --- Op translation ---
+    def _execute(self, db, op):
+        path = op["path"]
+        if path[0] == "finance":
+            self._plan_op(db, op, path[1:])
+        elif path[0] == "learning":
+            self._subject_op(db, op, path[1:])
+        elif path[0] == "daily_goals" and len(path) == 1 and op["op"] == "update":
+            db.execute("DELETE FROM daily_goals")
+            for pos, goal in enumerate(op["value"]):
+                self._insert_row(db, "daily_goals", GOAL_COLUMNS, {}, pos, goal)
+        elif path[0] == "daily_goals":
+            self._list_op(db, op, path[1:], "daily_goals", GOAL_COLUMNS, {})
+        else:
+            self._extra_op(db, op)
+
+    def _extra_op(self, db, op):
+        # Any other top-level key (the goal history, the checklist's day) is
+        # stored as one JSON value
+        key = op["path"][0]
+        if len(op["path"]) == 1 and op["op"] == "delete":
+            db.execute("DELETE FROM extras WHERE key = ?", (key,))
+            return
+        row = db.execute("SELECT value FROM extras WHERE key = ?", (key,)).fetchone()
+        holder = {key: json.loads(row[0])} if row else {}
+        apply_op(holder, op)
+        db.execute("INSERT OR REPLACE INTO extras VALUES (?, ?)", (key, json.dumps(holder[key], default=to_plain)))
+
+    def _list_op(self, db, op, rest, table, columns, scope):
+        # Ops on a positional list of flat records: tasks, daily goals
+        kind = op["op"]
+        if not rest and kind == "add":
+            self._insert_row(db, table, columns, scope, self._count(db, table, scope), op["value"])
+        elif len(rest) == 1 and kind == "update":
+            self._update_row(db, table, columns, self._row_id(db, table, scope, rest[0]), op["value"])
+        elif len(rest) == 1 and kind == "delete":
+            self._delete_at(db, table, scope, rest[0])
+        elif len(rest) == 1 and kind == "move":
+            self._move(db, table, scope, rest[0], op["to"])
+        elif len(rest) == 2 and kind in ("update", "delete"):
+            row_id = self._row_id(db, table, scope, rest[0])
+            self._set_field(db, table, columns, row_id, rest[1], op.get("value"), remove=kind == "delete")
+        else:
+            raise ValueError(f"SQLite store cannot apply {kind} at {op['path']}")
+
+    def _plan_op(self, db, op, rest):
+        kind = op["op"]
+        if len(rest) == 1 and kind == "update":
+            pid = self._row_id(db, "plans", {}, rest[0])
+            self._update_row(db, "plans", PLAN_COLUMNS, pid, op["value"], skip=("categories",))
+            self._replace_categories(db, pid, op["value"].get("categories", {}))
+        elif not rest and kind == "add":
+            self._insert_plan(db, self._count(db, "plans", {}), op["value"])
+        elif len(rest) == 2 and rest[1] == "categories":
+            pid = self._row_id(db, "plans", {}, rest[0])
+            self._replace_categories(db, pid, op["value"] if kind == "update" else {})
+        elif len(rest) == 3 and rest[1] == "categories":
+            pid = self._row_id(db, "plans", {}, rest[0])
+            if kind == "update":
+                db.execute(
+                    "INSERT INTO budget_categories VALUES (?, ?, ?, "
+                    "(SELECT COALESCE(MAX(position) + 1, 0) FROM budget_categories WHERE plan_id = ?)) "
+                    "ON CONFLICT (plan_id, name) DO UPDATE SET amount = excluded.amount",
+                    (pid, rest[2], op["value"], pid))
+            elif kind == "delete":
+                db.execute("DELETE FROM budget_categories WHERE plan_id = ? AND name = ?", (pid, rest[2]))
+            else:
+                raise ValueError(f"SQLite store cannot apply {kind} at {op['path']}")
+        elif len(rest) > 2:
+            # Nested plan fields (a budget's ledger columns) live in the fields JSON
+            pid = self._row_id(db, "plans", {}, rest[0])
+            fields = json.loads(db.execute("SELECT fields FROM plans WHERE id = ?", (pid,)).fetchone()[0])
+            apply_op(fields, dict(op, path=rest[1:]))
+            db.execute("UPDATE plans SET fields = ? WHERE id = ?", (json.dumps(fields), pid))
+        else:
+            self._list_op(db, op, rest, "plans", PLAN_COLUMNS, {})
+
+    def _subject_op(self, db, op, rest):
+        kind = op["op"]
+        if len(rest) == 1 and kind != "add":
+            row = db.execute("SELECT id, position FROM subjects WHERE name = ?", (rest[0],)).fetchone()
+            if kind == "update":
+                pos = self._count(db, "subjects", {})
+                if row is not None:
+                    pos = row[1]
+                    db.execute("DELETE FROM subjects WHERE id = ?", (row[0],))
+                self._insert_subject(db, pos, rest[0], op["value"])
+            elif row is None:
+                raise KeyError(rest[0])
+            elif kind == "delete":
+                self._delete_at(db, "subjects", {}, row[1])
+            elif kind == "move":
+                self._move(db, "subjects", {}, row[1], op["to"])
+            return
+        row = db.execute("SELECT id FROM subjects WHERE name = ?", (rest[0],)).fetchone()
+        if row is None:
+            raise KeyError(rest[0])
+        self._list_op(db, op, rest[1:], "tasks", TASK_COLUMNS, {"subject_id": row[0]})
@@ -0,0 +1,626 @@
+import atexit
+import bisect
+import hashlib
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+import uuid
+from collections.abc import MutableSequence
+from contextlib import contextmanager
+
+from planner import binary, metrics
+from planner.aggregates import AggregateIndex
+from planner.ledger import LedgerCache
+from planner.scheduler import StudyPlan, StudyScheduler
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+DEFAULT_DATA = {"finance": [], "learning": {}}
+# Seconds a deferred store waits before writing: after the last commit for
+# "debounced", after the first unwritten one for "interval"
+DURABILITY_DELAYS = {"immediate": 0, "debounced": 0.5, "interval": 5.0}
+
+# --- Journal operations ---
+# Every mutation is a small record addressed by a path into the data dict:
+#   add    -> append "value" to the list at "path"
+#   update -> set the key/index at "path" to "value"
+#   delete -> remove the key/index at "path"
+#   move   -> move the key/index at "path" to position "to"
+def add(path, value):
+    return {"op": "add", "path": list(path), "value": value}
+
+def update(path, value):
+    return {"op": "update", "path": list(path), "value": value}
+
+def delete(path):
+    return {"op": "delete", "path": list(path)}
+
+def move(path, to):
+    return {"op": "move", "path": list(path), "to": to}
+
+def _resolve(data, path):
+    for key in path:
+        data = data[key]
+    return data
+
+def _clone(value):
+    # Journal values are plain JSON data (or lazy record lists standing in for
+    # JSON lists), so this is all deepcopy needs to do
+    if isinstance(value, dict):
+        return {k: _clone(v) for k, v in value.items()}
+    if isinstance(value, MutableSequence):
+        return [_clone(v) for v in value]
+    return value
+
+def apply_op(data, op):
+    kind = op["op"]
+    if kind == "add":
+        _resolve(data, op["path"]).append(_clone(op["value"]))
+        return
+    parent = _resolve(data, op["path"][:-1])
+    key = op["path"][-1]
+    if kind == "update":
+        parent[key] = _clone(op["value"])
+    elif kind == "delete":
+        del parent[key]
+    elif kind == "move":
+        if isinstance(parent, MutableSequence):
+            parent.insert(op["to"], parent.pop(key))
+        else:
+            keys = [k for k in parent if k != key]
+            keys.insert(op["to"], key)
+            items = [(k, parent.pop(k)) for k in keys]
+            parent.update(items)
+    else:
+        raise ValueError(f"Unknown journal op: {kind}")
+
+def _conflicts(op, other):
+    # Deleting or moving an entry shifts list positions (and deleting drops a
+    # dict key), so an op addressed through that container may now point at
+    # the wrong item. Plain updates merge, last writer wins.
+    if other["op"] not in ("delete", "move"):
+        return False
+    parent, key = other["path"][:-1], other["path"][-1]
+    path = op["path"]
+    if len(path) <= len(parent) or path[:len(parent)] != parent:
+        return False
+    if isinstance(key, int):
+        return True
+    return other["op"] == "delete" and path[len(parent)] == key
+
+
+class ConflictError(Exception):
+    """Raised when a commit targets data another session has since moved or deleted."""
+
+
+# --- File helpers ---
+def namespaced_path(path, user=""):
+    """Per-user data file next to ``path``, e.g. planner_data.alice.json."""
+    if not user:
+        return path
+    root, ext = os.path.splitext(path)
+    slug = re.sub(r"[^A-Za-z0-9_-]", "_", user)
+    if slug != user:
+        slug += "-" + hashlib.sha1(user.encode()).hexdigest()[:8]
+    return f"{root}.{slug}{ext}"
+
+@contextmanager
+def _file_lock(path):
+    with open(path, "a+") as f:
+        if fcntl is not None:
+            fcntl.flock(f, fcntl.LOCK_EX)
+        else:
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_UN)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+def _write_atomic(path, text):
+    tmp = path + ".tmp"
+    with open(tmp, "wb" if isinstance(text, bytes) else "w") as f:
+        f.write(text)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+    metrics.add_bytes("storage.bytes_written", len(text))
+
+def _signature(stat):
+    return (stat.st_ino, stat.st_size, stat.st_mtime_ns)
+
+
+# --- Journal store ---
+class Session:
+    """One browser session's copy of the data and the journal version it reflects."""
+
+    def __init__(self, store):
+        self.store = store
+        self.data = None
+        self.aggregates = None
+        self.ledgers = None
+        self.schedule = None
+        self.version = 0
+
+    def apply(self, op):
+        # Keep the aggregate index in step with the data
+        exact = self.aggregates.observe(self.data, op)
+        self.ledgers.observe(op)
+        self.schedule.observe(op)
+        apply_op(self.data, op)
+        if not exact:
+            self.aggregates = AggregateIndex.build(self.data)
+
+    def reset(self, data, aggregates=None):
+        # Replace the data in place, other code holds on to this dict
+        if self.data is None:
+            self.data = data
+        else:
+            self.data.clear()
+            self.data.update(data)
+        self.aggregates = AggregateIndex.from_dict(aggregates) if aggregates else AggregateIndex.build(self.data)
+        self.ledgers = LedgerCache()
+        self.schedule = StudyScheduler()
+
+    def sync(self):
+        self.store.sync(self)
+
+    def commit(self, *ops):
+        self.store.commit(self, ops)
+
+    def save(self):
+        self.store.save(self)
+
+    def status_counts(self, subject=None):
+        return self.store.status_counts(self, subject)
+
+    def plans(self, plan_type=None):
+        return self.store.plans(self, plan_type)
+
+    def rollups(self, idx):
+        return self.ledgers.get(idx, self.data["finance"][idx])
+
+    def study_plan(self, capacity, start):
+        learning = self.data.get("learning", {})
+        # Plain checklists have nothing to plan; skip reading every task
+        if not self.aggregates.scheduled_tasks(learning):
+            self.schedule = StudyScheduler()
+            return StudyPlan([], {}, [], [])
+        return self.schedule.plan(learning, capacity, start)
+
+
+class JournalStore:
+    """Snapshot file plus an append-only journal of ops applied on top of it.
+
+    Each op carries a sequence number, and the journal starts with a header
+    naming the snapshot sequence it builds on. Sessions remember the last
+    sequence they have seen, so catching up with other sessions (or other
+    processes) only replays the journal tail, and a stat of the journal is
+    all an up-to-date session pays per rerun.
+
+    ``durability`` decides when commits reach the disk. "immediate" appends
+    them to the journal before commit() returns. "debounced" and "interval"
+    hand them to a write-behind thread, which coalesces a burst of commits
+    into one append. From its first unwritten commit until that append, a
+    deferred store holds the journal's writer lock, so it stays the only
+    writer and its cache stays the journal; other stores, here or in other
+    processes, wait for the append before writing, and a deferred store that
+    finds the lock taken commits immediately instead. Ops still waiting to
+    be written are lost if the process dies. Pending ops are flushed by
+    close(), which runs at interpreter exit. Without fcntl (Windows) there
+    is no shared lock to wait on, so every commit is immediate.
+    """
+
+    def __init__(self, path="planner_data.json", compact_every=500, durability="immediate", delay=None):
+        # Non-JSON snapshots (e.g. planner_data.plnb) get their own journal and
+        # lock, so they can sit next to the JSON store they were converted from
+        root, ext = os.path.splitext(path)
+        if ext != ".json":
+            root = path
+        self.path = path
+        self.binary = ext == ".plnb"
+        self.journal_path = root + ".journal"
+        self.lock_path = root + ".lock"
+        self.writer_path = root + ".writer"
+        self.compact_every = compact_every
+        if durability not in DURABILITY_DELAYS:
+            raise ValueError(f"Unknown durability: {durability}")
+        self.durability = durability
+        self.deferred = durability != "immediate"
+        self.delay = DURABILITY_DELAYS[durability] if delay is None else delay
+        self._lock = threading.RLock()
+        # Held for any journal or snapshot write, so the write-behind thread
+        # can append without blocking commits on self._lock
+        self._io_lock = threading.RLock()
+        self._compactor = None
+        # Write-behind state: records committed but not yet on disk
+        self._pending = []
+        self._wake = threading.Condition(self._lock)
+        self._first_pending = self._last_pending = 0.0
+        self._writer = None
+        self._closed = False
+        # The writer lock's file while this store holds it for a batch
+        self._batch = None
+        self._flushing = False
+        if self.deferred:
+            atexit.register(self.close)
+        # Parsed journal, refreshed incrementally from disk
+        self._ino = None
+        self._id = None
+        self._offset = 0
+        self._base = 0
+        self._ops = []
+        self._seqs = []
+
+    @contextmanager
+    def _locked(self):
+        with self._io_lock, self._lock, self._writer_lock(), _file_lock(self.lock_path):
+            yield
+
+    @contextmanager
+    def _writer_lock(self):
+        # Caller holds self._lock. Waits out another store's batch of deferred
+        # commits; this store's own batch already keeps everyone else out.
+        if self._batch is not None or fcntl is None:
+            yield
+            return
+        with open(self.writer_path, "a+") as f:
+            fcntl.flock(f, fcntl.LOCK_SH)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    @metrics.timed("storage.open")
+    def open(self):
+        session = Session(self)
+        with self._locked():
+            self._reload(session)
+        return session
+
+    def load(self):
+        return self.open().data
+
+    @metrics.timed("storage.sync")
+    def sync(self, session):
+        """Bring a session up to date with commits made elsewhere."""
+        with self._lock:
+            # During a batch this store is the only writer, its cache is the journal
+            if self._batch is None:
+                self._refresh()
+            if session.version >= self._base:
+                for op in self._ops_after(session.version):
+                    session.apply(op)
+                session.version = self._head()
+                return
+        # Compacted or replaced past this session's version
+        with self._locked():
+            self._reload(session)
+
+    @metrics.timed("storage.commit")
+    def commit(self, session, ops):
+        """Merge in other sessions' ops, then apply and journal this session's."""
+        if not ops:
+            return
+        with self._lock:
+            # A deferred commit joins or starts this store's batch; one that
+            # can't (another store is writing) goes to disk right away
+            batched = self.deferred and (self._batch is not None or self._begin_batch())
+            if batched:
+                try:
+                    stale, due = self._commit(session, ops, self._queue)
+                finally:
+                    self._end_batch()
+        if not batched:
+            with self._locked():
+                # Another thread may have started a batch in between
+                self._write_pending()
+                self._refresh()
+                stale, due = self._commit(session, ops, self._append)
+        if stale is not None:
+            # Reloading reads the journal, so it takes every lock; a deferred
+            # commit only held self._lock, and taking the write-behind thread's
+            # lock under it could deadlock
+            with self._locked():
+                self._reload(session)
+            raise ConflictError(stale)
+        if due:
+            self.compact_in_background()
+
+    def _commit(self, session, ops, write):
+        # Caller holds self._lock and the cache is current. Returns why the
+        # session must reload (or None) and whether compaction is due.
+        if session.version < self._base:
+            return "planner data was replaced by another session", False
+        foreign = self._ops_after(session.version)
+        for op in foreign:
+            session.apply(op)
+        session.version = self._head()
+        if any(_conflicts(op, other) for op in ops for other in foreign):
+            raise ConflictError("planner data was changed by another session")
+        try:
+            for op in ops:
+                session.apply(op)
+        except (KeyError, IndexError):
+            return "planner data was changed by another session", False
+        seq = session.version
+        records = []
+        for op in ops:
+            seq += 1
+            records.append(dict(op, seq=seq))
+        write(records)
+        session.version = seq
+        return None, len(self._ops) >= self.compact_every
+
+    @metrics.timed("storage.save")
+    def save(self, session):
+        """Write the session's data as a full snapshot and start a fresh journal."""
+        with self._locked():
+            self._write_pending()
+            self._refresh()
+            seq = self._head() + 1
+            _write_atomic(self.path, self._encode_snapshot(session.data, seq, session.aggregates.to_dict()))
+            self._write_journal(seq, [])
+            session.version = seq
+
+    # --- Queries ---
+    def status_counts(self, session, subject=None):
+        return session.aggregates.status_counts(subject)
+
+    def plans(self, session, plan_type=None):
+        return [p for p in session.data["finance"] if plan_type is None or p["type"] == plan_type]
+
+    # --- Compaction ---
+    @metrics.timed("storage.compact")
+    def compact(self):
+        """Fold the journal into the snapshot.
+
+        The snapshot is rebuilt and serialized without holding the locks; only
+        the final rename and journal rewrite do, and they give up if another
+        session or process replaced the snapshot in the meantime.
+        """
+        signature, data, seq, aggregates = self._read_snapshot()
+        with self._locked():
+            self._write_pending()
+            self._refresh()
+            if self._base > seq:
+                return
+            ops = self._ops_after(seq)
+        scratch = Session(self)
+        scratch.reset(data, aggregates)
+        for op in ops:
+            scratch.apply(op)
+            seq = op["seq"]
+        fd, tmp = tempfile.mkstemp(prefix=os.path.basename(self.path), suffix=".compact",
+                                   dir=os.path.dirname(os.path.abspath(self.path)))
+        payload = self._encode_snapshot(scratch.data, seq, scratch.aggregates.to_dict())
+        with os.fdopen(fd, "wb") as f:
+            f.write(payload)
+            metrics.add_bytes("storage.bytes_written", len(payload))
+            f.flush()
+            os.fsync(f.fileno())
+        with self._locked():
+            self._write_pending()
+            current = _signature(os.stat(self.path)) if os.path.exists(self.path) else None
+            if current != signature:
+                os.remove(tmp)
+                return
+            os.replace(tmp, self.path)
+            self._refresh()
+            self._write_journal(seq, self._ops_after(seq))
+
+    def compact_in_background(self):
+        if self._compactor is not None and self._compactor.is_alive():
+            return
+        self._compactor = threading.Thread(target=self.compact, name="planner-compactor", daemon=True)
+        self._compactor.start()
+
+    # --- Write-behind ---
+    def _queue(self, records):
+        # Caller holds self._lock. Records join the cache right away, so other
+        # sessions see them; the writer thread puts them on disk later.
+        self._ops.extend(records)
+        self._seqs.extend(r["seq"] for r in records)
+        now = time.monotonic()
+        if not self._pending:
+            self._first_pending = now
+        self._last_pending = now
+        self._pending.extend(records)
+        if self._writer is None or not self._writer.is_alive():
+            self._closed = False
+            self._writer = threading.Thread(target=self._write_behind, name="planner-writer", daemon=True)
+            self._writer.start()
+        self._wake.notify()
+
+    def _write_behind(self):
+        while True:
+            with self._lock:
+                while not self._pending and not self._closed:
+                    self._wake.wait()
+                if not self._pending:
+                    return
+                # Debounced waits for a quiet spell, but never longer than ten
+                # windows past the first pending write; interval waits one window
+                while not self._closed and self._pending:
+                    due = self._first_pending + self.delay
+                    if self.durability == "debounced":
+                        due = min(self._last_pending + self.delay, self._first_pending + 10 * self.delay)
+                    if time.monotonic() >= due:
+                        break
+                    self._wake.wait(due - time.monotonic())
+            self.flush()
+
+    @metrics.timed("storage.flush")
+    def flush(self):
+        """Write any commits the write-behind thread hasn't yet."""
+        with self._io_lock:
+            with self._lock:
+                records, self._pending = self._pending, []
+                self._flushing = bool(records)
+            written = 0
+            try:
+                if records:
+                    # Nobody else has written since the batch started, so
+                    # the journal still ends where the cache does
+                    with _file_lock(self.lock_path):
+                        written = self._write_records(records)
+            finally:
+                with self._lock:
+                    self._offset += written
+                    self._flushing = False
+                    self._end_batch()
+
+    def close(self):
+        """Flush pending commits and stop the write-behind thread."""
+        with self._lock:
+            self._closed = True
+            self._wake.notify()
+        self.flush()
+        if self._writer is not None and self._writer is not threading.current_thread():
+            self._writer.join()
+
+    def _begin_batch(self):
+        # Caller holds self._lock. Takes the writer lock for a batch of
+        # deferred commits, or returns False if another store holds it.
+        if fcntl is None:
+            return False
+        f = open(self.writer_path, "a+")
+        try:
+            fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            f.close()
+            return False
+        self._batch = f
+        # Start from whatever other stores wrote before the batch
+        with _file_lock(self.lock_path):
+            self._refresh()
+        return True
+
+    def _end_batch(self):
+        # Caller holds self._lock; lets other stores write once nothing is pending
+        if self._batch is None or self._pending or self._flushing:
+            return
+        fcntl.flock(self._batch, fcntl.LOCK_UN)
+        self._batch.close()
+        self._batch = None
+
+    def _write_pending(self):
+        # Caller holds every lock. Appends the batch's unwritten commits, which
+        # nobody else can have written after, and ends the batch.
+        records, self._pending = self._pending, []
+        if records:
+            self._offset += self._write_records(records)
+        self._end_batch()
+
+    # --- Journal cache (callers hold self._lock) ---
+    def _head(self):
+        return self._seqs[-1] if self._seqs else self._base
+
+    def _ops_after(self, seq):
+        return self._ops[bisect.bisect_right(self._seqs, seq):]
+
+    def _refresh(self):
+        try:
+            stat = os.stat(self.journal_path)
+        except FileNotFoundError:
+            self._reset(None, None)
+            return
+        if stat.st_ino == self._ino and stat.st_size == self._offset:
+            return
+        with open(self.journal_path, "rb") as f:
+            stat = os.fstat(f.fileno())
+            # Rewrites get a fresh header id; inode numbers alone can be reused
+            first = f.readline()
+            journal_id = json.loads(first).get("id") if first.endswith(b"\n") else None
+            if journal_id != self._id or stat.st_ino != self._ino or stat.st_size < self._offset:
+                self._reset(stat.st_ino, journal_id)
+            f.seek(self._offset)
+            chunk = f.read()
+        # Only consume complete lines; a torn tail is left for the next writer
+        end = chunk.rfind(b"\n") + 1
+        for line in chunk[:end].splitlines():
+            record = json.loads(line)
+            if "base" in record:
+                self._base = record["base"]
+            else:
+                self._ops.append(record)
+                self._seqs.append(record["seq"])
+        self._offset += end
+
+    def _reset(self, ino, journal_id):
+        self._ino, self._id = ino, journal_id
+        self._offset, self._base, self._ops, self._seqs = 0, 0, [], []
+
+    def _read_snapshot(self):
+        # (file signature, data, sequence, persisted aggregates or None)
+        if not os.path.exists(self.path):
+            return None, _clone(DEFAULT_DATA), 0, None
+        # Either format loads whatever the file extension says
+        with open(self.path, "rb") as f:
+            signature = _signature(os.fstat(f.fileno()))
+            if f.read(len(binary.MAGIC)) == binary.MAGIC:
+                return (signature, *binary.load(self.path))
+            f.seek(0)
+            data = json.load(f)
+        return signature, data, data.pop("_seq", 0), data.pop("_aggregates", None)
+
+    def _encode_snapshot(self, data, seq, aggregates):
+        if self.binary:
+            return binary.dumps(data, seq, aggregates)
+        return json.dumps(dict(data, _seq=seq, _aggregates=aggregates), default=binary.to_plain).encode()
+
+    def _reload(self, session):
+        # Caller holds every lock, so snapshot and journal agree
+        self._write_pending()
+        _, data, seq, aggregates = self._read_snapshot()
+        self._refresh()
+        if self._ino is None:
+            self._write_journal(seq, [])
+        session.reset(data, aggregates)
+        for op in self._ops_after(seq):
+            session.apply(op)
+        session.version = max(seq, self._head())
+
+    def _append(self, records):
+        # Caller holds the file lock and has just refreshed, so the cache ends
+        # where the journal's complete lines do. Extend it without reading back.
+        self._offset += self._write_records(records)
+        self._ops.extend(records)
+        self._seqs.extend(r["seq"] for r in records)
+
+    def _write_records(self, records):
+        # Caller holds the file lock; drops a torn tail left by a crashed writer
+        text = "".join(json.dumps(r, default=binary.to_plain) + "\n" for r in records).encode()
+        with open(self.journal_path, "ab") as f:
+            if f.tell() > self._offset:
+                f.truncate(self._offset)
+            f.write(text)
+        metrics.add_bytes("storage.bytes_written", len(text))
+        return len(text)
+
+    def _write_journal(self, base, ops):
+        # Callers pass every op after ``base``, so pending ones are written here
+        self._pending = []
+        lines = [json.dumps({"base": base, "id": uuid.uuid4().hex}) + "\n"]
+        lines.extend(json.dumps(op, default=binary.to_plain) + "\n" for op in ops)
+        _write_atomic(self.journal_path, "".join(lines))
+        self._refresh()
+
+
+def convert(src, dst):
+    """Write the data behind ``src`` (snapshot plus journal) as a fresh snapshot at ``dst``.
+
+    The snapshot format follows ``dst``'s extension: .plnb for columnar, JSON otherwise.
+    """
+    JournalStore(dst).save(JournalStore(src).open())
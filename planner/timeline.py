@@ -0,0 +1,97 @@
+from collections import namedtuple
+from functools import lru_cache
+
+import numpy as np
+
+from planner.projections import sip_growth
+from planner.schema import PLAN_FIELDS
+
+# --- Cross-plan timeline ---
+# Every plan becomes two month-end series over a shared horizon: the cash it
+# moves each month and the value it holds. Budgets add their surplus
+# (income - expenses), SIPs pay their monthly amount out of it, and what is
+# left fills the savings goals in list order until each reaches its target;
+# anything beyond that accumulates as cash. Stocks hold their current value,
+# growing at an assumed "growth" % a year (0 unless a what-if sets it).
+#
+# A plan's series depend only on its own fields, so they are cached on those;
+# changing one plan, or trying a what-if on it, recomputes just that plan
+# before the cheap cross-plan pass.
+HORIZON_MONTHS = 120
+
+Timeline = namedtuple("Timeline", "months cash_flow cash net_worth values goal_months")
+
+def _plan_key(plan):
+    fields = PLAN_FIELDS.get(plan.get("type"), {})
+    numbers = {k: float(v) for k, v in plan.items() if k == "growth" or k in fields and fields[k][0] is not str}
+    return plan.get("type"), tuple(sorted(numbers.items()))
+
+def plan_series(plan, months=HORIZON_MONTHS):
+    """(cash flow, value) arrays for one plan, memoized on its fields."""
+    kind, fields = _plan_key(plan)
+    return _plan_series(kind, fields, months)
+
+@lru_cache(maxsize=1024)
+def _plan_series(kind, fields, months):
+    f = dict(fields)
+    flow, value = np.zeros(months), np.zeros(months)
+    m = np.arange(1, months + 1)
+    if kind == "SIP":
+        term = min(int(f.get("years", 0) * 12), months)
+        grown = sip_growth(f.get("amount", 0.0), f.get("rate", 0.0), f.get("years", 0))
+        flow[:term] = -f.get("amount", 0.0)
+        value[:term] = grown[:term]
+        if term < months and len(grown):
+            # After the term the fund keeps compounding without contributions
+            value[term:] = grown[-1] * (1 + f.get("rate", 0.0) / 12 / 100) ** (m[term:] - len(grown))
+    elif kind == "Monthly Budget":
+        flow[:] = f.get("income", 0.0) - f.get("expenses", 0.0)
+    elif kind == "Savings Goal":
+        value[:] = f.get("saved", 0.0)
+    elif kind == "Stock Experiment":
+        value[:] = f.get("result", 0.0) * (1 + f.get("growth", 0.0) / 12 / 100) ** m
+    flow.flags.writeable = False
+    value.flags.writeable = False
+    return flow, value
+
+def apply_what_if(plans, overrides):
+    """Copies of ``plans`` with ``overrides`` ({plan index: {field: value}}) applied."""
+    if not overrides:
+        return list(plans)
+    return [dict(plan, **overrides[i]) if i in overrides else plan for i, plan in enumerate(plans)]
+
+def build_timeline(plans, months=HORIZON_MONTHS, overrides=None, start=None):
+    """Timeline of every plan combined, month ends from ``start`` (default: this month).
+
+    values has one row per plan (savings goals including what the surplus
+    paid in); goal_months gives each savings goal's month reaching its
+    target, None if it doesn't within the horizon (and for other plans).
+    """
+    plans = apply_what_if(plans, overrides)
+    start = np.datetime64("today", "M") if start is None else np.datetime64(start, "M")
+    dates = start + np.arange(months)
+    series = [plan_series(plan, months) for plan in plans]
+    flows = np.array([s[0] for s in series]).reshape(len(plans), months)
+    values = np.array([s[1] for s in series]).reshape(len(plans), months)
+    free = flows.sum(axis=0)
+    paid_in = np.cumsum(np.maximum(free, 0))
+    # Fill the goals in order: goal g gets what's paid in beyond the needs of the goals before it
+    goals = [i for i, plan in enumerate(plans) if plan.get("type") == "Savings Goal"]
+    needs = np.array([max(plans[i].get("target", 0) - plans[i].get("saved", 0), 0) for i in goals], dtype=float)
+    before = np.cumsum(needs) - needs
+    allocated = np.clip(paid_in - before[:, None], 0, needs[:, None])
+    values[goals] += allocated
+    cash = paid_in - allocated.sum(axis=0) + np.cumsum(np.minimum(free, 0))
+    goal_months = [None] * len(plans)
+    for row, i in enumerate(goals):
+        reached = np.flatnonzero(allocated[row] >= needs[row])
+        if len(reached):
+            goal_months[i] = dates[reached[0]]
+    return Timeline(dates, free, cash, cash + values.sum(axis=0), values, goal_months)
+
+def compare(plans, variants, months=HORIZON_MONTHS, start=None):
+    """{name: Timeline} for the plans as they are ("Current") and each what-if variant."""
+    result = {"Current": build_timeline(plans, months, start=start)}
+    for name, overrides in variants.items():
+        result[name] = build_timeline(plans, months, overrides, start)
+    return result
@@ -0,0 +1,198 @@
+import csv
+import json
+from collections import namedtuple
+
+from planner.ledger import LEDGER_COLUMNS
+from planner.schema import PLAN_FIELDS, coerce, validate_goal, validate_plan, validate_task, validate_transaction
+from planner.storage import ConflictError, add, update
+
+# --- Flat records ---
+# Imports and exports share one flat record shape, tagged by "kind":
+#   subject:  subject
+#   task:     subject, task, status, and optionally effort, due, after, id
+#   plan:     type, name and the plan type's fields
+#   category:    plan (the budget's name), name, amount
+#   transaction: plan (the budget's name), date, category, amount
+#   goal:        goal, done
+KINDS = ("subject", "task", "plan", "category", "transaction", "goal")
+
+CSV_COLUMNS = ["kind", "subject", "task", "status", "effort", "due", "after", "id", "type", "name", "plan"]
+for _fields in PLAN_FIELDS.values():
+    CSV_COLUMNS.extend(f for f in _fields if f not in CSV_COLUMNS)
+CSV_COLUMNS.extend(["date", "category", "goal", "done"])
+
+ImportReport = namedtuple("ImportReport", "rows imported errors")
+
+
+# --- Export ---
+def export_rows(data):
+    """Yield one flat record per subject, task, plan, budget category and daily goal."""
+    for plan in list(data.get("finance", [])):
+        yield {"kind": "plan", **{k: v for k, v in plan.items() if k not in ("categories", "ledger")}}
+        for name, amount in list(plan.get("categories", {}).items()):
+            yield {"kind": "category", "plan": plan.get("name"), "name": name, "amount": amount}
+        ledger = plan.get("ledger", {})
+        for date, category, amount in zip(*(list(ledger.get(c, [])) for c in LEDGER_COLUMNS)):
+            yield {"kind": "transaction", "plan": plan.get("name"), "date": date, "category": category, "amount": amount}
+    for subject, tasks in list(data.get("learning", {}).items()):
+        yield {"kind": "subject", "subject": subject}
+        for t in list(tasks):
+            yield {"kind": "task", "subject": subject, **t}
+    for goal in list(data.get("daily_goals", [])):
+        yield {"kind": "goal", **goal}
+
+def write_jsonl(rows, fp):
+    for row in rows:
+        fp.write(json.dumps(row) + "\n")
+
+def write_csv(rows, fp):
+    # Fields outside CSV_COLUMNS are dropped; use JSON Lines to keep them.
+    # A task's prerequisite ids go in one cell, separated by ";".
+    writer = csv.DictWriter(fp, CSV_COLUMNS, extrasaction="ignore")
+    writer.writeheader()
+    writer.writerows({**row, "after": ";".join(row["after"])} if "after" in row else row for row in rows)
+
+
+# --- Import ---
+def read_rows(fp, fmt, default_kind=None):
+    """Yield (line number, record) from a CSV or JSON Lines text stream.
+
+    Unparseable lines come through as the exception instead of a record.
+    Blank CSV cells are treated as missing fields.
+    """
+    if fmt == "csv":
+        reader = csv.DictReader(fp)
+        for row in reader:
+            record = {k: v for k, v in row.items() if k and v not in (None, "")}
+            if default_kind and "kind" not in record:
+                record["kind"] = default_kind
+            yield reader.line_num, record
+    elif fmt == "jsonl":
+        for line_no, line in enumerate(fp, 1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError as e:
+                yield line_no, e
+                continue
+            if default_kind and isinstance(record, dict) and "kind" not in record:
+                record["kind"] = default_kind
+            yield line_no, record
+    else:
+        raise ValueError(f"Unknown import format: {fmt}")
+
+def import_file(session, fp, fmt, default_kind=None, batch_size=500, max_errors=100):
+    """Validate and import records from ``fp``, committing every ``batch_size`` ops.
+
+    Invalid rows are skipped and reported; memory is bounded by one batch.
+    """
+    return _Importer(session, batch_size, max_errors).run(read_rows(fp, fmt, default_kind))
+
+class _Importer:
+    def __init__(self, session, batch_size, max_errors):
+        self.session = session
+        self.batch_size = batch_size
+        self.max_errors = max_errors
+        self.subjects = set(session.data["learning"])
+        self.plan_count = len(session.data["finance"])
+        # Budget name -> [index, has categories, has ledger]; a later budget with the same name wins
+        self.plans = {p.get("name"): [i, "categories" in p, "ledger" in p]
+                      for i, p in enumerate(session.data["finance"]) if p["type"] == "Monthly Budget"}
+        self.goals = "daily_goals" in session.data
+        self.pending = []
+        self.pending_rows = 0
+        self.imported = 0
+        self.errors = []
+
+    def run(self, rows):
+        total = 0
+        for line_no, record in rows:
+            total += 1
+            try:
+                if isinstance(record, Exception):
+                    raise ValueError(f"unreadable line: {record}")
+                ops = self._ops(record)
+            except (ValueError, TypeError, AttributeError) as e:
+                if len(self.errors) < self.max_errors:
+                    self.errors.append((line_no, str(e)))
+                continue
+            self.pending.extend(ops)
+            self.pending_rows += 1
+            if len(self.pending) >= self.batch_size and not self._flush(line_no):
+                break
+        else:
+            self._flush(None)
+        return ImportReport(total, self.imported, self.errors)
+
+    def _flush(self, line_no):
+        try:
+            self.session.commit(*self.pending)
+        except ConflictError as e:
+            self.errors.append((line_no, f"import stopped: {e}"))
+            return False
+        self.imported += self.pending_rows
+        self.pending, self.pending_rows = [], 0
+        return True
+
+    def _ops(self, record):
+        kind = record.get("kind")
+        if kind not in KINDS:
+            raise ValueError(f"kind must be one of {', '.join(KINDS)}, got {kind!r}")
+        if kind == "plan":
+            plan = validate_plan(record)
+            self._plan_added(plan)
+            return [add(["finance"], plan)]
+        if kind == "category":
+            return self._category_ops(record)
+        if kind == "transaction":
+            return self._transaction_ops(record)
+        if kind == "goal":
+            goal = validate_goal(record)
+            ops = [] if self.goals else [update(["daily_goals"], [])]
+            self.goals = True
+            return ops + [add(["daily_goals"], goal)]
+        subject = record.get("subject")
+        if not subject:
+            raise ValueError("subject is missing")
+        subject = str(subject)
+        task = validate_task(record) if kind == "task" else None
+        ops = []
+        if subject not in self.subjects:
+            ops.append(update(["learning", subject], []))
+            self.subjects.add(subject)
+        if task is not None:
+            ops.append(add(["learning", subject], task))
+        return ops
+
+    def _plan_added(self, plan):
+        if plan["type"] == "Monthly Budget":
+            self.plans[plan["name"]] = [self.plan_count, "categories" in plan, False]
+        self.plan_count += 1
+
+    def _budget(self, record):
+        budget = str(record.get("plan", ""))
+        if budget not in self.plans:
+            raise ValueError(f"no Monthly Budget named {budget!r}")
+        return self.plans[budget]
+
+    def _category_ops(self, record):
+        budget = self._budget(record)
+        name = record.get("name")
+        if not name:
+            raise ValueError("category name is missing")
+        amount = coerce(record.get("amount"), float, 0.0, None, "amount")
+        idx, has_categories = budget[0], budget[1]
+        if has_categories:
+            return [update(["finance", idx, "categories", str(name)], amount)]
+        budget[1] = True
+        return [update(["finance", idx, "categories"], {str(name): amount})]
+
+    def _transaction_ops(self, record):
+        budget = self._budget(record)
+        txn = validate_transaction(record)
+        idx, has_ledger = budget[0], budget[2]
+        if has_ledger:
+            return [add(["finance", idx, "ledger", c], txn[c]) for c in LEDGER_COLUMNS]
+        budget[2] = True
+        return [update(["finance", idx, "ledger"], {c: [txn[c]] for c in LEDGER_COLUMNS})]
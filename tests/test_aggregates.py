@@ -0,0 +1,57 @@
+import datetime
+import random
+
+from planner.aggregates import AggregateIndex
+from planner.storage import JournalStore, add, apply_op, delete, move, update
+
+
+def random_op(rng, data):
+    learning = data["learning"]
+    subject = rng.choice(["Math", "Physics", "Art"])
+    tasks = learning.get(subject)
+    if tasks is None or rng.random() < 0.05:
+        return update(["learning", subject], [{"task": "t", "status": "ToDo", "effort": 1.0}])
+    if not tasks or rng.random() < 0.3:
+        task = {"task": "t", "status": rng.choice(["ToDo", "Done"])}
+        if rng.random() < 0.5:
+            task["due"] = "2026-11-01"
+        return add(["learning", subject], task)
+    i = rng.randrange(len(tasks))
+    path = ["learning", subject, i]
+    return rng.choice([
+        update(path + ["status"], rng.choice(["ToDo", "In Progress", "Done"])),
+        update(path + ["effort"], 2.0),
+        update(path + ["id"], "abc"),
+        delete(path + ["effort"]) if "effort" in tasks[i] else delete(path),
+        delete(path + ["due"]) if "due" in tasks[i] else update(path + ["due"], "2026-12-01"),
+        update(path, {"task": "u", "status": "ToDo"}),
+        move(path, 0),
+        delete(["learning", subject]) if rng.random() < 0.1 else delete(path),
+    ])
+
+
+def test_incremental_counts_match_rebuild():
+    rng = random.Random(7)
+    data = {"finance": [], "learning": {}}
+    index = AggregateIndex.build(data)
+    for _ in range(2000):
+        op = random_op(rng, data)
+        assert index.observe(data, op)
+        apply_op(data, op)
+        fresh = AggregateIndex.build(data)
+        assert index.subjects == fresh.subjects
+        assert index.scheduled == fresh.scheduled
+
+
+def test_plain_checklists_skip_the_scheduler(tmp_path):
+    store = JournalStore(str(tmp_path / "planner_data.plnb"))
+    session = store.open()
+    session.commit(update(["learning", "Math"], [{"task": str(i), "status": "ToDo"} for i in range(50)]))
+    session.save()
+    session = store.open()
+    tasks = session.data["learning"]["Math"]
+    plan = session.study_plan(2.0, datetime.date(2026, 10, 1))
+    assert plan.days == [] and plan.finish == {}
+    assert not tasks._built  # no task was read
+    session.commit(update(["learning", "Math", 3, "effort"], 3.0))
+    assert session.study_plan(2.0, datetime.date(2026, 10, 1)).finish
@@ -0,0 +1,74 @@
+import json
+
+import pytest
+
+from planner import binary
+from planner.storage import JournalStore, add, convert, update
+
+DATA = {
+    "finance": [
+        {"type": "SIP", "name": "Index fund", "amount": 500.0, "rate": 12.0, "years": 10},
+        {"type": "Monthly Budget", "name": "Home", "income": 4000.0, "expenses": 2500.5,
+         "categories": {"Rent": 1500.0, "Food": 600.0}},
+        {"type": "Stock Experiment", "name": "ACME", "stock": "ACME", "invested": 100.0, "result": 80.0},
+        {"type": "Custom", "name": 7, "note": "kept as is"},
+    ],
+    "learning": {
+        "Math": [{"task": "Limits", "status": "Done"}, {"task": "Series", "status": "Blocked", "effort": 2.5}],
+        "Art": [],
+        "Odd": [{"task": None, "status": 3}, {"note": "no task"}],
+    },
+    "daily_goals": [{"goal": "Read", "done": True}],
+}
+
+
+def plain(data):
+    return json.loads(json.dumps(data, default=binary.to_plain))
+
+
+def test_dumps_load_round_trip(tmp_path):
+    path = tmp_path / "planner_data.plnb"
+    path.write_bytes(binary.dumps(DATA, seq=42, aggregates={"subjects": {}}))
+    data, seq, aggregates = binary.load(str(path))
+    assert (seq, aggregates) == (42, {"subjects": {}})
+    assert isinstance(data["learning"]["Math"], binary.LazyRecords)
+    assert plain(data) == DATA
+    assert data["finance"][0]["years"] == 10 and isinstance(data["finance"][0]["years"], int)
+
+
+def test_load_rejects_other_files(tmp_path):
+    path = tmp_path / "planner_data.plnb"
+    path.write_bytes(b"NOTPLANR" + bytes(16))
+    with pytest.raises(ValueError):
+        binary.load(str(path))
+
+
+@pytest.mark.parametrize("map_files", [True, False])
+def test_compaction_replaces_a_loaded_snapshot(tmp_path, monkeypatch, map_files):
+    monkeypatch.setattr(binary, "MAP_FILES", map_files)
+    store = JournalStore(str(tmp_path / "planner_data.plnb"), compact_every=2)
+    session = store.open()
+    session.commit(update(["learning", "Math"], [{"task": "Limits", "status": "ToDo"}]))
+    session.save()
+    reader = JournalStore(store.path).open()
+    for name in ("a", "b", "c"):
+        session.commit(add(["learning", "Math"], {"task": name, "status": "ToDo"}))
+    store.compact()
+    # The older session's lazy views still read the snapshot it loaded
+    assert [t["task"] for t in reader.data["learning"]["Math"]] == ["Limits"]
+    reader.sync()
+    assert [t["task"] for t in reader.data["learning"]["Math"]] == ["Limits", "a", "b", "c"]
+
+
+def test_json_binary_json_round_trip(tmp_path):
+    src, mid, dst = (str(tmp_path / name) for name in ("a.json", "b.plnb", "c.json"))
+    session = JournalStore(src).open()
+    session.reset(plain(DATA))
+    session.save()
+    session.commit(add(["learning", "Art"], {"task": "Sketch", "status": "ToDo"}))
+    convert(src, mid)
+    with open(mid, "rb") as f:
+        assert f.read(len(binary.MAGIC)) == binary.MAGIC
+    convert(mid, dst)
+    assert JournalStore(dst).load() == JournalStore(src).load()
+    assert plain(JournalStore(mid).load()) == JournalStore(src).load()
@@ -0,0 +1,88 @@
+import json
+import os
+
+import pytest
+
+from planner.cli import main
+from planner.storage import JournalStore, add, namespaced_path, update
+
+
+def test_binary_store_with_only_a_journal(tmp_path, capsys):
+    path = str(tmp_path / "planner_data.plnb")
+    JournalStore(path).open().commit(update(["learning", "Math"], [{"task": "Limits", "status": "Done"}]))
+    assert not os.path.exists(path) and os.path.exists(path + ".journal")
+    main([path, "--json"])
+    assert '"Math"' in capsys.readouterr().out
+
+
+def test_missing_data_exits(tmp_path):
+    for name in ("planner_data.json", "planner_data.plnb", "planner_data.db"):
+        with pytest.raises(SystemExit) as exit:
+            main([str(tmp_path / name)])
+        assert exit.value.code == 1
+    assert not os.listdir(tmp_path)
+
+
+def test_convert_from_sqlite(tmp_path):
+    from planner.sqlite_store import SQLiteStore
+    src, dst = str(tmp_path / "planner_data.db"), str(tmp_path / "planner_data.json")
+    session = SQLiteStore(src).open()
+    session.commit(add(["finance"], {"type": "Savings Goal", "name": "Car", "target": 5000}),
+                   update(["learning", "Math"], [{"task": "Limits", "status": "Done"}]))
+    main([src, "--convert", dst])
+    assert JournalStore(dst).load() == SQLiteStore(src).load()
+
+
+@pytest.mark.parametrize("argv", [["notes.txt", "--convert", "out.json"], ["planner_data.json", "--convert", "out.db"]])
+def test_convert_rejects_other_formats(tmp_path, argv):
+    (tmp_path / "notes.txt").write_text("not planner data")
+    with pytest.raises(SystemExit) as exit:
+        main([str(tmp_path / argv[0]), argv[1], str(tmp_path / argv[2])])
+    assert exit.value.code == 2
+
+
+def sample(path):
+    session = JournalStore(path).open()
+    session.commit(
+        add(["finance"], {"type": "SIP", "name": "Index", "amount": 1000, "rate": 0, "years": 1}),
+        add(["finance"], {"type": "Savings Goal", "name": "Car", "target": 5000, "saved": 1250}),
+        update(["learning", "Math"], [{"task": "Limits", "status": "Done"}, {"task": "Series", "status": "ToDo"}]),
+        update(["daily_goals"], [{"goal": "Read", "done": True}, {"goal": "Run", "done": False}]))
+    return session
+
+
+def test_json_report(tmp_path, capsys):
+    path = str(tmp_path / "planner_data.json")
+    sample(path)
+    main([path, "--json"])
+    result = json.loads(capsys.readouterr().out)
+    sip, goal = result["plans"]
+    assert sip == {"type": "SIP", "name": "Index", "invested": 12000, "value": 12000, "gain": 0}
+    assert goal["remaining"] == 3750 and goal["pct"] == 25
+    assert result["learning"] == {"Math": {"done": 1, "total": 2, "pct": 50}}
+    assert result["overall"] == {"done": 1, "total": 2, "pct": 50}
+    assert result["daily_goals"] == {"total": 2, "done": 1}
+
+
+def test_text_report(tmp_path, capsys):
+    path = str(tmp_path / "planner_data.json")
+    sample(path)
+    main([path])
+    assert capsys.readouterr().out.splitlines() == [
+        "Finance",
+        "  SIP: Index  value ₹12,000 on ₹12,000 invested (gain ₹0)",
+        "  Savings Goal: Car  25.0% of ₹5,000 (₹3,750 to go)",
+        "Learning",
+        "  Math: 50.0% (1/2 tasks done)",
+        "  Overall: 1 of 2 tasks done",
+        "Daily goals: 1 of 2 completed",
+    ]
+
+
+def test_user_reads_their_own_file(tmp_path, capsys):
+    path = str(tmp_path / "planner_data.json")
+    sample(path)
+    session = JournalStore(namespaced_path(path, "ana")).open()
+    session.commit(add(["finance"], {"type": "Savings Goal", "name": "Bike", "target": 100}))
+    main([path, "--user", "ana", "--json"])
+    assert [p["name"] for p in json.loads(capsys.readouterr().out)["plans"]] == ["Bike"]
@@ -0,0 +1,92 @@
+import datetime
+
+import pytest
+
+from planner.goals import goal_heatmap, goal_stats, rollover_ops
+from planner.storage import ConflictError, JournalStore, apply_op, update
+
+DAY = datetime.date(2026, 10, 1)
+
+
+def checklist(*done):
+    return [{"goal": str(i), "done": d} for i, d in enumerate(done)]
+
+
+def roll(data, today):
+    for op in rollover_ops(data, today):
+        apply_op(data, op)
+    return data
+
+
+def test_first_day_only_sets_the_day():
+    data = roll({"daily_goals": checklist(True)}, DAY)
+    assert data == {"daily_goals": checklist(True), "daily_goals_day": "2026-10-01"}
+    assert rollover_ops(data, DAY) == []
+
+
+def test_rollover_records_the_day_and_skipped_days():
+    data = {"daily_goals": checklist(True, True, False), "daily_goals_day": "2026-10-01"}
+    roll(data, DAY + datetime.timedelta(days=3))
+    assert data["goal_history"] == {"start": "2026-10-01", "done": [2, 0, 0], "total": [3, 3, 3]}
+    assert data["daily_goals"] == checklist(False, False, False)
+    assert data["daily_goals_day"] == "2026-10-04"
+    data["daily_goals"][0]["done"] = True
+    roll(data, DAY + datetime.timedelta(days=4))
+    assert data["goal_history"] == {"start": "2026-10-01", "done": [2, 0, 0, 1], "total": [3, 3, 3, 3]}
+
+
+def test_gap_before_the_checklist_day_is_padded():
+    # The checklist's day was set after the history's last recorded day
+    data = {"daily_goals": checklist(True), "daily_goals_day": "2026-10-03",
+            "goal_history": {"start": "2026-10-01", "done": [1], "total": [1]}}
+    roll(data, datetime.date(2026, 10, 4))
+    assert data["goal_history"] == {"start": "2026-10-01", "done": [1, 0, 1], "total": [1, 0, 1]}
+
+
+def test_days_already_recorded_are_kept():
+    # The clock went back: 10-02 is in the history already
+    data = {"daily_goals": checklist(True), "daily_goals_day": "2026-10-02",
+            "goal_history": {"start": "2026-10-01", "done": [1, 0], "total": [1, 1]}}
+    roll(data, datetime.date(2026, 10, 4))
+    assert data["goal_history"] == {"start": "2026-10-01", "done": [1, 0, 0], "total": [1, 1, 1]}
+
+
+def test_concurrent_rollovers_record_the_day_once(tmp_path):
+    path = str(tmp_path / "planner_data.json")
+    JournalStore(path).open().commit(update(["daily_goals"], checklist(True)),
+                                     update(["daily_goals_day"], "2026-10-01"))
+    a, b = JournalStore(path).open(), JournalStore(path).open()
+    tomorrow = DAY + datetime.timedelta(days=1)
+    ops_a, ops_b = rollover_ops(a.data, tomorrow), rollover_ops(b.data, tomorrow)
+    a.commit(*ops_a)
+    with pytest.raises(ConflictError):
+        b.commit(*ops_b)
+    assert rollover_ops(b.data, tomorrow) == []
+    assert JournalStore(path).load()["goal_history"] == {"start": "2026-10-01", "done": [1], "total": [1]}
+
+
+def history(done, total):
+    return {"start": "2026-10-01", "done": done, "total": total}
+
+
+def test_streaks_and_rates():
+    h = history([2, 2, 1, 2, 2, 2], [2, 2, 2, 2, 2, 2])
+    # An unfinished today doesn't break the streak; a finished one extends it
+    assert goal_stats(h, 0, 2) == {"current": 3, "best": 3, "rate": 11 / 14, "rate_all": 11 / 14, "days": 7}
+    assert goal_stats(h, 2, 2)["current"] == goal_stats(h, 2, 2)["best"] == 4
+    assert goal_stats(h, 2, 2, window=2)["rate"] == 1.0
+    # A day without goals ends a streak
+    assert goal_stats(history([2, 2, 0], [2, 2, 0]), 0, 2)["current"] == 0
+
+
+def test_stats_without_history():
+    assert goal_stats(None) == {"current": 0, "best": 0, "rate": 0.0, "rate_all": 0.0, "days": 0}
+    assert goal_stats(None, 1, 1)["current"] == 1
+
+
+def test_heatmap_lays_days_out_by_weekday():
+    # 2026-10-01 is a Thursday
+    grid = goal_heatmap(history([1, 0, 1], [2, 0, 1]), 1, 1)
+    assert list(grid.index) == ["Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"]
+    assert grid.shape == (7, 1)
+    assert list(grid.iloc[:, 0].fillna(-1)) == [-1, -1, -1, 0.5, -1, 1.0, 1.0]
@@ -0,0 +1,76 @@
+import pandas as pd
+import pytest
+
+from planner.ledger import LedgerCache, rollups
+from planner.storage import JournalStore, add, delete, move, update
+
+LEDGER = {
+    "date": ["2026-01-05", "2026-01-20", "2026-03-02", "2026-03-15"],
+    "category": ["Food", "Rent", "Food", "Books"],
+    "amount": [100.0, 900.0, 50.0, 30.0],
+}
+
+
+def budget(name, ledger=None):
+    plan = {"type": "Monthly Budget", "name": name, "income": 2000.0, "expenses": 0.0}
+    if ledger is not None:
+        plan["ledger"] = ledger
+    return plan
+
+
+def test_monthly_rollups_fill_empty_months():
+    r = rollups(LEDGER, window=2)
+    assert list(r.monthly.index.strftime("%Y-%m")) == ["2026-01", "2026-02", "2026-03"]
+    assert list(r.monthly) == [1000.0, 0.0, 80.0]
+    assert list(r.rolling) == [1000.0, 500.0, 40.0]
+    assert r.by_category.to_dict() == {"Rent": 900.0, "Food": 150.0, "Books": 30.0}
+    assert r.by_month_category.loc[pd.Timestamp("2026-03-01"), "Food"] == 50.0
+    assert r.by_month_category.loc[pd.Timestamp("2026-02-01")].sum() == 0.0
+
+
+def test_empty_ledger():
+    r = rollups({})
+    assert r.frame.empty and r.monthly.empty and r.by_category.empty
+
+
+def test_cache_follows_plans_through_moves_and_deletes(tmp_path):
+    session = JournalStore(str(tmp_path / "planner_data.json")).open()
+    session.commit(update(["finance"], [budget("a", LEDGER), budget("b"), budget("c", {"date": ["2026-05-01"],
+                                        "category": ["Gym"], "amount": [40.0]})]))
+    a, c = session.rollups(0), session.rollups(2)
+    session.commit(move(["finance", 0], 2))
+    # Moved plans keep their cached rollups under their new positions
+    assert session.rollups(2) is a and session.rollups(1) is c
+    session.commit(delete(["finance", 0]))
+    assert session.rollups(1) is a and session.rollups(0) is c
+    # A ledger edit drops only that plan's rollups
+    session.commit(add(["finance", 1, "ledger", "date"], "2026-04-01"),
+                   add(["finance", 1, "ledger", "category"], "Food"),
+                   add(["finance", 1, "ledger", "amount"], 10.0))
+    assert session.rollups(0) is c
+    assert session.rollups(1) is not a and session.rollups(1).by_category["Food"] == 160.0
+
+
+@pytest.mark.parametrize("op", [
+    update(["finance", 0], budget("a")),
+    update(["finance", 0, "ledger"], {"date": [], "category": [], "amount": []}),
+    update(["finance"], [budget("z")]),
+])
+def test_replacing_a_ledger_drops_its_rollups(op):
+    cache = LedgerCache()
+    data = {"finance": [budget("a", LEDGER)]}
+    assert not cache.get(0, data["finance"][0]).frame.empty
+    cache.observe(op)
+    data["finance"][0] = budget("a")
+    assert cache.get(0, data["finance"][0]).frame.empty
+
+
+def test_other_sessions_edits_invalidate(tmp_path):
+    path = str(tmp_path / "planner_data.json")
+    mine, theirs = JournalStore(path).open(), JournalStore(path).open()
+    mine.commit(update(["finance"], [budget("a", LEDGER)]))
+    before = mine.rollups(0)
+    theirs.sync()
+    theirs.commit(update(["finance", 0, "ledger", "amount", 0], 500.0))
+    mine.sync()
+    assert mine.rollups(0) is not before and mine.rollups(0).by_category["Food"] == 550.0
@@ -0,0 +1,84 @@
+import json
+
+import pytest
+
+from planner import metrics
+
+
+@pytest.fixture
+def profiling():
+    was = metrics.enabled()
+    metrics.enable()
+    metrics.reset()
+    yield
+    metrics.enable(was)
+    metrics.reset()
+
+
+def test_disabled_records_nothing(profiling):
+    metrics.enable(False)
+    with metrics.timer("load"):
+        pass
+    metrics.add_bytes("journal", 100)
+    assert metrics.timer("load") is metrics.timer("other")
+    assert metrics.snapshot() == {}
+
+
+def test_histogram_summary(profiling):
+    for value in range(1, 101):
+        metrics.observe("commit", value)
+    metrics.add_bytes("journal", 300)
+    snapshot = metrics.snapshot()
+    assert snapshot["commit"] == {"unit": "ms", "count": 100, "sum": 5050, "p50": 51, "p95": 96, "max": 100}
+    assert snapshot["journal"]["unit"] == "bytes" and snapshot["journal"]["count"] == 1
+
+
+def test_percentiles_cover_recent_samples_only(profiling):
+    for _ in range(metrics.WINDOW):
+        metrics.observe("commit", 1000)
+    for _ in range(metrics.WINDOW):
+        metrics.observe("commit", 1)
+    summary = metrics.snapshot()["commit"]
+    # The counters stay monotonic while the window moves on
+    assert summary["count"] == 2 * metrics.WINDOW and summary["sum"] == 1001 * metrics.WINDOW
+    assert summary["p95"] == summary["max"] == 1
+
+
+def test_timers_and_decorator(profiling):
+    @metrics.timed("work")
+    def work(x):
+        return x * 2
+
+    assert work(2) == 4
+    with metrics.timer("block"):
+        pass
+    snapshot = metrics.snapshot()
+    assert snapshot["work"]["count"] == snapshot["block"]["count"] == 1
+
+
+def test_prometheus_text(profiling):
+    for value in (1, 3, 3, 20000):
+        metrics.observe("store.commit", value)
+    metrics.add_bytes("journal write", 256)
+    lines = metrics.to_prometheus().splitlines()
+    assert "# TYPE planner_store_commit_milliseconds histogram" in lines
+    # Buckets are cumulative and inclusive of their bound
+    assert 'planner_store_commit_milliseconds_bucket{le="1"} 1' in lines
+    assert 'planner_store_commit_milliseconds_bucket{le="2"} 1' in lines
+    assert 'planner_store_commit_milliseconds_bucket{le="5"} 3' in lines
+    assert 'planner_store_commit_milliseconds_bucket{le="10000"} 3' in lines
+    assert 'planner_store_commit_milliseconds_bucket{le="+Inf"} 4' in lines
+    assert "planner_store_commit_milliseconds_sum 20007.0" in lines
+    assert "planner_store_commit_milliseconds_count 4" in lines
+    assert 'planner_journal_write_bytes_bucket{le="256"} 1' in lines
+
+
+def test_dump_picks_the_format(profiling, tmp_path):
+    metrics.observe("load", 2)
+    prom, js = str(tmp_path / "metrics.prom"), str(tmp_path / "metrics.json")
+    metrics.dump(prom)
+    metrics.dump(js)
+    with open(prom) as f:
+        assert f.read() == metrics.to_prometheus()
+    with open(js) as f:
+        assert json.load(f)["load"]["count"] == 1
@@ -0,0 +1,47 @@
+import numpy as np
+import pytest
+
+from planner.projections import sip_final_value, sip_growth, sip_growth_batch
+
+
+def month_loop(amount, rates, years, step_up=0.0):
+    # The recurrence the closed forms replace, one month at a time
+    value, values = 0.0, []
+    for m in range(int(years * 12)):
+        year = m // 12
+        rate = rates[min(year, len(rates) - 1)] if isinstance(rates, list) else rates
+        value = value * (1 + rate / 12 / 100) + amount * (1 + step_up / 100) ** year
+        values.append(value)
+    return np.array(values)
+
+
+@pytest.mark.parametrize("amount, rate, years, step_up", [
+    (5000, 12.0, 10, 0.0),
+    (1000, 0.0, 3, 0.0),
+    (2500, 1e-9, 5, 0.0),
+    (1000, 8.0, 7, 10.0),
+    (1000, [6.0, 12.0, 4.0], 5, 0.0),
+    (1000, [10.0, 0.0], 2.5, 5.0),
+])
+def test_sip_growth_matches_a_month_loop(amount, rate, years, step_up):
+    np.testing.assert_allclose(sip_growth(amount, rate, years, step_up), month_loop(amount, rate, years, step_up),
+                               rtol=1e-10)
+    assert sip_final_value(amount, rate, years, step_up) == pytest.approx(month_loop(amount, rate, years, step_up)[-1])
+
+
+def test_sip_growth_is_cached_and_read_only():
+    values = sip_growth(5000, 12, 10)
+    assert sip_growth(5000.0, 12.0, 10) is values
+    with pytest.raises(ValueError):
+        values[0] = 0
+    assert sip_final_value(5000, 12, 0) == 0.0
+
+
+def test_batch_matches_single_plans():
+    amounts, rates, years = [5000, 1000, 200], [12.0, 0.0, 7.5], [10, 2, 4]
+    values = sip_growth_batch(amounts, rates, years)
+    assert values.shape == (3, 120)
+    for row, amount, rate, term in zip(values, amounts, rates, years):
+        np.testing.assert_allclose(row[:term * 12], month_loop(amount, rate, term), rtol=1e-10)
+        assert np.isnan(row[term * 12:]).all()
+    assert sip_growth_batch([], [], []).shape == (0, 0)
@@ -0,0 +1,135 @@
+import datetime
+import random
+
+import pytest
+
+from planner.scheduler import StudyScheduler
+from planner.storage import add, apply_op, delete, move, update
+
+START = datetime.date(2026, 10, 1)
+
+
+def day(n):
+    return (START + datetime.timedelta(days=n)).isoformat()
+
+
+def plan(learning, capacity=2, start=START):
+    return StudyScheduler().plan(learning, capacity, start)
+
+
+def test_days_fill_to_capacity():
+    learning = {"Math": [{"task": "a", "status": "ToDo", "effort": 3},
+                         {"task": "b", "status": "ToDo", "effort": 2},
+                         {"task": "plain", "status": "ToDo"}]}
+    result = plan(learning)
+    assert result.days == [
+        (START, [(("Math", 0), 2)]),
+        (START + datetime.timedelta(days=1), [(("Math", 0), 1), (("Math", 1), 1)]),
+        (START + datetime.timedelta(days=2), [(("Math", 1), 1)]),
+    ]
+    assert result.finish == {("Math", 0): START + datetime.timedelta(days=1),
+                             ("Math", 1): START + datetime.timedelta(days=2)}
+    assert ("Math", 2) not in result.finish  # plain checklist tasks aren't planned
+
+
+def test_capacity_must_be_positive():
+    with pytest.raises(ValueError):
+        plan({}, capacity=0)
+
+
+def test_prerequisites_come_first_and_inherit_deadlines():
+    learning = {
+        "Math": [{"task": "essay", "status": "ToDo", "effort": 2, "due": day(9)},
+                 {"task": "exam", "status": "ToDo", "effort": 1, "due": day(1), "after": ["notes"]}],
+        "Art": [{"task": "notes", "status": "ToDo", "effort": 2, "id": "notes"}],
+    }
+    result = plan(learning, capacity=1)
+    order = [key for _, work in result.days for key, _ in work]
+    # "notes" has no due date but "exam" needs it a day before its own
+    assert order == ["notes", "notes", ("Math", 1), ("Math", 0), ("Math", 0)]
+    assert result.late == [("Math", 1)] and result.blocked == []
+
+
+def test_done_prerequisites_dont_block_and_cycles_do():
+    learning = {"Math": [
+        {"task": "a", "status": "Done", "id": "a"},
+        {"task": "b", "status": "ToDo", "after": ["a"]},
+        {"task": "c", "status": "ToDo", "id": "c", "after": ["d"]},
+        {"task": "d", "status": "ToDo", "id": "d", "after": ["c"]},
+    ]}
+    result = plan(learning)
+    assert list(result.finish) == [("Math", 1)]
+    assert sorted(result.blocked) == ["c", "d"]
+
+
+def test_depends_on_is_transitive():
+    scheduler = StudyScheduler()
+    scheduler.plan({"Math": [{"task": "a", "id": "a"}, {"task": "b", "id": "b", "after": ["a"]},
+                             {"task": "c", "id": "c", "after": ["b"]}]}, 1, START)
+    assert scheduler.depends_on("c", "a") and not scheduler.depends_on("a", "c")
+
+
+def test_removing_a_dependent_relaxes_its_prerequisites():
+    data = {"learning": {
+        "Art": [{"task": "notes", "status": "ToDo", "id": "notes"}, {"task": "sketch", "status": "ToDo", "due": day(3)}],
+        "Math": [{"task": "exam", "status": "ToDo", "due": day(1), "after": ["notes"]}],
+    }}
+    scheduler = StudyScheduler()
+    assert scheduler.plan(data["learning"], 1, START).days[0][1] == [("notes", 1)]
+    op = update(["learning", "Math"], [])
+    scheduler.observe(op)
+    apply_op(data, op)
+    assert scheduler.plan(data["learning"], 1, START).days[0][1] == [(("Art", 1), 1)]
+
+def random_task(rng, ids):
+    task = {"task": str(rng.random()), "status": rng.choice(["ToDo", "Done"])}
+    if rng.random() < 0.8:
+        task["effort"] = rng.choice([0, 0.5, 1, 2.5, 4])
+    if rng.random() < 0.5:
+        task["due"] = day(rng.randrange(10))
+    if ids and rng.random() < 0.5:
+        task["after"] = rng.sample(ids, min(len(ids), rng.randint(1, 2)))
+    if rng.random() < 0.6:
+        task["id"] = f"t{rng.randrange(10**6)}"
+    return task
+
+
+def random_op(rng, learning):
+    ids = [t["id"] for tasks in learning.values() for t in tasks if "id" in t]
+    subject = rng.choice(["Math", "Art", "History"])
+    tasks = learning.get(subject)
+    roll = rng.random()
+    if tasks is None or roll < 0.03:
+        return update(["learning", subject], [random_task(rng, ids) for _ in range(rng.randint(0, 3))])
+    if roll < 0.05:
+        return delete(["learning", subject])
+    if not tasks or roll < 0.35:
+        return add(["learning", subject], random_task(rng, ids))
+    i = rng.randrange(len(tasks))
+    field, value = rng.choice([("status", rng.choice(["ToDo", "Done"])), ("effort", rng.choice([0, 1, 3])),
+                               ("due", day(rng.randrange(10))), ("after", rng.sample(ids, min(len(ids), 2)))])
+    return rng.choice([
+        update(["learning", subject, i], random_task(rng, ids)),
+        update(["learning", subject, i, field], value),
+        delete(["learning", subject, i]),
+        move(["learning", subject, i], rng.randrange(len(tasks))),
+    ])
+
+
+def normalized(result):
+    return result.days, result.finish, result.late, sorted(map(str, result.blocked))
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_incremental_plans_match_a_full_rebuild(seed):
+    rng = random.Random(seed)
+    data = {"learning": {}}
+    scheduler = StudyScheduler()
+    for _ in range(200):
+        op = random_op(rng, data["learning"])
+        scheduler.observe(op)
+        apply_op(data, op)
+        if rng.random() < 0.3:
+            capacity, start = rng.choice([1, 2.5, 4]), START + datetime.timedelta(days=rng.randrange(3))
+            expected = StudyScheduler().plan(data["learning"], capacity, start)
+            assert normalized(scheduler.plan(data["learning"], capacity, start)) == normalized(expected)
@@ -0,0 +1,60 @@
+import numpy as np
+import pytest
+
+from planner import simulation
+from planner.projections import sip_final_value
+from planner.simulation import probability_at_least, simulate_lump_sum, simulate_sip
+
+
+def test_worker_pool_is_reused_and_matches_serial():
+    serial = simulate_sip(1000, 12, 5, 15, paths=3000, chunk_size=1000, seed=1)
+    pooled = simulate_sip(1000, 12, 5, 15, paths=3000, chunk_size=1000, seed=1, workers=2)
+    pool = simulation._pools[2]
+    simulate_sip(1000, 12, 5, 15, paths=3000, chunk_size=1000, seed=2, workers=2)
+    assert simulation._pools[2] is pool
+    np.testing.assert_array_equal(pooled.final, serial.final)
+    np.testing.assert_array_equal(pooled.bands, serial.bands)
+
+
+def test_result_shape_and_percentile_order():
+    result = simulate_sip(1000, 12, 2.5, 15, paths=500)
+    np.testing.assert_array_equal(result.months, [12, 24, 30])
+    assert result.bands.shape == (len(simulation.PERCENTILES), 3) and result.mean.shape == (3,)
+    assert len(result.final) == 500 and (np.diff(result.final) >= 0).all()
+    assert (result.bands[0] <= result.bands[1]).all() and (result.bands[1] <= result.bands[2]).all()
+    assert not result.final.flags.writeable
+
+
+def test_seed_fixes_the_paths():
+    a = simulate_sip(1000, 12, 3, 20, paths=800, chunk_size=300, seed=5)
+    assert simulate_sip(1000, 12, 3, 20, paths=800, chunk_size=300, seed=5) is a  # memoized
+    simulation._simulate.cache_clear()
+    again = simulate_sip(1000, 12, 3, 20, paths=800, chunk_size=300, seed=5)
+    np.testing.assert_array_equal(again.final, a.final)
+    other = simulate_sip(1000, 12, 3, 20, paths=800, chunk_size=300, seed=6)
+    assert not np.array_equal(other.final, a.final)
+
+
+def test_zero_volatility_matches_the_closed_form():
+    result = simulate_sip(1000, 12, 3, 0, paths=10)
+    np.testing.assert_allclose(result.final, sip_final_value(1000, 12, 3))
+    lump = simulate_lump_sum(500, 10, 2, 0, paths=10, model="normal")
+    np.testing.assert_allclose(lump.final, 500 * (1 + 10 / 12 / 100) ** 24)
+
+
+def test_lognormal_mean_tracks_the_expected_return():
+    result = simulate_lump_sum(100, 10, 5, 20, paths=20000)
+    assert result.mean[-1] == pytest.approx(100 * (1 + 10 / 12 / 100) ** 60, rel=0.02)
+
+
+def test_probability_at_least():
+    result = simulate_lump_sum(100, 0, 1, 30, paths=1000)
+    assert probability_at_least(result, 0) == 1.0
+    assert probability_at_least(result, result.final[-1] + 1) == 0.0
+    assert probability_at_least(result, np.median(result.final)) == pytest.approx(0.5, abs=0.01)
+    assert probability_at_least(simulate_sip(100, 5, 0, 10, paths=10), 1) == 0.0
+
+
+def test_unknown_model_is_rejected():
+    with pytest.raises(ValueError):
+        simulate_sip(100, 5, 1, 10, model="uniform")
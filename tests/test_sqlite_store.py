@@ -0,0 +1,177 @@
+import json
+import random
+
+import pytest
+
+from planner.aggregates import AggregateIndex
+from planner.binary import to_plain
+from planner.sqlite_store import SQLiteStore
+from planner.storage import ConflictError, add, apply_op, delete, move, update
+
+
+def plain(data):
+    return json.loads(json.dumps(data, default=to_plain))
+
+
+def test_status_counts_come_from_the_database(tmp_path):
+    store = SQLiteStore(str(tmp_path / "planner_data.db"))
+    session = store.open()
+    session.commit(update(["learning", "Math"], [{"task": "a", "status": "Done"}, {"task": "b", "status": "ToDo"}]),
+                   add(["learning", "Math"], {"task": "c", "status": "Done"}))
+    assert session.status_counts("Math") == {"Done": 2, "ToDo": 1}
+    assert store.status_counts() == {"Math": {"Done": 2, "ToDo": 1}}
+    plan = store._db.execute("EXPLAIN QUERY PLAN SELECT t.status, COUNT(*) FROM tasks t JOIN subjects s "
+                             "ON s.id = t.subject_id WHERE s.name = 'Math' GROUP BY t.status").fetchall()
+    assert any("tasks_subject_status" in row[-1] for row in plan)
+
+
+# --- Op translation ---
+def base_data():
+    return {
+        "finance": [
+            {"type": "SIP", "name": "Index", "amount": 500.0, "rate": 12.0, "years": 10},
+            {"type": "Monthly Budget", "name": "Home", "income": 4000.0, "expenses": 2500.0,
+             "categories": {"Rent": 1500.0, "Food": 600.0}, "ledger": {"amount": [10.0], "category": ["Food"]}},
+            {"type": "Savings Goal", "name": "Car", "target": 5000.0, "saved": 100.0},
+        ],
+        "learning": {
+            "Math": [{"task": "a", "status": "Done"}, {"task": "b", "status": "ToDo", "effort": 2.0},
+                     {"task": "c", "status": "In Progress"}],
+            "Art": [{"task": "d", "status": "ToDo"}],
+            "Physics": [],
+        },
+        "daily_goals": [{"goal": "Read", "done": True}, {"goal": "Run", "done": False}],
+        "goal_history": {"2026-10-01": [1, 2]},
+    }
+
+
+OPS = [
+    # tasks
+    add(["learning", "Math"], {"task": "e", "status": "ToDo", "due": "2026-11-01"}),
+    update(["learning", "Math", 1], {"task": "B", "status": "Done"}),
+    update(["learning", "Math", 0, "status"], "ToDo"),
+    update(["learning", "Math", 2, "effort"], 1.5),
+    delete(["learning", "Math", 1, "effort"]),
+    delete(["learning", "Math", 0]),
+    move(["learning", "Math", 2], 0),
+    move(["learning", "Math", 0], 2),
+    # subjects
+    update(["learning", "Chemistry"], [{"task": "x", "status": "ToDo"}]),
+    update(["learning", "Art"], [{"task": "y", "status": "Done"}]),
+    delete(["learning", "Art"]),
+    move(["learning", "Physics"], 0),
+    # plans and their categories
+    add(["finance"], {"type": "Monthly Budget", "name": "Trip", "income": 0.0, "expenses": 0.0,
+                      "categories": {"Fuel": 80.0}}),
+    update(["finance", 0], {"type": "SIP", "name": "Bonds", "amount": 100.0, "rate": 6.0, "years": 5}),
+    update(["finance", 2, "saved"], 200.0),
+    delete(["finance", 0]),
+    move(["finance", 2], 0),
+    update(["finance", 1, "categories"], {"Gym": 40.0}),
+    update(["finance", 1, "categories", "Food"], 650.0),
+    update(["finance", 1, "categories", "Books"], 30.0),
+    delete(["finance", 1, "categories", "Rent"]),
+    add(["finance", 1, "ledger", "amount"], 5.0),
+    # daily goals and the rest
+    add(["daily_goals"], {"goal": "Code", "done": False}),
+    update(["daily_goals", 1, "done"], True),
+    delete(["daily_goals", 0]),
+    update(["daily_goals"], [{"goal": "Sleep", "done": True}]),
+    update(["goal_history", "2026-10-02"], [0, 2]),
+    delete(["goal_history"]),
+]
+
+
+@pytest.mark.parametrize("op", OPS, ids=lambda op: f"{op['op']}:{'/'.join(map(str, op['path']))}")
+def test_ops_translate_to_rows(tmp_path, op):
+    path = str(tmp_path / "planner_data.db")
+    expected = base_data()
+    store = SQLiteStore(path)
+    session = store.open()
+    session.reset(base_data())
+    session.save()
+    session.commit(op)
+    apply_op(expected, op)
+    reopened = SQLiteStore(path).open()
+    assert plain(reopened.data) == expected
+    counts = AggregateIndex.build(expected)
+    assert reopened.aggregates.to_dict() == session.aggregates.to_dict() == counts.to_dict()
+    assert store.status_counts() == {subject: c for subject, c in counts.status_counts().items() if c}
+
+
+def test_plans_by_type_read_only_their_categories(tmp_path):
+    store = SQLiteStore(str(tmp_path / "planner_data.db"))
+    session = store.open()
+    session.reset(base_data())
+    session.save()
+    statements = []
+    store._db.set_trace_callback(statements.append)
+    assert [p["name"] for p in store.plans(plan_type="Monthly Budget")] == ["Home"]
+    assert store.plans(plan_type="Monthly Budget")[0]["categories"] == {"Rent": 1500.0, "Food": 600.0}
+    assert all("plan_id IN" in s for s in statements if "budget_categories" in s)
+
+
+# --- Reading only what renders ---
+def test_subjects_load_when_read(tmp_path):
+    path = str(tmp_path / "planner_data.db")
+    session = SQLiteStore(path).open()
+    session.reset(base_data())
+    session.save()
+    session = SQLiteStore(path).open()
+    learning = session.data["learning"]
+    assert [len(tasks) for tasks in learning.values()] == [3, 1, 0]
+    assert not any(tasks.loaded for tasks in learning.values())
+    assert session.aggregates.status_counts() == AggregateIndex.build(base_data()).status_counts()
+    assert session.aggregates.scheduled_tasks(learning) == 1
+    assert not any(tasks.loaded for tasks in learning.values())
+    assert learning["Art"][0]["task"] == "d"
+    assert [tasks.loaded for tasks in learning.values()] == [False, True, False]
+
+
+def random_op(rng, data):
+    learning = data["learning"]
+    subject = rng.choice(["Math", "Art", "Physics"])
+    tasks = learning.get(subject)
+    if tasks is None or rng.random() < 0.05:
+        return update(["learning", subject], [{"task": "t", "status": "ToDo"}])
+    if not tasks or rng.random() < 0.3:
+        return add(["learning", subject], {"task": str(rng.random()), "status": rng.choice(["ToDo", "Done"])})
+    i = rng.randrange(len(tasks))
+    return rng.choice([
+        update(["learning", subject, i, "status"], rng.choice(["ToDo", "In Progress", "Done"])),
+        update(["learning", subject, i, "effort"], 1.0),
+        delete(["learning", subject, i]),
+        move(["learning", subject, i], rng.randrange(len(tasks))),
+        move(["learning", subject], 0),
+        delete(["learning", subject]) if rng.random() < 0.2 else delete(["learning", subject, i]),
+    ])
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_lazy_sessions_track_other_writers(tmp_path, seed):
+    rng = random.Random(seed)
+    path = str(tmp_path / "planner_data.db")
+    store = SQLiteStore(path)
+    session = store.open()
+    session.reset(base_data())
+    session.save()
+    writer, reader = SQLiteStore(path).open(), store.open()
+    for _ in range(300):
+        writer.commit(random_op(rng, writer.data))
+        # The reader reads a subject now and then, often before it has caught up
+        subject = rng.choice(["Math", "Art", "Physics"])
+        if subject in reader.data["learning"] and rng.random() < 0.5:
+            list(reader.data["learning"][subject])
+        if rng.random() < 0.2:
+            reader.sync()
+            assert plain(reader.data) == plain(writer.data)
+            assert reader.aggregates.status_counts() == AggregateIndex.build(plain(reader.data)).status_counts()
+            assert reader.aggregates.scheduled == AggregateIndex.build(plain(reader.data)).scheduled
+        if rng.random() < 0.1:
+            try:
+                reader.commit(random_op(rng, reader.data))
+            except ConflictError:
+                pass
+            writer.sync()
+    reader.sync()
+    assert plain(reader.data) == plain(writer.data) == plain(SQLiteStore(path).load())
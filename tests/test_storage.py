@@ -0,0 +1,319 @@
+import json
+import multiprocessing
+import os
+import random
+import threading
+import time
+
+import pytest
+
+from planner.aggregates import AggregateIndex
+from planner.storage import ConflictError, JournalStore, add, apply_op, delete, move, update
+
+
+def task(name):
+    return {"task": name, "status": "ToDo"}
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / "planner_data.json")
+
+
+def deferred(path):
+    # A delay long enough that only explicit flushes write
+    return JournalStore(path, durability="debounced", delay=60)
+
+
+# --- Journal replay and compaction ---
+def journal(store):
+    with open(store.journal_path) as f:
+        return [json.loads(line) for line in f]
+
+
+def test_apply_op_on_lists_and_dicts():
+    data = {"finance": [{"name": "a"}, {"name": "b"}], "learning": {"Math": [], "Art": []}}
+    apply_op(data, add(["finance"], {"name": "c"}))
+    apply_op(data, update(["finance", 0, "name"], "A"))
+    apply_op(data, move(["finance", 2], 0))
+    apply_op(data, delete(["finance", 2]))
+    apply_op(data, move(["learning", "Art"], 0))
+    apply_op(data, delete(["learning", "Math"]))
+    assert data == {"finance": [{"name": "c"}, {"name": "A"}], "learning": {"Art": []}}
+    assert list(data["learning"]) == ["Art"]
+
+
+def test_commits_append_numbered_records(path):
+    store = JournalStore(path)
+    session = store.open()
+    session.commit(update(["learning", "Math"], []), add(["learning", "Math"], task("a")))
+    session.commit(update(["learning", "Math", 0, "status"], "Done"))
+    header, *records = journal(store)
+    assert header["base"] == 0 and header["id"]
+    assert [r["seq"] for r in records] == [1, 2, 3] and session.version == 3
+    assert not os.path.exists(path)  # nothing rewrote the snapshot
+    assert JournalStore(path).load() == session.data == {
+        "finance": [], "learning": {"Math": [{"task": "a", "status": "Done"}]}}
+
+
+def test_torn_tail_is_skipped_then_overwritten(path):
+    store = JournalStore(path)
+    session = store.open()
+    session.commit(update(["learning", "Math"], [task("a")]))
+    with open(store.journal_path, "a") as f:
+        f.write('{"op": "add", "path": ["learning", "Ma')
+    assert JournalStore(path).load()["learning"]["Math"] == [task("a")]
+    other = JournalStore(path).open()
+    other.commit(add(["learning", "Math"], task("b")))
+    assert [r["seq"] for r in journal(store)[1:]] == [1, 2]
+    assert JournalStore(path).load() == other.data
+
+
+def test_compaction_folds_the_journal_into_the_snapshot(path):
+    store = JournalStore(path, compact_every=1000)
+    session, reader = store.open(), store.open()
+    session.commit(update(["learning", "Math"], []))
+    for name in "abc":
+        session.commit(add(["learning", "Math"], task(name)))
+    store.compact()
+    with open(path) as f:
+        snapshot = json.load(f)
+    assert snapshot["_seq"] == 4 and snapshot["learning"]["Math"] == [task(n) for n in "abc"]
+    assert snapshot["_aggregates"]["subjects"] == {"Math": {"ToDo": 3}}
+    assert journal(store) == [{"base": 4, "id": journal(store)[0]["id"]}]
+    # Sessions opened before carry on, and numbering continues past the base
+    reader.sync()
+    assert reader.data == session.data
+    reader.commit(delete(["learning", "Math", 0]))
+    assert [r["seq"] for r in journal(store)[1:]] == [5]
+    assert JournalStore(path).load() == reader.data
+
+
+def test_compaction_runs_in_the_background_when_due(path):
+    store = JournalStore(path, compact_every=5)
+    session = store.open()
+    session.commit(update(["learning", "Math"], []))
+    for i in range(4):
+        session.commit(add(["learning", "Math"], task(str(i))))
+    # The fifth record is due and nothing commits after it
+    store._compactor.join(5)
+    assert journal(store) == [{"base": 5, "id": journal(store)[0]["id"]}]
+    assert JournalStore(path).load() == session.data
+
+
+def test_save_starts_a_fresh_journal(path):
+    store = JournalStore(path)
+    session, other = store.open(), store.open()
+    session.commit(update(["learning", "Math"], [task("a")]))
+    session.save()
+    assert session.version == 2 and journal(store)[0]["base"] == 2
+    # A session from before the save has been replaced and reloads
+    other.sync()
+    assert other.data == session.data and other.version == 2
+
+
+# --- Sessions and processes sharing a file ---
+def test_sessions_pick_up_each_others_commits(path):
+    store = JournalStore(path)
+    a, b = store.open(), JournalStore(path).open()
+    a.commit(update(["learning", "Math"], [task("a")]))
+    b.sync()
+    assert b.data == a.data and b.version == a.version
+    # Plain updates to different items merge without a conflict
+    b.commit(add(["learning", "Math"], task("b")))
+    a.commit(update(["learning", "Math", 0, "status"], "Done"))
+    b.sync()
+    assert a.data == b.data == JournalStore(path).load()
+
+
+def test_shifted_positions_conflict_and_reload(path):
+    a, b = JournalStore(path).open(), JournalStore(path).open()
+    a.commit(update(["learning", "Math"], [task("x"), task("y")]))
+    b.sync()
+    a.commit(delete(["learning", "Math", 0]))
+    with pytest.raises(ConflictError):
+        b.commit(update(["learning", "Math", 1, "status"], "Done"))
+    assert b.data == a.data
+    assert [t["status"] for t in JournalStore(path).load()["learning"]["Math"]] == ["ToDo"]
+
+
+def test_ops_on_deleted_data_conflict(path):
+    a, b = JournalStore(path).open(), JournalStore(path).open()
+    a.commit(update(["learning", "Math"], [task("x")]), add(["finance"], {"type": "SIP", "name": "s"}))
+    b.sync()
+    a.commit(delete(["learning", "Math"]))
+    with pytest.raises(ConflictError):
+        b.commit(add(["learning", "Math"], task("y")))
+    b.commit(update(["finance", 0, "name"], "t"))
+    a.sync()
+    assert a.data == b.data == {"finance": [{"type": "SIP", "name": "t"}], "learning": {}}
+
+
+def append_plans(path, worker, count):
+    session = JournalStore(path, compact_every=20).open()
+    for k in range(count):
+        while True:
+            try:
+                session.commit(add(["finance"], {"type": "SIP", "name": f"{worker}-{k}"}))
+                break
+            except ConflictError:
+                pass
+    if session.store._compactor:
+        session.store._compactor.join()
+
+
+def test_processes_append_without_losing_commits(path):
+    JournalStore(path).open().commit(update(["finance"], []))
+    workers = [multiprocessing.Process(target=append_plans, args=(path, n, 40)) for n in range(4)]
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join(60)
+    names = [p["name"] for p in JournalStore(path).load()["finance"]]
+    assert sorted(names) == sorted(f"{n}-{k}" for n in range(4) for k in range(40))
+    # Each process's plans keep their commit order
+    assert all(names.index(f"{n}-{k}") < names.index(f"{n}-{k + 1}") for n in range(4) for k in range(39))
+
+
+# --- Deferred batches vs. other stores ---
+def commit_in_thread(session, *ops):
+    thread = threading.Thread(target=session.commit, args=ops)
+    thread.start()
+    return thread
+
+
+def test_other_writers_wait_for_a_deferred_batch(path):
+    JournalStore(path).open().commit(update(["learning", "Math"], []))
+    mine = deferred(path)
+    a, b, c = mine.open(), JournalStore(path).open(), deferred(path).open()
+    a.commit(add(["learning", "Math"], task("mine")))
+    # An immediate store and a second deferred one both wait for the batch
+    waiting = [commit_in_thread(b, add(["learning", "Math"], task("theirs"))),
+               commit_in_thread(c, add(["learning", "Math"], task("other")))]
+    time.sleep(0.2)
+    assert all(t.is_alive() for t in waiting)
+    mine.flush()
+    for t in waiting:
+        t.join(5)
+    assert not c.store._pending  # it found the lock taken and wrote immediately
+    tasks = [t["task"] for t in JournalStore(path).load()["learning"]["Math"]]
+    assert tasks[0] == "mine" and sorted(tasks[1:]) == ["other", "theirs"]
+    for session in (a, b, c):
+        session.sync()
+        assert session.data == JournalStore(path).load()
+    mine.close()
+
+
+def test_a_batch_starts_from_other_stores_commits(path):
+    JournalStore(path).open().commit(update(["learning", "Math"], [task("x"), task("y")]))
+    mine = deferred(path)
+    a, b = mine.open(), JournalStore(path).open()
+    b.commit(delete(["learning", "Math", 0]))
+    # The batch catches up first, so this reaches "y" rather than a stale index
+    with pytest.raises(ConflictError):
+        a.commit(update(["learning", "Math", 0, "status"], "Done"))
+    a.commit(update(["learning", "Math", 0, "status"], "Done"))
+    mine.close()
+    tasks = JournalStore(path).load()["learning"]["Math"]
+    assert [(t["task"], t["status"]) for t in tasks] == [("y", "Done")]
+
+
+def random_op(rng, data):
+    tasks = data["learning"].get("Math")
+    if tasks is None or rng.random() < 0.05:
+        return update(["learning", "Math"], [task("t")])
+    if not tasks or rng.random() < 0.4:
+        return add(["learning", "Math"], task(str(rng.random())))
+    i = rng.randrange(len(tasks))
+    return rng.choice([
+        update(["learning", "Math", i, "status"], "Done"),
+        delete(["learning", "Math", i]),
+        move(["learning", "Math", i], 0),
+    ])
+
+
+def write_randomly(path, seed, durability, results, done):
+    # One process's share of the concurrent test: random task edits, each
+    # with a plan add that is never undone, then the session's final data
+    rng = random.Random(seed)
+    store = JournalStore(path, durability=durability, delay=0.005, compact_every=20)
+    session = store.open()
+    committed = []
+    for k in range(60):
+        ops = [random_op(rng, session.data), add(["finance"], {"type": "SIP", "name": f"{seed}-{k}"})]
+        try:
+            session.commit(*ops)
+        except ConflictError:
+            continue
+        committed.append(f"{seed}-{k}")
+        time.sleep(rng.random() * 0.003)
+    store.close()
+    if store._compactor:
+        store._compactor.join()
+    done.wait()
+    session.sync()
+    results.put((committed, session.data))
+
+
+@pytest.mark.parametrize("seed", range(10))
+@pytest.mark.parametrize("durabilities", [["debounced", "debounced"], ["debounced", "immediate", "debounced"]])
+def test_concurrent_stores_agree(path, seed, durabilities):
+    JournalStore(path).open().commit(update(["learning", "Math"], []))
+    results, done = multiprocessing.Queue(), multiprocessing.Barrier(len(durabilities))
+    workers = [multiprocessing.Process(target=write_randomly, args=(path, seed * 10 + n, durability, results, done))
+               for n, durability in enumerate(durabilities)]
+    for w in workers:
+        w.start()
+    outcomes = [results.get(timeout=60) for _ in workers]
+    for w in workers:
+        w.join(10)
+    final = JournalStore(path).open()
+    # Every acknowledged commit is on disk, and every session sees the same data
+    assert sorted(p["name"] for p in final.data["finance"]) == sorted(name for names, _ in outcomes for name in names)
+    assert final.aggregates.to_dict() == AggregateIndex.build(final.data).to_dict()
+    for _, data in outcomes:
+        assert data == final.data
+
+
+# --- Deferred commit conflicts vs. the writer thread ---
+def test_conflict_reload_waits_for_flush(path):
+    store = deferred(path)
+    a, b = store.open(), store.open()
+    a.commit(add(["finance"], {"type": "Savings Goal", "name": "Car"}))
+    writing, release = threading.Event(), threading.Event()
+    write_records = store._write_records
+
+    def slow_write(records):
+        written = write_records(records)
+        writing.set()
+        release.wait(5)
+        return written
+
+    store._write_records = slow_write
+    flusher = threading.Thread(target=store.flush)
+    flusher.start()
+    assert writing.wait(5)
+    # The records are on disk but the store's offset hasn't moved past them yet
+    errors = []
+
+    def bad_commit():
+        try:
+            b.commit(update(["learning", "Missing", 0, "status"], "Done"))
+        except ConflictError as e:
+            errors.append(e)
+
+    committer = threading.Thread(target=bad_commit)
+    committer.start()
+    time.sleep(0.2)
+    release.set()
+    flusher.join(5)
+    committer.join(5)
+    assert len(errors) == 1
+    assert store._offset == os.path.getsize(store.journal_path)
+    assert store._seqs == sorted(set(store._seqs))
+    b.commit(add(["finance"], {"type": "Savings Goal", "name": "House"}))
+    a.sync()
+    store.close()
+    names = [p["name"] for p in JournalStore(path).load()["finance"]]
+    assert names == ["Car", "House"]
+    assert a.data == b.data
@@ -0,0 +1,57 @@
+import numpy as np
+
+from planner.timeline import build_timeline, compare, plan_series
+
+START = "2026-10"
+PLANS = [
+    {"type": "Monthly Budget", "name": "Life", "income": 3000, "expenses": 2000},
+    {"type": "SIP", "name": "Index", "amount": 200, "rate": 0, "years": 10},
+    {"type": "Savings Goal", "name": "Laptop", "target": 1500, "saved": 500},
+    {"type": "Savings Goal", "name": "Trip", "target": 2000, "saved": 0},
+    {"type": "Stock Experiment", "name": "Shares", "invested": 1000, "result": 1000},
+]
+
+
+def test_surplus_fills_goals_in_order():
+    t = build_timeline(PLANS, months=6, start=START)
+    assert list(t.months.astype(str)) == ["2026-10", "2026-11", "2026-12", "2027-01", "2027-02", "2027-03"]
+    assert list(t.cash_flow) == [800] * 6
+    # 800 a month: the laptop's 1000 is met in month 2, the trip's 2000 in month 4
+    assert list(t.values[2]) == [1300, 1500, 1500, 1500, 1500, 1500]
+    assert list(t.values[3]) == [0, 600, 1400, 2000, 2000, 2000]
+    assert t.goal_months == [None, None, np.datetime64("2026-11"), np.datetime64("2027-01"), None]
+    assert list(t.cash) == [0, 0, 0, 200, 1000, 1800]
+    assert list(t.values[1]) == [200, 400, 600, 800, 1000, 1200]
+    assert np.allclose(t.net_worth, t.cash + t.values.sum(axis=0))
+
+
+def test_shortfalls_come_out_of_cash():
+    plans = [{"type": "Monthly Budget", "name": "Life", "income": 1000, "expenses": 1500},
+             {"type": "Savings Goal", "name": "Car", "target": 100, "saved": 0}]
+    t = build_timeline(plans, months=3, start=START)
+    assert list(t.cash) == [-500, -1000, -1500]
+    assert list(t.values[1]) == [0, 0, 0] and t.goal_months == [None, None]
+
+
+def test_no_plans():
+    t = build_timeline([], months=3, start=START)
+    assert list(t.cash) == list(t.net_worth) == [0, 0, 0] and t.values.shape == (0, 3)
+
+
+def test_series_are_cached_and_read_only():
+    flow, value = plan_series(PLANS[1], 12)
+    assert plan_series(dict(PLANS[1], name="Renamed"), 12)[0] is flow
+    assert not flow.flags.writeable and not value.flags.writeable
+
+
+def test_what_ifs_override_a_copy():
+    variants = {"Frugal": {0: {"expenses": 1000}}, "Growth": {4: {"growth": 12}}}
+    result = compare(PLANS, variants, months=6, start=START)
+    assert list(result) == ["Current", "Frugal", "Growth"]
+    assert PLANS[0]["expenses"] == 2000 and "growth" not in PLANS[4]
+    assert list(result["Frugal"].cash_flow) == [1800] * 6
+    assert result["Frugal"].goal_months[3] == np.datetime64("2026-11")
+    assert list(result["Current"].values[4]) == [1000] * 6
+    assert np.allclose(result["Growth"].values[4], 1000 * 1.01 ** np.arange(1, 7))
+    # Plans the what-if doesn't touch come out the same
+    assert np.array_equal(result["Growth"].values[:4], result["Current"].values[:4])
@@ -0,0 +1,34 @@
+import io
+
+from planner.cli import main
+from planner.storage import JournalStore, add, update
+from planner.transfer import import_file
+
+
+def test_import_skips_non_finite_numbers(tmp_path):
+    session = JournalStore(str(tmp_path / "planner_data.json")).open()
+    rows = io.StringIO(
+        "kind,type,name,amount,rate,years\n"
+        "plan,SIP,Huge,1000,12,1e400\n"
+        "plan,SIP,Forever,1000,12,inf\n"
+        "plan,SIP,Unknown,nan,12,10\n"
+        "plan,SIP,Retire,1000,12,10\n"
+    )
+    report = import_file(session, rows, "csv")
+    assert report.imported == 1
+    assert [line for line, _ in report.errors] == [2, 3, 4]
+    assert [p["name"] for p in session.data["finance"]] == ["Retire"]
+
+
+def test_cli_export_round_trips(tmp_path):
+    path = str(tmp_path / "planner_data.json")
+    session = JournalStore(path).open()
+    session.commit(update(["learning", "Math"], [{"task": "Limits", "status": "Done", "effort": 2.0, "after": ["a1"]}]),
+                   add(["finance"], {"type": "SIP", "name": "Retire", "amount": 1000.0, "rate": 12.0, "years": 10}))
+    for name in ("export.csv", "export.jsonl"):
+        main([path, "--export", str(tmp_path / name)])
+        copy = JournalStore(str(tmp_path / f"{name}.json")).open()
+        with open(tmp_path / name, newline="") as f:
+            report = import_file(copy, f, name.rsplit(".", 1)[1])
+        assert report.errors == []
+        assert copy.data == session.data